@@ -0,0 +1,99 @@
+"""Benchmark header-only capture-date extraction on a synthetic card.
+
+Generates JPEGs with an Exif APP1 segment, DNGs with a TIFF/Exif IFD and MOVs
+whose moov/mvhd atom sits after the media data (as most cameras write them),
+then compares the per-file cost of:
+
+  * full read   - read the whole file and search it for the date
+  * header only - capture_date.read_capture_time (small seeks and reads)
+  * cached      - CaptureDateCache lookups on a rescan
+
+    python benchmarks/bench_capture_date.py --files 300 --size-mb 8
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_date import QUICKTIME_EPOCH_OFFSET, CaptureDateCache, read_capture_time  # noqa: E402
+from synthetic_card import BLOCK_SIZE, write_dng, write_jpeg, write_mov  # noqa: E402
+
+EXIF_DATE_PATTERN = re.compile(rb"\d{4}:\d\d:\d\d \d\d:\d\d:\d\d")
+
+
+def make_card(card_dir, files, size):
+    folder = os.path.join(card_dir, "DCIM", "100TEST")
+    os.makedirs(folder, exist_ok=True)
+    writers = [(".JPG", write_jpeg), (".DNG", write_dng), (".MOV", write_mov)]
+    rng = random.Random(0)
+    block = rng.randbytes(BLOCK_SIZE)
+    expected = {}
+    for i in range(files):
+        extension, writer = writers[i % len(writers)]
+        moment = datetime(2024, 1 + i % 12, 1 + i % 28, 12, 0, 0)
+        path = os.path.join(folder, f"IMG_{i:05d}{extension}")
+        writer(path, moment, size, block, rng)
+        expected[path] = moment.timestamp()
+    return expected
+
+
+def full_read(path):
+    """Reference approach: load the whole file and look for the date."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".MOV"):
+        index = data.rfind(b"mvhd")
+        created = struct.unpack(">I", data[index + 8 : index + 12])[0]
+        return float(created - QUICKTIME_EPOCH_OFFSET)
+    match = EXIF_DATE_PATTERN.search(data)
+    return datetime.strptime(match.group().decode(), "%Y:%m:%d %H:%M:%S").timestamp()
+
+
+def timed(label, paths, func):
+    started = time.perf_counter()
+    for path in paths:
+        func(path)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<14} {elapsed * 1e6 / len(paths):>12.1f} {elapsed:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--dir", help="scratch folder (default: system temp)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="copy_group_bench_", dir=args.dir)
+    try:
+        expected = make_card(os.path.join(scratch, "card"), args.files, int(args.size_mb * 1024 * 1024))
+        paths = sorted(expected)
+        wrong = [path for path in paths if read_capture_time(path) != expected[path]]
+        if wrong:
+            raise SystemExit(f"capture date mismatch for {len(wrong)} files, e.g. {wrong[0]}")
+
+        cache = CaptureDateCache(os.path.join(scratch, "capture_dates.sqlite3"))
+        stats = {path: os.stat(path) for path in paths}
+        for path in paths:
+            cache.capture_time(path, stats[path])
+
+        print(f"{args.files} files x {args.size_mb} MB (JPG/DNG/MOV)")
+        print(f"{'approach':<14} {'us per file':>12} {'seconds':>9}")
+        timed("full read", paths, full_read)
+        timed("header only", paths, read_capture_time)
+        timed("cached", paths, lambda path: cache.capture_time(path, stats[path]))
+        cache.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
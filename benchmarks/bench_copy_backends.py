@@ -0,0 +1,124 @@
+"""Benchmark the copy backends against the original 8KB Python loop.
+
+Writes one large synthetic clip and copies it with every backend in
+copy_backends.COPY_BACKENDS, with and without an in-line checksum.
+
+    python benchmarks/bench_copy_backends.py --size-mb 4096 --dir /Volumes/FastSSD
+
+Results after the first run are served from the page cache unless the scratch
+folder lives on the real source device and the cache is dropped between runs.
+--card-mbps and --disk-mbps throttle reads and writes made from Python to
+mimic an SD card and a destination disk, which shows how much the pipelined
+backend gains by overlapping them (kernel backends are not throttled):
+
+    python benchmarks/bench_copy_backends.py --size-mb 256 --card-mbps 90 --disk-mbps 120 --backends python readinto pipelined
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from copy_backends import COPY_BACKENDS, copy_contents  # noqa: E402
+
+
+class Throttled:
+    """Wraps an open file so readinto/read/write take as long as they would at mbps."""
+
+    def __init__(self, file, mbps):
+        self.file = file
+        self.seconds_per_byte = 1 / (mbps * 1024 * 1024)
+
+    def _wait(self, nbytes, started):
+        remaining = nbytes * self.seconds_per_byte - (time.perf_counter() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def readinto(self, buffer):
+        started = time.perf_counter()
+        read = self.file.readinto(buffer)
+        self._wait(read or 0, started)
+        return read
+
+    def read(self, size=-1):
+        started = time.perf_counter()
+        data = self.file.read(size)
+        self._wait(len(data), started)
+        return data
+
+    def write(self, data):
+        started = time.perf_counter()
+        written = self.file.write(data)
+        self._wait(written, started)
+        return written
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def make_clip(path, size_mb):
+    """Write size_mb of random data in 1MB blocks."""
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def run_once(src_path, dst_path, backend, with_hash, card_mbps=None, disk_mbps=None):
+    """Copy once and return (elapsed seconds, backend actually used)."""
+    if os.path.exists(dst_path):
+        os.remove(dst_path)
+    hasher = hashlib.md5() if with_hash else None
+    started = time.perf_counter()
+    with open(src_path, "rb") as src_file, open(dst_path, "w+b") as dst_file:
+        if card_mbps:
+            src_file = Throttled(src_file, card_mbps)
+        if disk_mbps:
+            dst_file = Throttled(dst_file, disk_mbps)
+        _, used = copy_contents(src_file, dst_file, backend, hasher)
+    return time.perf_counter() - started, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--backends", nargs="+", default=list(COPY_BACKENDS), choices=COPY_BACKENDS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--card-mbps", type=float, help="throttle source reads to this rate")
+    parser.add_argument("--disk-mbps", type=float, help="throttle destination writes to this rate")
+    parser.add_argument("--dir", help="scratch folder (default: system temp)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="copy_group_bench_", dir=args.dir)
+    try:
+        src_path = os.path.join(scratch, "CLIP0001.MOV")
+        dst_path = os.path.join(scratch, "copy.MOV")
+        make_clip(src_path, args.size_mb)
+
+        print(f"{args.size_mb} MB clip, best of {args.repeat}")
+        print(f"{'backend':<16} {'used':<16} {'md5':>4} {'seconds':>8} {'MB/s':>8} {'vs 8KB':>7}")
+        baseline = {}
+        for with_hash in (False, True):
+            results = [run_once(src_path, dst_path, "python", with_hash, args.card_mbps, args.disk_mbps) for _ in range(args.repeat)]
+            baseline[with_hash] = min(results)[0]
+        for backend in args.backends:
+            for with_hash in (False, True):
+                if backend == "python":
+                    elapsed, used = baseline[with_hash], "python"
+                else:
+                    results = [run_once(src_path, dst_path, backend, with_hash, args.card_mbps, args.disk_mbps) for _ in range(args.repeat)]
+                    elapsed, used = min(results)
+                print(
+                    f"{backend:<16} {used:<16} {'yes' if with_hash else 'no':>4} "
+                    f"{elapsed:8.2f} {args.size_mb / elapsed:8.1f} {baseline[with_hash] / elapsed:6.2f}x"
+                )
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
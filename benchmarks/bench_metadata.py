@@ -0,0 +1,156 @@
+"""Count metadata calls per file for the old and the FileRecord scan paths.
+
+Builds a synthetic card of empty files with mtimes spread over several days
+(the date folders follow creation time, which is the ctime on Linux), then runs the
+metadata phase of an ingest (scan, date folders, target directories, duplicate
+lookup) the way copy_group.py did before FileRecord and the way it does now.
+os.stat and os.mkdir are counted by wrapping them; a scandir entry's stat is
+counted as one call (it is one stat syscall on Linux and macOS, none on
+Windows).
+
+    python benchmarks/bench_metadata.py --files 10000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy_group  # noqa: E402
+import copy_group_synology  # noqa: E402
+from file_records import DirectoryCache, _folders_for_bucket  # noqa: E402
+
+counts = {"stat": 0, "mkdir": 0, "fromtimestamp": 0}
+real_stat = os.stat
+real_mkdir = os.mkdir
+
+
+def counting_stat(*args, **kwargs):
+    counts["stat"] += 1
+    return real_stat(*args, **kwargs)
+
+
+def counting_mkdir(*args, **kwargs):
+    counts["mkdir"] += 1
+    return real_mkdir(*args, **kwargs)
+
+
+def make_card(card_dir, files, days):
+    """Create empty files with mtimes spread over a number of days."""
+    base = time.time() - days * 86400
+    per_folder = 500
+    for i in range(files):
+        folder = os.path.join(card_dir, f"{100 + i // per_folder}TEST")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"IMG_{i:05d}.JPG")
+        open(path, "wb").close()
+        stamp = base + (i % days) * 86400
+        os.utime(path, (stamp, stamp))
+
+
+def legacy_target_dir(target_base, creation_time, filename):
+    counts["fromtimestamp"] += 2
+    year_folder = datetime.fromtimestamp(creation_time).strftime("%Y")
+    date_folder = datetime.fromtimestamp(creation_time).strftime("%Y%m%d")
+    target_dir = os.path.join(target_base, year_folder, date_folder)
+    if os.path.splitext(filename)[1].lower() == ".dng":
+        target_dir = os.path.join(target_dir, "DNG")
+    return target_dir
+
+
+def legacy_pass(card_dir, target_base):
+    """Metadata calls made per file by the pre-FileRecord main loop."""
+    for root, _, files in os.walk(card_dir):
+        for file in files:
+            if file.startswith("."):
+                continue
+            src_path = os.path.join(root, file)
+            stat = os.stat(src_path)  # get_file_creation_time
+            creation_time = stat.st_birthtime if hasattr(stat, "st_birthtime") else stat.st_ctime
+            dst_path = os.path.join(legacy_target_dir(target_base, creation_time, file), file)
+
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)  # main loop
+            if os.path.exists(dst_path):
+                os.stat(src_path)
+                os.stat(dst_path)
+                continue
+            os.path.getsize(src_path)  # copy_file_with_progress
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+
+
+def record_pass(card_dir, target_base):
+    """Metadata calls made per file with FileRecord, date_folders and DirectoryCache."""
+    created = DirectoryCache()
+    for record in copy_group.iter_files_to_copy(card_dir, target_base):
+        counts["stat"] += 1  # the scandir entry's stat
+        if copy_group.stat_or_none(record.dst_path) is not None:
+            continue
+        created.ensure(os.path.dirname(record.dst_path))
+
+
+def synology_pass(card_dir, target_base):
+    """Grouping pass of copy_group_synology.py."""
+    files_by_target_dir = copy_group_synology.collect_files_by_target_dir(card_dir)
+    counts["stat"] += sum(len(paths) for paths in files_by_target_dir.values())
+
+
+def populate_target(card_dir, target_base):
+    """Create empty destination files so the passes take the re-run branch."""
+    for record in copy_group.iter_files_to_copy(card_dir, target_base):
+        os.makedirs(os.path.dirname(record.dst_path), exist_ok=True)
+        open(record.dst_path, "wb").close()
+
+
+def measure(label, func, card_dir, target_base, files, rerun=False):
+    shutil.rmtree(target_base, ignore_errors=True)
+    if rerun:
+        populate_target(card_dir, target_base)
+    for key in counts:
+        counts[key] = 0
+    _folders_for_bucket.cache_clear()
+    os.stat, os.mkdir = counting_stat, counting_mkdir
+    started = time.perf_counter()
+    try:
+        func(card_dir, target_base)
+    finally:
+        os.stat, os.mkdir = real_stat, real_mkdir
+    elapsed = time.perf_counter() - started
+    if func is not legacy_pass:
+        counts["fromtimestamp"] = _folders_for_bucket.cache_info().misses
+    scale = 10000 / files
+    print(
+        f"{label:<22} {counts['stat'] * scale:>9.0f} {counts['mkdir'] * scale:>9.0f} "
+        f"{counts['fromtimestamp'] * scale:>14.0f} {elapsed * 1000 * scale:>10.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--dir", help="scratch folder (default: system temp)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="copy_group_bench_", dir=args.dir)
+    try:
+        card_dir = os.path.join(scratch, "card")
+        target_base = os.path.join(scratch, "target")
+        make_card(card_dir, args.files, args.days)
+
+        print(f"Calls per 10k files ({args.files} files over {args.days} days)")
+        print(f"{'path':<22} {'stat':>9} {'mkdir':>9} {'fromtimestamp':>14} {'ms':>10}")
+        measure("legacy, first ingest", legacy_pass, card_dir, target_base, args.files)
+        measure("record, first ingest", record_pass, card_dir, target_base, args.files)
+        measure("legacy, re-run", legacy_pass, card_dir, target_base, args.files, rerun=True)
+        measure("record, re-run", record_pass, card_dir, target_base, args.files, rerun=True)
+        measure("synology grouping", synology_pass, card_dir, target_base, args.files)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
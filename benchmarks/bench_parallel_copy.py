@@ -0,0 +1,71 @@
+"""Benchmark the worker-pool copy engine at different worker counts.
+
+Generates a synthetic card of small JPEG-sized files in a temporary folder and
+copies it with copy_group.copy_files_parallel at 1, 2, 4 and 8 workers.
+
+    python benchmarks/bench_parallel_copy.py --files 2000 --size-kb 400
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy_group  # noqa: E402
+
+
+def make_card(card_dir, files, size_kb):
+    """Write files of random data into a DCIM-like folder."""
+    folder = os.path.join(card_dir, "DCIM", "100TEST")
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(folder, f"IMG_{i:05d}.JPG")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+        paths.append(path)
+    return paths
+
+
+def run_once(src_paths, target_dir, workers):
+    """Copy every source file once and return elapsed seconds."""
+    shutil.rmtree(target_dir, ignore_errors=True)
+    jobs = [
+        (index, src, os.path.join(target_dir, os.path.basename(src)), os.path.basename(src), os.stat(src))
+        for index, src in enumerate(src_paths, start=1)
+    ]
+    started = time.perf_counter()
+    for _, ok, _ in copy_group.copy_files_parallel(jobs, workers, len(jobs), show_progress=False):
+        if not ok:
+            raise RuntimeError("copy failed")
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--size-kb", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--dir", help="scratch folder (default: system temp)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="copy_group_bench_", dir=args.dir)
+    try:
+        src_paths = make_card(os.path.join(scratch, "card"), args.files, args.size_kb)
+        total_mb = args.files * args.size_kb / 1024
+        target_dir = os.path.join(scratch, "target")
+
+        print(f"{args.files} files x {args.size_kb} KB ({total_mb:.1f} MB)")
+        print(f"{'workers':>7} {'seconds':>8} {'files/s':>9} {'MB/s':>8}")
+        for workers in args.workers:
+            elapsed = run_once(src_paths, target_dir, workers)
+            print(f"{workers:>7} {elapsed:8.2f} {args.files / elapsed:9.1f} {total_mb / elapsed:8.1f}")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
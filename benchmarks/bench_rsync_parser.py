@@ -0,0 +1,117 @@
+"""Compare the old character-by-character rsync reader with the chunked parser.
+
+Generates the stdout of a synthetic rsync run (per-file progress redraws for
+the old --progress format, --info=progress2 plus --out-format lines for the
+new one), writes it to a pipe from a child process, and times how much CPU
+the reading side spends turning it into progress updates.
+
+    python benchmarks/bench_rsync_parser.py --files 20000 --redraws 20
+"""
+import argparse
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rsync_progress import OUT_FORMAT_MARKER, FileDone, TransferProgress, iter_rsync_events  # noqa: E402
+
+FILE_SIZE = 25 * 1024 * 1024
+
+
+def old_format_output(files, redraws):
+    out = io.StringIO()
+    out.write("sending incremental file list\n")
+    for i in range(files):
+        out.write(f"IMG_{i:05d}.JPG\n")
+        for step in range(1, redraws + 1):
+            done = FILE_SIZE * step // redraws
+            out.write(f"\r{done:>15,} {step * 100 // redraws:>3}%   95.12MB/s    0:00:01")
+        out.write(f" (xfr#{i + 1}, to-chk={files - i - 1}/{files})\n")
+    return out.getvalue().encode()
+
+
+def new_format_output(files, redraws):
+    total = files * FILE_SIZE
+    out = io.StringIO()
+    for i in range(files):
+        for step in range(1, redraws + 1):
+            done = i * FILE_SIZE + FILE_SIZE * step // redraws
+            out.write(f"\r{done:>15,} {done * 100 // total:>3}%   95.12MB/s    0:00:01")
+        out.write(f" (xfr#{i + 1}, to-chk={files - i - 1}/{files})\n")
+        out.write(f"{OUT_FORMAT_MARKER}\t{FILE_SIZE}\t{FILE_SIZE}\tIMG_{i:05d}.JPG\n")
+    return out.getvalue().encode()
+
+
+def spawn(path, **kwargs):
+    """Start a child that writes the file at path to its stdout pipe."""
+    return subprocess.Popen(
+        [sys.executable, "-c", "import shutil, sys; shutil.copyfileobj(open(sys.argv[1], 'rb'), sys.stdout.buffer)", path],
+        stdout=subprocess.PIPE,
+        **kwargs,
+    )
+
+
+def read_char_by_char(path):
+    """The pre-parser loop: text mode, read(1), string concatenation, regex per line."""
+    progress_pattern = re.compile(r"(?P<percent>\d{1,3}(?:\.\d+)?)%")
+    process = spawn(path, universal_newlines=True, bufsize=1)
+    updates = 0
+    buffer = ""
+    start = time.process_time()
+    while True:
+        char = process.stdout.read(1)
+        if char == "":
+            break
+        if char in "\r\n":
+            if progress_pattern.search(buffer):
+                updates += 1
+            buffer = ""
+        else:
+            buffer += char
+    elapsed = time.process_time() - start
+    process.wait()
+    return elapsed, updates, 0
+
+
+def read_chunked(path):
+    process = spawn(path)
+    updates = files = 0
+    start = time.process_time()
+    for event in iter_rsync_events(process.stdout):
+        if isinstance(event, TransferProgress):
+            updates += 1
+        elif isinstance(event, FileDone):
+            files += 1
+    elapsed = time.process_time() - start
+    process.wait()
+    return elapsed, updates, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--redraws", type=int, default=20, help="progress redraws per file")
+    args = parser.parse_args()
+
+    for name, data, reader in (
+        ("char-by-char", old_format_output(args.files, args.redraws), read_char_by_char),
+        ("chunked", new_format_output(args.files, args.redraws), read_chunked),
+    ):
+        with tempfile.NamedTemporaryFile(suffix=".log") as f:
+            f.write(data)
+            f.flush()
+            cpu, updates, files = reader(f.name)
+        print(
+            f"{name:<13} {len(data) / (1024 * 1024):7.1f} MB output  {cpu:6.2f} s CPU  "
+            f"{len(data) / max(cpu, 1e-9) / (1024 * 1024):8.1f} MB/s  "
+            f"{updates} progress updates  {files} file events"
+        )
+
+
+if __name__ == "__main__":
+    main()
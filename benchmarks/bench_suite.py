@@ -0,0 +1,264 @@
+"""Run both scripts against a synthetic card under fixed configurations.
+
+Generates (or reuses) a card from synthetic_card.py, then runs each scenario
+in its own Python process with HOME pointed at the scratch folder, so caches
+start empty and peak RSS is per scenario. Results are written as JSON:
+files/s and MB/s over the whole card, CPU time, peak RSS, and syscall counts
+(read/write from /proc/self/io where available, plus metadata calls counted
+by wrapping the os functions the scripts use; DirEntry.stat and child
+processes such as rsync are not included).
+
+    python benchmarks/bench_suite.py --profile quick --output before.json
+    python benchmarks/bench_suite.py --profile quick --output after.json --compare before.json
+"""
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from synthetic_card import PROFILES, make_card  # noqa: E402
+
+SUITE_VERSION = 1
+COUNTED_CALLS = (
+    "stat",
+    "lstat",
+    "scandir",
+    "open",
+    "mkdir",
+    "utime",
+    "chmod",
+    "rename",
+    "replace",
+    "fsync",
+    "copy_file_range",
+    "sendfile",
+)
+
+# name -> (target folder shared between scenarios, start from an empty target, runner and its settings)
+SCENARIOS = {
+    "copy_group/sequential": ("local", True, "copy_group", ["--workers", "1"]),
+    "copy_group/parallel-4": ("local", True, "copy_group", ["--workers", "4"]),
+    "copy_group/parallel-4-small-first": ("local", True, "copy_group", ["--workers", "4", "--order", "small-first"]),
+    "copy_group/parallel-4-large-first": ("local", True, "copy_group", ["--workers", "4", "--order", "large-first"]),
+    "copy_group/parallel-4-by-folder": ("local", True, "copy_group", ["--workers", "4", "--order", "by-folder"]),
+    "copy_group/durability-none": ("local", True, "copy_group", ["--workers", "1", "--durability", "none"]),
+    "copy_group/durability-file": ("local", True, "copy_group", ["--workers", "1", "--durability", "file"]),
+    "copy_group/durability-batch": ("local", True, "copy_group", ["--workers", "1", "--durability", "batch"]),
+    "copy_group/rerun": ("local", False, "copy_group", ["--workers", "1"]),
+    "copy_group/rerun-full": ("local", False, "copy_group", ["--workers", "1", "--full"]),
+    "synology/grouping": (None, True, "grouping", {}),
+    "synology/per-folder": ("nas", True, "synology", {"TRANSFER_MODE": "per-folder"}),
+    "synology/single-session": ("nas", True, "synology", {"TRANSFER_MODE": "single-session"}),
+    "synology/per-folder-unverified": ("nas", True, "synology", {"TRANSFER_MODE": "per-folder", "VERIFY_UPLOADS": False}),
+    "synology/concurrent-4-small-first": ("nas", True, "synology", {"RSYNC_WORKERS": 4, "UPLOAD_ORDER": "small-first"}),
+    "synology/concurrent-4-large-first": ("nas", True, "synology", {"RSYNC_WORKERS": 4, "UPLOAD_ORDER": "large-first"}),
+    "synology/concurrent-4-by-folder": ("nas", True, "synology", {"RSYNC_WORKERS": 4, "UPLOAD_ORDER": "by-folder"}),
+    "synology/rerun": ("nas", False, "synology", {"TRANSFER_MODE": "per-folder"}),
+}
+
+
+def count_calls(counts):
+    """Wrap the os functions in COUNTED_CALLS (and open()) so each call is counted."""
+
+    def wrap(name, func):
+        def counted(*args, **kwargs):
+            counts[name] += 1
+            return func(*args, **kwargs)
+
+        return counted
+
+    for name in COUNTED_CALLS:
+        if hasattr(os, name):
+            counts[name] = 0
+            setattr(os, name, wrap(name, getattr(os, name)))
+    builtins.open = wrap("open", builtins.open)
+
+
+def proc_io():
+    """Read and write syscall counts of this process, if the kernel reports them."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return {"read": int(fields["syscr"]), "write": int(fields["syscw"])}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def run_copy_group(card_dir, target, settings):
+    import copy_group
+
+    copy_group.SDCARD_PATH = os.path.join(card_dir, "DCIM") + "/"
+    copy_group.TARGET_BASE = target + "/"
+    copy_group.main(settings)
+
+
+def run_grouping(card_dir, target, settings):
+    import copy_group_synology
+    from capture_date import CaptureDateCache
+
+    capture_dates = CaptureDateCache()
+    try:
+        copy_group_synology.collect_files_by_target_dir(os.path.join(card_dir, "DCIM"), capture_dates)
+    finally:
+        capture_dates.close()
+
+
+def run_synology(card_dir, target, settings):
+    """Full upload through the local transport (no latency, unlimited bandwidth)."""
+    import copy_group_synology
+
+    copy_group_synology.SDCARD_PATH = os.path.join(card_dir, "DCIM") + "/"
+    copy_group_synology.TRANSPORT = "local"
+    copy_group_synology.LOCAL_TRANSPORT_ROOT = target
+    copy_group_synology.LOCAL_LATENCY_MS = 0
+    copy_group_synology.LOCAL_BANDWIDTH_MB_S = 0
+    for name, value in settings.items():
+        setattr(copy_group_synology, name, value)
+    copy_group_synology.main([])
+
+
+RUNNERS = {"copy_group": run_copy_group, "grouping": run_grouping, "synology": run_synology}
+
+
+def run_child(name, card_dir, target):
+    """Run one scenario in this process and print its measurements as JSON."""
+    _, _, runner, settings = SCENARIOS[name]
+    counts = {}
+    count_calls(counts)
+    io_before = proc_io()
+    cpu_before = time.process_time()
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            RUNNERS[runner](card_dir, target, settings)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                raise
+    elapsed = time.perf_counter() - started
+    io_after = proc_io()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024  # Linux reports KB, macOS bytes
+    counts.update({key: io_after[key] - io_before[key] for key in io_after})
+    print(
+        json.dumps(
+            {
+                "seconds": elapsed,
+                "cpu_seconds": time.process_time() - cpu_before,
+                "peak_rss_mb": peak_rss / (1024 * 1024),
+                "syscalls": counts,
+            }
+        )
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {result["scenario"]: result for result in json.load(f)["results"]}
+    print(f"{'scenario':<26} {'files/s':>10} {'before':>10} {'change':>8}", file=sys.stderr)
+    for result in results:
+        before = baseline.get(result["scenario"])
+        if before is None:
+            continue
+        change = (result["files_per_s"] / before["files_per_s"] - 1) * 100
+        print(
+            f"{result['scenario']:<26} {result['files_per_s']:>10.1f} {before['files_per_s']:>10.1f} {change:>+7.1f}%",
+            file=sys.stderr,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    parser.add_argument("--dir", help="scratch folder (default: system temp); the card is kept here between runs")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare files/s against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--card", help=argparse.SUPPRESS)
+    parser.add_argument("--target", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.card, args.target)
+        return
+
+    scratch = args.dir or os.path.join(tempfile.gettempdir(), "copy_group_bench_suite")
+    card_dir = os.path.join(scratch, f"card-{args.profile}-{args.seed}")
+    print(f"🃏 Preparing {args.profile} card in {card_dir}...", file=sys.stderr)
+    card = make_card(card_dir, args.profile, args.seed)
+
+    results = []
+    home = os.path.join(scratch, "home")
+    for name in args.scenarios.split(","):
+        target_name, fresh, _, _ = SCENARIOS[name]
+        target = os.path.join(scratch, target_name or "unused")
+        if fresh:
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.rmtree(home, ignore_errors=True)
+        os.makedirs(home, exist_ok=True)
+
+        print(f"⏱️  {name}...", file=sys.stderr)
+        child = subprocess.run(
+            [sys.executable, __file__, "--child", name, "--card", card_dir, "--target", target],
+            env=dict(os.environ, HOME=home),
+            capture_output=True,
+            text=True,
+        )
+        if child.returncode != 0:
+            sys.exit(f"❌ {name} failed:\n{child.stderr}")
+        measured = json.loads(child.stdout.splitlines()[-1])
+        results.append(
+            {
+                "scenario": name,
+                "files": card["files"],
+                "bytes": card["bytes"],
+                "files_per_s": card["files"] / measured["seconds"],
+                "mb_per_s": card["bytes"] / measured["seconds"] / (1024 * 1024),
+                **measured,
+            }
+        )
+
+    report = {
+        "suite_version": SUITE_VERSION,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "card": card,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
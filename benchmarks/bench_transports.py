@@ -0,0 +1,118 @@
+"""Compare upload throughput of the Synology transports on one machine.
+
+Builds a synthetic card of random files spread over several date folders and
+uploads it with each selected transport, per folder (one mkdir and one
+upload per date folder, like the default mode) and as a single session.
+The local transport needs no NAS: it writes under a scratch folder and
+simulates the link with --latency-ms and --bandwidth. The rsync and sftp
+transports talk to --host (localhost works with sshd and rsync installed);
+their uploads go to a fresh folder under --remote-dir, which is left behind.
+
+    python benchmarks/bench_transports.py --files 300 --latency-ms 2 --bandwidth 100
+    python benchmarks/bench_transports.py --transports local,rsync-ssh,sftp --host localhost --user $USER
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transports import (  # noqa: E402
+    TRANSPORTS,
+    LocalTransport,
+    RsyncDaemonTransport,
+    RsyncSSHTransport,
+    SFTPTransport,
+)
+
+
+def make_card(card_dir, files, size_kb, folders):
+    """Create random files and assign them round-robin to date folders."""
+    os.makedirs(card_dir, exist_ok=True)
+    items = []
+    for i in range(files):
+        path = os.path.join(card_dir, f"IMG_{i:05d}.JPG")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+        items.append((path, f"2024/202401{1 + i % folders:02d}/IMG_{i:05d}.JPG"))
+    return items
+
+
+def create(name, args, scratch):
+    if name == "local":
+        return LocalTransport(os.path.join(scratch, "nas"), args.latency_ms / 1000, args.bandwidth * 1024 * 1024)
+    if name == "rsync-ssh":
+        return RsyncSSHTransport(args.host, args.user, args.port)
+    if name == "rsync-daemon":
+        return RsyncDaemonTransport(args.host, args.daemon_module, args.remote_dir, args.user, args.daemon_port)
+    return SFTPTransport(args.host, args.user, args.port)
+
+
+def run(transport, items, base_path, single_session):
+    started = time.perf_counter()
+    if single_session:
+        transport.make_dirs(sorted({base_path + os.path.dirname(rel) for _, rel in items}))
+        outcomes = [transport.upload(items, base_path)]
+    else:
+        by_folder = {}
+        for item in items:
+            by_folder.setdefault(os.path.dirname(item[1]), []).append(item)
+        outcomes = []
+        for folder, folder_items in sorted(by_folder.items()):
+            transport.make_dirs([base_path + folder])
+            outcomes.append(transport.upload(folder_items, base_path))
+    elapsed = time.perf_counter() - started
+    failed = sum(len(outcome.failed) for outcome in outcomes)
+    sent = sum(len(outcome.done) for outcome in outcomes)
+    return elapsed, sent, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transports", default="local", help=f"comma-separated, from {', '.join(TRANSPORTS)}")
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--size-kb", type=int, default=1024)
+    parser.add_argument("--folders", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="local transport round trip")
+    parser.add_argument("--bandwidth", type=float, default=0, help="local transport MB/s (0 = unlimited)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default=os.environ.get("USER", ""))
+    parser.add_argument("--port", type=int, default=22)
+    parser.add_argument("--remote-dir", default="/tmp/copy_group_bench/", help="remote base (daemon: module path)")
+    parser.add_argument("--daemon-module", default="bench")
+    parser.add_argument("--daemon-port", type=int, default=873)
+    parser.add_argument("--dir", help="scratch folder (default: system temp)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="copy_group_bench_", dir=args.dir)
+    try:
+        items = make_card(os.path.join(scratch, "card"), args.files, args.size_kb, args.folders)
+        total_mb = args.files * args.size_kb / 1024
+        print(f"{args.files} files, {total_mb:.0f} MB in {args.folders} date folders")
+        print(f"{'transport':<14} {'mode':<15} {'s':>8} {'files/s':>9} {'MB/s':>8} {'failed':>7}")
+
+        for name in args.transports.split(","):
+            transport = create(name, args, scratch)
+            if not transport.check():
+                print(f"{name:<14} unavailable")
+                continue
+            try:
+                for single_session in (False, True):
+                    base_path = os.path.join(args.remote_dir, f"run_{time.time_ns()}") + "/"
+                    elapsed, sent, failed = run(transport, items, base_path, single_session)
+                    mode = "single-session" if single_session else "per-folder"
+                    print(
+                        f"{name:<14} {mode:<15} {elapsed:>8.2f} {sent / elapsed:>9.1f} "
+                        f"{total_mb * sent / args.files / elapsed:>8.1f} {failed:>7}"
+                    )
+            finally:
+                transport.close()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
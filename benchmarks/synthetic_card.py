@@ -0,0 +1,212 @@
+"""Generate a reproducible synthetic SD card for benchmarks.
+
+The card follows a camera's DCIM layout: numbered folders of up to 999
+files holding small JPEGs, RAW+JPEG pairs (DNG next to a JPG with the same
+stem) and large MOVs, with capture dates (Exif DateTimeOriginal, QuickTime
+mvhd) spread over many days. macOS and camera clutter is mixed in as hidden
+files (._AppleDouble files, .DS_Store, .Trashes) that the scripts must skip.
+The same profile and seed always produce the same file names, sizes, dates
+and contents.
+
+    python benchmarks/synthetic_card.py /tmp/card --profile quick
+    python benchmarks/synthetic_card.py /Volumes/BENCH --profile realistic --seed 7
+"""
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture_date import QUICKTIME_EPOCH_OFFSET  # noqa: E402
+
+FILES_PER_FOLDER = 999
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Sizes in KB; MOVs in MB. "realistic" is close to a day's shoot on a 64 GB card.
+PROFILES = {
+    "quick": {
+        "jpegs": 1000,
+        "jpeg_kb": (48, 256),
+        "dng_pairs": 60,
+        "dng_kb": (1024, 3072),
+        "movs": 2,
+        "mov_mb": (32, 64),
+        "days": 40,
+        "hidden": 40,
+    },
+    "default": {
+        "jpegs": 4000,
+        "jpeg_kb": (256, 1024),
+        "dng_pairs": 300,
+        "dng_kb": (8192, 16384),
+        "movs": 3,
+        "mov_mb": (256, 512),
+        "days": 120,
+        "hidden": 200,
+    },
+    "realistic": {
+        "jpegs": 6000,
+        "jpeg_kb": (2048, 6144),
+        "dng_pairs": 800,
+        "dng_kb": (20480, 30720),
+        "movs": 4,
+        "mov_mb": (2048, 4096),
+        "days": 365,
+        "hidden": 500,
+    },
+}
+
+
+def tiff_block(moment):
+    """Little-endian TIFF with IFD0 -> Exif IFD -> DateTimeOriginal."""
+    date = moment.strftime("%Y:%m:%d %H:%M:%S").encode() + b"\0"
+    ifd0_offset = 8
+    exif_offset = ifd0_offset + 2 + 12 + 4
+    date_offset = exif_offset + 2 + 12 + 4
+    data = b"II*\0" + struct.pack("<I", ifd0_offset)
+    data += struct.pack("<H", 1) + struct.pack("<HHII", 0x8769, 4, 1, exif_offset) + b"\0\0\0\0"
+    data += struct.pack("<H", 1) + struct.pack("<HHII", 0x9003, 2, len(date), date_offset) + b"\0\0\0\0"
+    return data + date
+
+
+def write_payload(f, size, block, rng):
+    """Write size bytes taken from the shared random block at a seeded offset."""
+    offset = rng.randrange(len(block))
+    while size > 0:
+        chunk = block[offset : offset + size]
+        f.write(chunk)
+        size -= len(chunk)
+        offset = 0
+
+
+def write_jpeg(path, moment, size, block, rng):
+    app1 = b"Exif\0\0" + tiff_block(moment)
+    with open(path, "wb") as f:
+        f.write(b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1)
+        f.write(b"\xff\xda" + struct.pack(">H", 2))
+        write_payload(f, size, block, rng)
+        f.write(b"\xff\xd9")
+
+
+def write_dng(path, moment, size, block, rng):
+    with open(path, "wb") as f:
+        f.write(tiff_block(moment))
+        write_payload(f, size, block, rng)
+
+
+def write_mov(path, moment, size, block, rng):
+    """QuickTime file with the moov/mvhd atom after the media data, as cameras write it."""
+    created = int(moment.timestamp()) + QUICKTIME_EPOCH_OFFSET
+    mvhd_body = b"\0\0\0\0" + struct.pack(">II", created, created) + b"\0" * 88
+    mvhd = struct.pack(">I4s", 8 + len(mvhd_body), b"mvhd") + mvhd_body
+    moov = struct.pack(">I4s", 8 + len(mvhd), b"moov") + mvhd
+    with open(path, "wb") as f:
+        f.write(struct.pack(">I4s4sI", 16, b"ftyp", b"qt  ", 0))
+        f.write(struct.pack(">I4s", 8 + size, b"mdat"))
+        write_payload(f, size, block, rng)
+        f.write(moov)
+
+
+def plan_card(profile, seed=0):
+    """Return the card's files as (relative path, kind, size in bytes, capture datetime)."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    shots = []
+    for _ in range(profile["jpegs"]):
+        shots.append(("jpeg", rng.randint(*profile["jpeg_kb"]) * 1024))
+    for _ in range(profile["dng_pairs"]):
+        shots.append(("pair", rng.randint(*profile["dng_kb"]) * 1024))
+    for _ in range(profile["movs"]):
+        shots.append(("mov", rng.randint(*profile["mov_mb"]) * 1024 * 1024))
+    rng.shuffle(shots)
+
+    # Shots are in time order across the days, as on a real card
+    days = profile["days"]
+    planned = []
+    number = 0
+    for index, (kind, size) in enumerate(shots):
+        day = index * days // len(shots)
+        moment = start + timedelta(days=day, seconds=rng.randrange(12 * 3600))
+        names = [("JPG", "jpeg", size)] if kind == "jpeg" else [("MOV", "mov", size)]
+        if kind == "pair":
+            names = [("DNG", "dng", size), ("JPG", "jpeg", size // 6)]
+        for extension, file_kind, file_size in names:
+            folder = f"{100 + number // FILES_PER_FOLDER}CANON"
+            planned.append((f"DCIM/{folder}/IMG_{number % 10000:04d}.{extension}", file_kind, file_size, moment))
+        number += 1
+    return planned
+
+
+def make_card(card_dir, profile="quick", seed=0, overrides=None):
+    """Write the synthetic card and return its summary (also saved as .card.json).
+
+    A card already generated with the same settings is reused.
+    """
+    settings = dict(PROFILES[profile], **(overrides or {}))
+    summary_path = os.path.join(card_dir, ".card.json")
+    key = {"profile": profile, "seed": seed, "settings": settings}
+    try:
+        with open(summary_path, encoding="utf-8") as f:
+            summary = json.load(f)
+        if summary["key"] == json.loads(json.dumps(key)):
+            return summary
+    except (OSError, ValueError, KeyError):
+        pass
+
+    rng = random.Random(seed)
+    block = rng.randbytes(BLOCK_SIZE)
+    writers = {"jpeg": write_jpeg, "dng": write_dng, "mov": write_mov}
+    planned = plan_card(settings, seed)
+    folders = set()
+    for relative_path, kind, size, moment in planned:
+        path = os.path.join(card_dir, relative_path)
+        if os.path.dirname(path) not in folders:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            folders.add(os.path.dirname(path))
+        writers[kind](path, moment, size, block, rng)
+        os.utime(path, (moment.timestamp(), moment.timestamp()))
+
+    hidden = 0
+    for relative_path, _, _, _ in planned[: settings["hidden"]]:
+        folder, name = os.path.split(os.path.join(card_dir, relative_path))
+        with open(os.path.join(folder, f"._{name}"), "wb") as f:
+            f.write(b"\0\5\26\7" + bytes(4092))  # AppleDouble header
+        hidden += 1
+    for folder in sorted(folders):
+        with open(os.path.join(folder, ".DS_Store"), "wb") as f:
+            f.write(bytes(6148))
+        hidden += 1
+    os.makedirs(os.path.join(card_dir, ".Trashes"), exist_ok=True)
+
+    summary = {
+        "key": key,
+        "files": len(planned),
+        "bytes": sum(os.path.getsize(os.path.join(card_dir, path)) for path, _, _, _ in planned),
+        "hidden_files": hidden,
+        "folders": len(folders),
+        "dates": len({moment.date() for _, _, _, moment in planned}),
+        "by_kind": {kind: sum(1 for _, k, _, _ in planned if k == kind) for kind in writers},
+    }
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("card_dir")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = make_card(args.card_dir, args.profile, args.seed)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import os
+import sqlite3
+import struct
+import threading
+from datetime import datetime
+
+from file_records import creation_time_from_stat
+from run_metrics import METRICS
+
+TIFF_EXTENSIONS = {".dng", ".tif", ".tiff", ".nef", ".nrw", ".arw", ".cr2", ".orf", ".rw2", ".pef"}
+JPEG_EXTENSIONS = {".jpg", ".jpeg"}
+QUICKTIME_EXTENSIONS = {".mov", ".mp4", ".m4v", ".3gp", ".cr3"}
+
+CAPTURE_DATE_CACHE = os.path.expanduser("~/.cache/copy_group/capture_dates.sqlite3")
+
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+MAX_IFD_ENTRIES = 512
+MAX_APP1_SIZE = 0xFFFF
+QUICKTIME_EPOCH_OFFSET = 2082844800  # seconds from 1904-01-01 to 1970-01-01
+MAX_TOP_LEVEL_ATOMS = 64
+
+
+def parse_exif_datetime(value):
+    """Turn an EXIF 'YYYY:MM:DD HH:MM:SS' string into a local timestamp."""
+    text = value.split(b"\0", 1)[0].decode("ascii", "replace").strip()
+    try:
+        return datetime.strptime(text[:19], "%Y:%m:%d %H:%M:%S").timestamp()
+    except ValueError:
+        return None
+
+
+def read_tiff_datetime(f, base=0):
+    """Read DateTimeOriginal (or DateTime) from a TIFF structure starting at base."""
+    f.seek(base)
+    header = f.read(8)
+    if len(header) < 8 or header[:2] not in (b"II", b"MM"):
+        return None
+    endian = "<" if header[:2] == b"II" else ">"
+    ifd_offset = struct.unpack(endian + "I", header[4:8])[0]
+
+    def read_ifd(offset):
+        f.seek(base + offset)
+        raw_count = f.read(2)
+        if len(raw_count) < 2:
+            return {}
+        count = struct.unpack(endian + "H", raw_count)[0]
+        if count > MAX_IFD_ENTRIES:
+            return {}
+        data = f.read(12 * count)
+        entries = {}
+        for i in range(len(data) // 12):
+            tag, kind, n, value = struct.unpack(endian + "HHI4s", data[i * 12 : i * 12 + 12])
+            entries[tag] = (kind, n, value)
+        return entries
+
+    def read_ascii(entry):
+        kind, n, value = entry
+        if kind != 2:
+            return None
+        if n <= 4:
+            return parse_exif_datetime(value[:n])
+        f.seek(base + struct.unpack(endian + "I", value)[0])
+        return parse_exif_datetime(f.read(min(n, 64)))
+
+    ifd0 = read_ifd(ifd_offset)
+    if TAG_EXIF_IFD in ifd0:
+        exif_offset = struct.unpack(endian + "I", ifd0[TAG_EXIF_IFD][2])[0]
+        exif_ifd = read_ifd(exif_offset)
+        for tag in (TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED):
+            if tag in exif_ifd:
+                timestamp = read_ascii(exif_ifd[tag])
+                if timestamp is not None:
+                    return timestamp
+
+    if TAG_DATETIME in ifd0:
+        return read_ascii(ifd0[TAG_DATETIME])
+    return None
+
+
+def read_jpeg_datetime(f):
+    """Walk JPEG markers up to the first Exif APP1 segment and parse it."""
+    if f.read(2) != b"\xff\xd8":
+        return None
+
+    while True:
+        marker = f.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            return None
+        kind = marker[1]
+        length = struct.unpack(">H", marker[2:4])[0]
+        if kind == 0xDA or length < 2:  # start of scan: no metadata beyond this point
+            return None
+        if kind == 0xE1:
+            start = f.tell()
+            if f.read(6) == b"Exif\0\0":
+                return read_tiff_datetime(f, start + 6)
+            f.seek(start)
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def read_quicktime_datetime(f):
+    """Find moov/mvhd by skipping atom headers and read its creation time."""
+
+    def atoms(end):
+        for _ in range(MAX_TOP_LEVEL_ATOMS):
+            start = f.tell()
+            if end is not None and start + 8 > end:
+                return
+            header = f.read(8)
+            if len(header) < 8:
+                return
+            size, kind = struct.unpack(">I4s", header)
+            header_size = 8
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+                header_size = 16
+            elif size == 0:
+                yield kind, start + header_size, None
+                return
+            if size < header_size:
+                return
+            yield kind, start + header_size, start + size
+            f.seek(start + size)
+
+    for kind, body, end in atoms(None):
+        if kind != b"moov":
+            continue
+        f.seek(body)
+        for child, child_body, _ in atoms(end):
+            if child != b"mvhd":
+                continue
+            f.seek(child_body)
+            version = f.read(4)[:1]
+            if version == b"\x01":
+                created = struct.unpack(">Q", f.read(8))[0]
+            else:
+                created = struct.unpack(">I", f.read(4))[0]
+            if created <= QUICKTIME_EPOCH_OFFSET:
+                return None
+            return float(created - QUICKTIME_EPOCH_OFFSET)
+        return None
+    return None
+
+
+def read_capture_time(path):
+    """Return the capture timestamp stored in a file's header, or None.
+
+    Only the metadata header is read: the TIFF IFDs of DNG/raw files, the
+    Exif APP1 segment of JPEGs, and the mvhd atom of QuickTime/MP4 files.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in JPEG_EXTENSIONS:
+        reader = read_jpeg_datetime
+    elif extension in TIFF_EXTENSIONS:
+        reader = read_tiff_datetime
+    elif extension in QUICKTIME_EXTENSIONS:
+        reader = read_quicktime_datetime
+    else:
+        return None
+
+    try:
+        with open(path, "rb", buffering=4096) as f:
+            return reader(f)
+    except (OSError, struct.error, ValueError, OverflowError):
+        return None
+
+
+class CaptureDateCache:
+    """SQLite cache of capture dates keyed by (path, size, mtime).
+
+    Files without a readable capture date are cached too, so a rescan of an
+    unchanged card opens no files at all. Safe to use from the scanner thread.
+    """
+
+    def __init__(self, path=CAPTURE_DATE_CACHE):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS capture_dates (
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                capture_time REAL,
+                PRIMARY KEY (path, size, mtime_ns)
+            )
+            """
+        )
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    def capture_time(self, path, stat):
+        """Return the capture timestamp for a file, reading its header on a miss."""
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT capture_time FROM capture_dates WHERE path = ? AND size = ? AND mtime_ns = ?", key
+            ).fetchone()
+        if row is not None:
+            self.hits += 1
+            return row[0]
+
+        self.misses += 1
+        timestamp = read_capture_time(path)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO capture_dates VALUES (?, ?, ?, ?)", key + (timestamp,))
+            self.pending += 1
+            if self.pending >= 200:
+                self.conn.commit()
+                self.pending = 0
+        return timestamp
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+def resolve_file_time(record, capture_dates=None):
+    """Capture date from the file header when known, else the filesystem time."""
+    if capture_dates is not None:
+        with METRICS.phase("date", record.src_path):
+            timestamp = capture_dates.capture_time(record.src_path, record.stat)
+        if timestamp is not None:
+            return timestamp
+    return creation_time_from_stat(record.stat)
@@ -0,0 +1,180 @@
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+CARD_MARKS_CACHE = os.path.expanduser("~/.cache/copy_group/card_marks.sqlite3")
+CARD_ID_FILENAME = ".copy_group_card_id"
+
+# DCF layout: DCIM/100CANON/IMG_1234.JPG -> folder 100, file 1234
+DCF_FOLDER = re.compile(r"^([1-9]\d\d)")
+DCF_FILE = re.compile(r"(\d{4})\.[^.]*$")
+
+
+def card_root(source):
+    """The volume folder of a card: the parent of its DCIM folder, or source itself."""
+    path = os.path.normpath(source)
+    if os.path.basename(path).upper() == "DCIM":
+        return os.path.dirname(path)
+    return path
+
+
+def volume_uuid(mount_point):
+    """Filesystem UUID of a mounted volume, or None if it cannot be found."""
+    if sys.platform == "darwin":
+        try:
+            output = subprocess.run(
+                ["diskutil", "info", mount_point], capture_output=True, text=True, timeout=10
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        for line in output.splitlines():
+            name, _, value = line.partition(":")
+            if name.strip() in ("Volume UUID", "Disk / Partition UUID") and value.strip():
+                return value.strip()
+        return None
+
+    by_uuid = "/dev/disk/by-uuid"
+    try:
+        device = os.stat(mount_point).st_dev
+        for name in os.listdir(by_uuid):
+            if os.stat(os.path.join(by_uuid, name)).st_rdev == device:
+                return name
+    except OSError:
+        pass
+    return None
+
+
+def card_identity(source):
+    """Return a stable id for the card holding source, or None.
+
+    Mounted volumes are identified by their filesystem UUID, which changes
+    when the card is formatted. Otherwise (or where the UUID is not
+    available) a hidden CARD_ID_FILENAME at the card root holds a random id,
+    written on first use; a read-only card without one has no identity.
+    """
+    root = card_root(source)
+    if os.path.ismount(root):
+        found = volume_uuid(root)
+        if found:
+            return f"uuid:{found}"
+
+    marker = os.path.join(root, CARD_ID_FILENAME)
+    try:
+        with open(marker, encoding="ascii") as f:
+            card_id = f.read().strip()
+        if card_id:
+            return f"marker:{card_id}"
+    except (OSError, ValueError):
+        pass
+    card_id = uuid.uuid4().hex
+    try:
+        with open(marker, "x", encoding="ascii") as f:
+            f.write(card_id + "\n")
+    except OSError:
+        return None
+    return f"marker:{card_id}"
+
+
+def dcf_folder_number(name):
+    """DCF number of a DCIM subfolder name (100-999), or None."""
+    match = DCF_FOLDER.match(name)
+    return int(match.group(1)) if match else None
+
+
+def dcf_file_number(name):
+    """Four-digit DCF number at the end of a file name, or None."""
+    match = DCF_FILE.search(name)
+    return int(match.group(1)) if match else None
+
+
+class HighWaterMark:
+    """The newest DCIM folder/file number and mtime ingested from one card.
+
+    A file is new when its (folder, file) number is above the mark or its
+    mtime is newer, wherever it sits: a camera reset or a second body can
+    write new files into a folder numbered below the mark. Files without
+    DCF numbers are judged by mtime alone.
+    """
+
+    __slots__ = ("folder", "file", "mtime_ns")
+
+    def __init__(self, folder=0, file=0, mtime_ns=0):
+        self.folder = folder
+        self.file = file
+        self.mtime_ns = mtime_ns
+
+    def is_new(self, record):
+        """True if a scanned FileRecord was not ingested yet."""
+        if record.stat.st_mtime_ns > self.mtime_ns:
+            return True
+        number = dcf_file_number(record.name)
+        if record.dcf_folder is None or number is None:
+            return False
+        return (record.dcf_folder, number) > (self.folder, self.file)
+
+    def advance(self, record):
+        """Raise the mark to cover a FileRecord that was ingested."""
+        self.mtime_ns = max(self.mtime_ns, record.stat.st_mtime_ns)
+        number = dcf_file_number(record.name)
+        if record.dcf_folder is not None and number is not None and (record.dcf_folder, number) > (self.folder, self.file):
+            self.folder, self.file = record.dcf_folder, number
+
+    def copy(self):
+        return HighWaterMark(self.folder, self.file, self.mtime_ns)
+
+    def __repr__(self):
+        return f"HighWaterMark({self.folder:03d}/{self.file:04d}, mtime_ns={self.mtime_ns})"
+
+
+class CardMarks:
+    """SQLite record of the high-water mark of each card, per destination.
+
+    Safe to share between the reader threads of a multi-card run.
+    """
+
+    def __init__(self, path=CARD_MARKS_CACHE):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS marks (
+                card_id TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                folder INTEGER NOT NULL,
+                file INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (card_id, destination)
+            )
+            """
+        )
+
+    def load(self, card_id, destination):
+        """Return the stored HighWaterMark, or None if the card was never ingested there."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT folder, file, mtime_ns FROM marks WHERE card_id = ? AND destination = ?",
+                (card_id, destination),
+            ).fetchone()
+        return HighWaterMark(*row) if row else None
+
+    def save(self, card_id, destination, mark):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO marks (card_id, destination, folder, file, mtime_ns, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (card_id, destination, mark.folder, mark.file, mark.mtime_ns, datetime.now().isoformat(timespec="seconds")),
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
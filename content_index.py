@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+
+from file_compare import hash_path, hash_sample
+from run_metrics import METRICS
+
+CONTENT_INDEX_FILENAME = ".copy_group_content.sqlite3"
+COMMIT_EVERY = 200
+
+
+def walk_archive(target_base):
+    """Yield (path, stat) for every non-hidden file under target_base, skipping hidden folders."""
+    stack = [target_base]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as scanner:
+                entries = list(scanner)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.stat()
+            except OSError:
+                continue
+
+
+class ContentIndex:
+    """SQLite index of every file in the archive by size and content.
+
+    Entries are keyed by path and hold the size and mtime seen when the file
+    was indexed. The head+tail sample hash and the full checksum are filled
+    in lazily, only when a source file of the same size is looked up, so
+    indexing an existing archive costs one stat per file and a lookup for a
+    file of a new size costs nothing. Entries whose file has changed or
+    gone are dropped when a lookup meets them. Safe to share between the
+    reader threads of a multi-card run.
+    """
+
+    def __init__(self, target_base, algorithm="blake2b", filename=CONTENT_INDEX_FILENAME):
+        self.target_base = target_base
+        self.algorithm = algorithm
+        self.path = os.path.join(target_base, filename)
+        self.is_new = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sample TEXT,
+                checksum TEXT,
+                algorithm TEXT
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_by_size ON files (size, sample)")
+        self.pending = 0
+
+    def rebuild(self):
+        """Index every file under target_base by stat alone; returns the number indexed."""
+        with self.lock:
+            known = {
+                path: (size, mtime_ns)
+                for path, size, mtime_ns in self.conn.execute("SELECT path, size, mtime_ns FROM files")
+            }
+        seen = 0
+        for path, stat in walk_archive(self.target_base):
+            seen += 1
+            if known.pop(path, None) != (stat.st_size, stat.st_mtime_ns):
+                self.add(path, stat)
+        with self.lock:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in known))
+        self.commit()
+        return seen
+
+    def add(self, path, stat, checksum=None):
+        """Record a file now in the archive, with its full checksum if already known."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, sample, checksum, algorithm) VALUES (?, ?, ?, NULL, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, checksum, self.algorithm if checksum else None),
+            )
+            self.pending += 1
+            if self.pending >= COMMIT_EVERY:
+                self.conn.commit()
+                self.pending = 0
+
+    def _fill(self, path, column, value):
+        with self.lock:
+            if column == "checksum":
+                self.conn.execute(
+                    "UPDATE files SET checksum = ?, algorithm = ? WHERE path = ?", (value, self.algorithm, path)
+                )
+            else:
+                self.conn.execute("UPDATE files SET sample = ? WHERE path = ?", (value, path))
+
+    def _drop(self, path):
+        with self.lock:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def has_size(self, size):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM files WHERE size = ? LIMIT 1", (size,)).fetchone() is not None
+
+    def find_duplicate(self, src_path, src_stat, exclude=()):
+        """Return (archive path, checksum) of a file with the same content as src_path, or (None, None).
+
+        Candidates must match the size, then the head+tail sample, then the
+        full checksum, each computed at most once per file.
+        """
+        size = src_stat.st_size
+        if not self.has_size(size):
+            return None, None
+
+        with METRICS.phase("dedup", src_path) as phase:
+            path, checksum, phase.nbytes = self._match(src_path, size, exclude)
+        return path, checksum
+
+    def _match(self, src_path, size, exclude):
+        """find_duplicate without the metrics; also returns the bytes hashed in full."""
+        src_sample = hash_sample(src_path, size, self.algorithm)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, mtime_ns, sample, checksum, algorithm FROM files WHERE size = ?", (size,)
+            ).fetchall()
+        src_checksum = None
+        hashed = 0
+        for path, mtime_ns, sample, checksum, algorithm in rows:
+            if path in exclude:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._drop(path)
+                continue
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                self._drop(path)
+                continue
+            if sample is None:
+                sample = hash_sample(path, size, self.algorithm)
+                self._fill(path, "sample", sample)
+            if sample != src_sample:
+                continue
+            if checksum is None or algorithm != self.algorithm:
+                checksum = hash_path(path, self.algorithm)
+                hashed += size
+                self._fill(path, "checksum", checksum)
+            if src_checksum is None:
+                src_checksum = hash_path(src_path, self.algorithm)
+                hashed += size
+            if checksum == src_checksum:
+                return path, src_checksum, hashed
+        return None, None, hashed
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        self.commit()
+        with self.lock:
+            self.conn.close()
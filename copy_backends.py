@@ -0,0 +1,308 @@
+import errno
+import os
+import queue
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+COPY_BACKENDS = ("auto", "reflink", "copy_file_range", "sendfile", "readinto", "pipelined", "python")
+KERNEL_BACKENDS = ("reflink", "copy_file_range", "sendfile")
+
+SLICE_SIZE = 8 * 1024 * 1024  # bytes handed to the kernel per call
+BUFFER_SIZE = 1024 * 1024  # reusable buffer for the readinto fallback
+LEGACY_CHUNK_SIZE = 8192  # original 8KB read/write loop
+RING_BUFFERS = 4  # buffers shared by the reader and writer threads of the pipelined backend
+MIN_BLOCK_SIZE = 256 * 1024  # adaptive block size bounds for the pipelined backend
+MAX_BLOCK_SIZE = 8 * 1024 * 1024
+TARGET_READ_SECONDS = 0.05  # the pipelined reader sizes blocks to take about this long
+DROP_CACHE_BYTES = 64 * 1024 * 1024  # pipelined copies drop cached pages behind them this often
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+# Errors that mean "this mechanism is not available here", not "the copy failed"
+FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.ENOTSOCK,
+}
+
+
+def _report(on_progress, copied):
+    if on_progress is not None:
+        on_progress(copied)
+
+
+def copy_reflink(src_file, dst_file, on_progress=None):
+    """Clone the source extents into the destination (Btrfs, XFS, ...)."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform")
+
+    fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    size = os.fstat(src_file.fileno()).st_size
+    _report(on_progress, size)
+    return size
+
+
+def copy_range(src_file, dst_file, on_progress=None, slice_size=SLICE_SIZE):
+    """Copy with os.copy_file_range so data never enters user space."""
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.ENOSYS, "os.copy_file_range is not available")
+
+    src_fd, dst_fd = src_file.fileno(), dst_file.fileno()
+    copied = 0
+    while True:
+        sent = os.copy_file_range(src_fd, dst_fd, slice_size)
+        if sent == 0:
+            break
+        copied += sent
+        _report(on_progress, copied)
+    return copied
+
+
+def copy_sendfile(src_file, dst_file, on_progress=None, slice_size=SLICE_SIZE, offset=0):
+    """Copy with os.sendfile (file-to-file works on Linux), starting at offset in the source."""
+    if not hasattr(os, "sendfile"):
+        raise OSError(errno.ENOSYS, "os.sendfile is not available")
+
+    src_fd, dst_fd = src_file.fileno(), dst_file.fileno()
+    copied = 0
+    while True:
+        sent = os.sendfile(dst_fd, src_fd, offset + copied, slice_size)
+        if sent == 0:
+            break
+        copied += sent
+        _report(on_progress, copied)
+    return copied
+
+
+def copy_readinto(src_file, dst_file, on_progress=None, hasher=None, buffer_size=BUFFER_SIZE):
+    """Copy through one reused buffer instead of a new bytes object per chunk."""
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    copied = 0
+    while True:
+        read = src_file.readinto(buffer)
+        if not read:
+            break
+        chunk = view[:read]
+        dst_file.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+        copied += read
+        _report(on_progress, copied)
+    return copied
+
+
+def _advise(fd, offset, length, advice):
+    """posix_fadvise where the platform has it; the hints are best effort."""
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError:
+            pass
+
+
+def next_block_size(block_size, nbytes, seconds):
+    """Grow or shrink the read block so one read takes about TARGET_READ_SECONDS."""
+    if seconds <= 0:
+        return MAX_BLOCK_SIZE
+    wanted = nbytes / seconds * TARGET_READ_SECONDS
+    if wanted > block_size * 2:
+        block_size *= 2
+    elif wanted < block_size / 2:
+        block_size //= 2
+    return min(max(block_size, MIN_BLOCK_SIZE), MAX_BLOCK_SIZE)
+
+
+def copy_pipelined(src_file, dst_file, on_progress=None, hasher=None, buffers=RING_BUFFERS):
+    """Overlap card reads with destination writes through a ring of reused buffers.
+
+    A reader thread fills the buffers and hashes each block, the calling
+    thread writes them out, so the card and the destination work at the same
+    time. The block size follows the measured read throughput between
+    MIN_BLOCK_SIZE and MAX_BLOCK_SIZE. The source is read with
+    POSIX_FADV_SEQUENTIAL, and pages already copied are dropped from the
+    page cache (POSIX_FADV_DONTNEED) every DROP_CACHE_BYTES, so a multi-GB
+    clip does not evict everything else.
+    """
+    src_fd, dst_fd = src_file.fileno(), dst_file.fileno()
+    src_start, dst_start = src_file.tell(), dst_file.tell()
+    _advise(src_fd, src_start, 0, "POSIX_FADV_SEQUENTIAL")
+
+    ring = [bytearray(MAX_BLOCK_SIZE) for _ in range(buffers)]
+    free = queue.Queue()
+    for buffer in ring:
+        free.put(buffer)
+    filled = queue.Queue()
+    stop = threading.Event()
+
+    def read_blocks():
+        block_size = BUFFER_SIZE
+        try:
+            while not stop.is_set():
+                buffer = free.get()
+                if buffer is None:
+                    break
+                view = memoryview(buffer)[:block_size]
+                started = time.perf_counter()
+                read = src_file.readinto(view)
+                if not read:
+                    break
+                block_size = next_block_size(block_size, read, time.perf_counter() - started)
+                if hasher is not None:
+                    hasher.update(view[:read])
+                filled.put((buffer, read))
+            filled.put(None)
+        except BaseException as e:
+            filled.put(e)
+
+    reader = threading.Thread(target=read_blocks, name="copy-reader", daemon=True)
+    reader.start()
+    copied = dropped = 0
+    try:
+        while True:
+            item = filled.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            buffer, read = item
+            dst_file.write(memoryview(buffer)[:read])
+            free.put(buffer)
+            copied += read
+            if copied - dropped >= DROP_CACHE_BYTES:
+                # Written pages still dirty are skipped by the kernel; earlier ranges are clean by now
+                _advise(src_fd, src_start + dropped, copied - dropped, "POSIX_FADV_DONTNEED")
+                if dropped:
+                    _advise(dst_fd, dst_start, dropped, "POSIX_FADV_DONTNEED")
+                dropped = copied
+            _report(on_progress, copied)
+    finally:
+        stop.set()
+        free.put(None)
+        reader.join()
+    if copied:
+        _advise(src_fd, src_start, copied, "POSIX_FADV_DONTNEED")
+    return copied
+
+
+def copy_python(src_file, dst_file, on_progress=None, hasher=None, chunk_size=LEGACY_CHUNK_SIZE):
+    """The original 8KB read/write loop, kept for comparison."""
+    copied = 0
+    while True:
+        chunk = src_file.read(chunk_size)
+        if not chunk:
+            break
+        dst_file.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+        copied += len(chunk)
+        _report(on_progress, copied)
+    return copied
+
+
+def hash_file(file_obj, hasher, buffer_size=BUFFER_SIZE):
+    """Feed an open file into hasher from the start; returns the bytes read."""
+    file_obj.seek(0)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    total = 0
+    while True:
+        read = file_obj.readinto(buffer)
+        if not read:
+            break
+        hasher.update(view[:read])
+        total += read
+    return total
+
+
+def hash_prefix(file_obj, hasher, length, buffer_size=BUFFER_SIZE):
+    """Feed the first length bytes of an open file into hasher, leaving it positioned at length."""
+    file_obj.seek(0)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    remaining = length
+    while remaining > 0:
+        read = file_obj.readinto(view[: min(buffer_size, remaining)])
+        if not read:
+            break
+        hasher.update(view[:read])
+        remaining -= read
+    file_obj.seek(length)
+
+
+def _rewind(src_file, dst_file, offset=0):
+    src_file.seek(offset)
+    dst_file.seek(offset)
+    dst_file.truncate()
+
+
+def copy_contents(src_file, dst_file, backend="auto", hasher=None, on_progress=None, offset=0):
+    """Copy between two open binary files and return (bytes in destination, backend used).
+
+    "auto" streams through readinto when a hasher needs to see the bytes, and
+    otherwise tries reflink, copy_file_range and sendfile in turn before
+    falling back to readinto. An explicitly chosen kernel backend still falls
+    back when the filesystem refuses it; if a hasher was given, the finished
+    destination is hashed afterwards since the bytes never passed through
+    Python.
+
+    With offset, the destination already holds the first offset bytes of the
+    source (a resumed copy): copying continues from there, on_progress counts
+    from offset, and a streaming hasher is first fed the bytes already in the
+    destination, which must then be readable. Reflink is skipped, as it
+    clones whole files.
+    """
+    if backend not in COPY_BACKENDS:
+        raise ValueError(f"Unknown copy backend: {backend}")
+
+    if offset:
+        _rewind(src_file, dst_file, offset)
+        if on_progress is not None:
+            report = on_progress
+            on_progress = lambda copied: report(offset + copied)  # noqa: E731
+
+    if backend in ("python", "readinto", "pipelined") or (backend == "auto" and hasher is not None):
+        if hasher is not None and offset:
+            hash_prefix(dst_file, hasher, offset)
+        if backend == "python":
+            return offset + copy_python(src_file, dst_file, on_progress, hasher), backend
+        if backend == "pipelined":
+            return offset + copy_pipelined(src_file, dst_file, on_progress, hasher), backend
+        return offset + copy_readinto(src_file, dst_file, on_progress, hasher), "readinto"
+
+    candidates = KERNEL_BACKENDS if backend == "auto" else (backend,)
+    if offset:
+        candidates = tuple(name for name in candidates if name != "reflink")
+    copiers = {
+        "reflink": copy_reflink,
+        "copy_file_range": copy_range,
+        "sendfile": lambda src, dst, progress: copy_sendfile(src, dst, progress, offset=offset),
+    }
+
+    for name in candidates:
+        try:
+            copied = copiers[name](src_file, dst_file, on_progress)
+        except OSError as e:
+            if e.errno not in FALLBACK_ERRNOS:
+                raise
+            _rewind(src_file, dst_file, offset)
+            continue
+
+        if hasher is not None:
+            hash_file(dst_file if dst_file.readable() else src_file, hasher)
+        return offset + copied, name
+
+    if hasher is not None and offset:
+        hash_prefix(dst_file, hasher, offset)
+    return offset + copy_readinto(src_file, dst_file, on_progress, hasher), "readinto"
@@ -1,36 +1,60 @@
+import argparse
 import os
+import queue
 import shutil
-import hashlib
-from datetime import datetime
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from capture_date import CaptureDateCache, resolve_file_time
+from card_marks import CardMarks, HighWaterMark, card_identity
+from copy_backends import COPY_BACKENDS, KERNEL_BACKENDS, copy_contents, hash_file
+from content_index import ContentIndex
+from copy_progress import (
+    CLEAR_LINE,
+    ByteEta,
+    IS_TTY,
+    LINE_END,
+    build_progress_bar,
+    end_progress_line,
+    relative_target_label,
+    render_progress_line,
+    shorten_text,
+    should_redraw,
+)
+from durability import DURABILITY_LEVELS, DurableWrites
+from file_compare import HASH_ALGORITHMS, TieredComparator, hash_sample, new_hasher
+from file_records import SCHEDULE_POLICIES, DirectoryCache, date_folders, order_records, scan_source_files
+from ingest_manifest import IngestManifest
+from multi_card import DESTINATION_WRITE_SLOTS, DestinationScheduler, MultiCardProgress, ScheduledFile, card_label
+from partial_copies import PartialCopies
+from run_metrics import METRICS
 
 # === CONFIGURATION ===
 SDCARD_PATH = "/Volumes/Untitled/DCIM/"      # Update to your SD card path
 TARGET_BASE = "/Users/andy/TRANSIT_BLACKBOX/_SANDISK_128/"       # Destination folder
+COPY_WORKERS = 1                                 # Files copied at the same time (1 = one by one)
+COPY_BACKEND = "auto"                            # auto, reflink, copy_file_range, sendfile, readinto, pipelined or python
+VERIFY_COPIES = False                            # Read each copy back and compare checksums
+HASH_ALGORITHM = "blake2b"                       # blake2b, md5 (or xxh3_128/xxh64 with the xxhash package)
+SCAN_QUEUE_SIZE = 256                            # Files scanned ahead of the copier
+COPY_ORDER = "scan"                              # scan (stream as found), small-first, large-first or by-folder
+DATE_SOURCE = "capture"                          # capture (EXIF/QuickTime header) or filesystem
+CONTENT_INDEX = True                             # Hardlink files already anywhere in TARGET_BASE instead of copying
+DURABILITY = "batch"                             # none, file (fsync each copy) or batch (fsync per date folder at checkpoints)
 
-def get_md5(file_path, chunk_size=8192):
-    """Calculate MD5 checksum of a file."""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(chunk_size), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception as e:
-        print(f"⚠️ Could not read {file_path}: {e}")
-        return None
-
-
-def get_file_creation_time(src_path):
-    """Return the best available creation timestamp for a source file."""
-    stat = os.stat(src_path)
-    return stat.st_birthtime if hasattr(stat, "st_birthtime") else stat.st_ctime
+MAX_COLLISIONS = 100  # different files with the same name and date before giving up
 
+# Target directories created during this run
+created_dirs = DirectoryCache()
+# Temp files and resume checkpoints for copies in progress (main() points it at TARGET_BASE)
+partial_copies = PartialCopies()
+durable_writes = DurableWrites()
 
 def build_target_dir(target_base, creation_time, filename):
     """Build the destination directory for a file."""
-    year_folder = datetime.fromtimestamp(creation_time).strftime("%Y")
-    date_folder = datetime.fromtimestamp(creation_time).strftime("%Y%m%d")
+    year_folder, date_folder = date_folders(creation_time)
     target_dir = os.path.join(target_base, year_folder, date_folder)
 
     if os.path.splitext(filename)[1].lower() == ".dng":
@@ -39,190 +63,1224 @@ def build_target_dir(target_base, creation_time, filename):
     return target_dir
 
 
-def shorten_text(text, max_len=24):
-    """Shorten a label while keeping it readable."""
-    if len(text) <= max_len:
-        return text
-    if max_len <= 3:
-        return text[:max_len]
-    return text[: max_len - 3] + "..."
+def iter_files_to_copy(directory, target_base, capture_dates=None, since=None, unreadable=None):
+    """Yield a FileRecord with its dst_path set for each file as it is discovered.
 
+    With a CaptureDateCache, files are dated by the capture time in their
+    header instead of the filesystem timestamp. With a HighWaterMark as
+    since, only files newer than the mark are yielded. Folders and files that
+    could not be read are appended to unreadable (see scan_source_files).
+    """
+    for record in scan_source_files(directory, since, unreadable):
+        target_dir = build_target_dir(target_base, resolve_file_time(record, capture_dates), record.name)
+        record.dst_path = os.path.join(target_dir, record.name)
+        yield record
 
-def collect_files_to_copy(directory, target_base):
-    """Collect source and destination paths in one pass."""
-    files_to_copy = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.startswith("."):
-                continue
 
-            src_path = os.path.join(root, file)
+def stat_or_none(path):
+    """Return os.stat(path), or None if it does not exist."""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
 
-            try:
-                creation_time = get_file_creation_time(src_path)
-            except Exception:
-                continue
 
-            target_dir = build_target_dir(target_base, creation_time, file)
-            dst_path = os.path.join(target_dir, file)
-            files_to_copy.append((src_path, dst_path, file))
+def collision_path(dst_path, src_path, size, algorithm, attempt=1):
+    """Destination name for a different file that has the same name and date as an existing one.
 
-    return files_to_copy
+    The suffix comes from the file's head+tail sample hash, so the same
+    file gets the same name on every run: IMG_0001.JPG -> IMG_0001_3fa2b1c0.JPG,
+    then IMG_0001_3fa2b1c0-2.JPG in the unlikely case that is taken too.
+    """
+    stem, extension = os.path.splitext(dst_path)
+    suffix = hash_sample(src_path, size, algorithm)[:8]
+    if attempt > 1:
+        suffix += f"-{attempt}"
+    return f"{stem}_{suffix}{extension}"
 
-def render_compact_progress(filename, dst_path, copied, src_size, current_index, total_files):
-    """Render a compact progress line with numbering."""
-    bar_length = 22
-    percentage = (copied / src_size) * 100 if src_size else 100
-    filled_length = int(bar_length * copied // src_size) if src_size else bar_length
-    colors = [
-        '\033[38;5;52m',
-        '\033[38;5;88m',
-        '\033[38;5;124m',
-        '\033[38;5;160m',
-        '\033[38;5;196m',
-        '\033[38;5;202m',
-        '\033[38;5;208m',
-        '\033[38;5;214m',
-        '\033[38;5;220m',
-        '\033[38;5;226m',
-    ]
-
-    bar = ''
-    for i in range(filled_length):
-        color_idx = min(int((i / max(filled_length, 1)) * len(colors)), len(colors) - 1)
-        bar += colors[color_idx] + '█'
-
-    if 0 < filled_length < bar_length:
-        edge_color = colors[min(int((percentage / 100) * (len(colors) - 1)), len(colors) - 1)]
-        edge_chars = ['▊', '▋', '▌', '▍', '▎', '▏']
-        edge_idx = min(int((percentage / 100) * len(edge_chars)), len(edge_chars) - 1)
-        bar += edge_color + edge_chars[edge_idx]
-        filled_length += 1
-
-    remaining = bar_length - filled_length
-    if remaining > 0:
-        bar += '\033[38;5;240m' + '░' * remaining
-
-    bar += '\033[0m'
-    spinner_chars = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
-    spinner = spinner_chars[int((copied / (8192 * 8)) % len(spinner_chars))]
-
-    if percentage >= 100:
-        percentage_color = '\033[38;5;226m\033[1m'
-    elif percentage >= 75:
-        percentage_color = '\033[38;5;220m\033[1m'
-    elif percentage >= 50:
-        percentage_color = '\033[38;5;208m\033[1m'
+
+def link_duplicate(archived_path, dst_path):
+    """Hardlink a file already in the archive to dst_path; returns False if the filesystem refuses."""
+    with METRICS.phase("link", dst_path):
+        created_dirs.ensure(os.path.dirname(dst_path))
+        try:
+            os.link(archived_path, dst_path)
+        except OSError:
+            return False
+    return True
+
+
+def check_destination(record, manifest, comparator, content_index=None):
+    """Decide whether a scanned file still needs copying.
+
+    Returns ("current", None) when the manifest vouches for the destination,
+    ("identical", checksum) when the duplicate check proved the existing
+    destination identical, ("linked", checksum) when the same content found
+    elsewhere in the archive by content_index was hardlinked into place (the
+    caller records both in the manifest), and ("copy", None) otherwise.
+
+    Files are compared by content, not mtime, so a destination whose
+    timestamp changed is still recognised. A destination holding the start
+    of the source (an interrupted copy) is returned as ("copy", None) at the
+    same path and gets replaced. Any other different file is never
+    overwritten: record.dst_path moves on to its collision_path and the
+    checks repeat there.
+    """
+    src_path, src_stat = record.src_path, record.stat
+    planned = record.dst_path
+    for attempt in range(1, MAX_COLLISIONS + 1):
+        dst_path = record.dst_path
+        with METRICS.phase("stat", dst_path):
+            dst_stat = stat_or_none(dst_path)
+        if dst_stat is None:
+            break
+
+        # Skip if the manifest already vouches for this file
+        if manifest is not None and manifest.is_current(src_path, src_stat, dst_path, dst_stat):
+            return "current", None
+
+        # Skip if file already exists and is identical
+        with METRICS.phase("dedup", src_path) as phase:
+            hashed_before = sum(comparator.bytes_read.values())
+            identical, checksum = comparator.compare(src_path, dst_path, src_stat, dst_stat)
+            truncated = not identical and comparator.is_truncated_copy(src_path, dst_path, src_stat, dst_stat)
+            phase.nbytes = sum(comparator.bytes_read.values()) - hashed_before
+        if identical:
+            return "identical", checksum
+        if truncated:
+            return "copy", None
+
+        # Same name and date, different content: try the next collision name
+        record.dst_path = collision_path(planned, src_path, src_stat.st_size, comparator.algorithm, attempt)
     else:
-        percentage_color = '\033[38;5;196m\033[1m'
+        raise FileExistsError(f"{MAX_COLLISIONS} different files named like {planned}")
+
+    if content_index is not None:
+        archived_path, checksum = content_index.find_duplicate(src_path, src_stat)
+        if archived_path is not None and link_duplicate(archived_path, record.dst_path):
+            return "linked", checksum
+    return "copy", None
+
+
+def index_copy(content_index, dst_path, checksum):
+    """Add a file now in the archive to the content index, if there is one."""
+    if content_index is not None:
+        content_index.add(dst_path, os.stat(dst_path), checksum)
+
+
+def collect_files_to_copy(directory, target_base, capture_dates=None, since=None, unreadable=None):
+    """Collect FileRecords with source and destination paths in one pass."""
+    return list(iter_files_to_copy(directory, target_base, capture_dates, since, unreadable))
 
-    display_name = shorten_text(os.path.basename(filename), 20)
-    target_path = os.path.relpath(os.path.dirname(dst_path), TARGET_BASE)
-    if target_path == ".":
-        target_path = os.path.basename(os.path.dirname(dst_path))
 
-    print(
-        f"\r\033[K{current_index:>3}/{total_files:<3} {display_name:<20} -> "
-        f"{shorten_text(target_path, 24):<24} [{bar}] {percentage_color}{percentage:5.1f}%\033[0m {spinner}",
-        end='',
-        flush=True,
+def load_card_mark(card_marks, source, full=False):
+    """Identify the card at source and return (card_id, mark to scan from).
+
+    The mark is None for a card never ingested into TARGET_BASE, for a card
+    that cannot be identified (card_id None), or when full is set.
+    """
+    card_id = card_identity(source)
+    if card_id is None or full:
+        return card_id, None
+    return card_id, card_marks.load(card_id, os.path.abspath(TARGET_BASE))
+
+
+def save_card_mark(card_marks, card_id, mark):
+    """Store the mark reached by a run that ingested every file it scanned."""
+    if card_id is not None:
+        card_marks.save(card_id, os.path.abspath(TARGET_BASE), mark)
+
+
+def report_unreadable(unreadable, indent="   "):
+    """Print the folders and files of the card that could not be read, if any."""
+    if not unreadable:
+        return
+    print(f"{indent}❌ Could not read {len(unreadable)} folder(s) or file(s) on the card; they were not copied:")
+    for path, error in unreadable[:5]:
+        print(f"{indent}   • {path}: {error}")
+    if len(unreadable) > 5:
+        print(f"{indent}   • ... and {len(unreadable) - 5} more")
+
+
+class FileScanner:
+    """Scans the source on a background thread while files are being copied.
+
+    Discovered files pass through a bounded queue, so memory stays flat on
+    large cards and the first copy starts as soon as the first file is found.
+    If the scan fails part way, iteration ends early and error holds the
+    exception; folders and files that could not be read are skipped and
+    collected in unreadable. Callers must check both before treating the
+    card as done.
+    """
+
+    _DONE = object()
+
+    def __init__(self, directory, target_base, capture_dates=None, queue_size=SCAN_QUEUE_SIZE, since=None):
+        self.directory = directory
+        self.target_base = target_base
+        self.capture_dates = capture_dates
+        self.since = since
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.discovered = 0
+        self.discovered_bytes = 0
+        self.finished = False
+        self.error = None
+        self.unreadable = []  # (path, error) for folders and files that could not be read
+        self.thread = threading.Thread(target=self.scan, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def scan(self):
+        try:
+            for item in iter_files_to_copy(self.directory, self.target_base, self.capture_dates, self.since, self.unreadable):
+                self.discovered += 1
+                self.discovered_bytes += item.size
+                self.queue.put(item)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self.queue.put(self._DONE)
+
+    def total_label(self):
+        """Files found so far; prefixed with ~ while the scan is still running."""
+        return self.discovered if self.finished else f"~{self.discovered}"
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is self._DONE:
+                return
+            yield item
+
+
+def render_compact_progress(filename, dst_path, copied, src_size, current_index, total_files, overall=None):
+    """Render a compact progress line with numbering (rate-limited).
+
+    With a ByteEta for the whole run, its completion and ETA follow the bar.
+    """
+    if copied >= src_size:
+        return  # the completion line replaces it
+
+    percentage = (copied / src_size) * 100 if src_size else 100
+    render_progress_line(
+        percentage,
+        os.path.basename(filename),
+        format_target_label(dst_path),
+        copied // (8192 * 8),
+        current_index,
+        total_files,
+        name_width=20,
+        suffix=overall.label() if overall is not None else "",
     )
 
 
-def copy_file_with_progress(src_path, dst_path, filename="", current_index=1, total_files=1):
-    """Copy a file while showing real-time progress."""
+def in_created_dirs(folders, action, *args):
+    """Call action(*args), which needs folders to exist.
+
+    The folders may be remembered by created_dirs but removed since (e.g. a
+    target cleared between runs in one process); if the call then fails
+    with FileNotFoundError, they are created again and the call retried once.
+    """
     try:
-        src_size = os.path.getsize(src_path)
-        if src_size == 0:
-            render_compact_progress(filename, dst_path, 0, 0, current_index, total_files)
-            shutil.copy2(src_path, dst_path)
-            return True
-            
-        # Create destination directory if it doesn't exist
-        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-        
-        # Copy with progress monitoring
+        return action(*args)
+    except FileNotFoundError:
+        if not created_dirs.forget(*folders):
+            raise
+        for folder in folders:
+            created_dirs.ensure(folder)
+        return action(*args)
+
+
+def copy_file_data(src_path, dst_path, hasher=None, on_progress=None, backend=None, write_turn=None):
+    """Copy file contents and metadata, reporting bytes copied so far.
+
+    If a hasher object is passed as hasher, it is fed the copied bytes so the
+    caller gets the checksum without a second read of the source. on_progress
+    is called with the running byte count as data lands. backend selects one of
+    copy_backends.COPY_BACKENDS (default: COPY_BACKEND).
+
+    The data goes to a temp file from partial_copies, which is renamed over
+    dst_path only once complete. If an earlier run left a checkpointed temp
+    file for the same source, the copy resumes from its checkpoint.
+    write_turn, if given, is called with the size of each destination write
+    and must return a context manager the write happens in (see
+    multi_card.DestinationScheduler); it only sees writes made from Python.
+    """
+    part_path = partial_copies.part_path(dst_path)
+    folders = (os.path.dirname(dst_path), os.path.dirname(part_path))
+
+    # Create destination directory if this run has not already
+    with METRICS.phase("mkdir", dst_path):
+        for folder in folders:
+            created_dirs.ensure(folder)
+
+    with METRICS.phase("copy", src_path) as phase:
         with open(src_path, 'rb') as src_file:
-            with open(dst_path, 'wb') as dst_file:
-                copied = 0
-                chunk_size = 8192  # 8KB chunks
-                
-                while True:
-                    chunk = src_file.read(chunk_size)
-                    if not chunk:
-                        break
-                    
-                    dst_file.write(chunk)
-                    copied += len(chunk)
-                    
-                    # Update progress
-                    render_compact_progress(filename, dst_path, copied, src_size, current_index, total_files)
-        
-        # Preserve metadata
-        shutil.copystat(src_path, dst_path)
-        
+            src_stat = os.fstat(src_file.fileno())
+            offset = partial_copies.resume_offset(part_path, src_file, src_stat)
+            with in_created_dirs(folders, open, part_path, 'r+b' if offset else 'w+b') as dst_file:
+                if write_turn is not None:
+                    dst_file = ScheduledFile(dst_file, write_turn)
+                checkpoint = partial_copies.checkpointer(part_path, dst_path, dst_file, src_stat, offset)
+
+                def progress(copied):
+                    checkpoint(copied)
+                    if on_progress is not None:
+                        on_progress(copied)
+
+                copied, _ = copy_contents(src_file, dst_file, backend or COPY_BACKEND, hasher, progress, offset)
+        phase.nbytes = copied - offset
+
+    # Preserve metadata, then put the finished file in place
+    with METRICS.phase("metadata", dst_path):
+        shutil.copystat(src_path, part_path)
+        durable_writes.sync_before_rename(part_path)  # "file" level: never rename unflushed data into place
+        in_created_dirs(folders, partial_copies.finish, part_path, dst_path)
+    durable_writes.finished(dst_path, copied, flushed=durable_writes.level == "file")
+    return copied
+
+
+def copy_file_with_progress(
+    src_path, dst_path, filename="", current_index=1, total_files=1, hasher=None, backend=None, src_size=None, overall=None
+):
+    """Copy a file while showing real-time progress.
+
+    overall is an optional ByteEta for the whole run; the bytes of this file
+    are added to it as they are copied.
+    """
+    done_before = overall.done_bytes if overall is not None else 0
+
+    def on_progress(copied):
+        if overall is not None:
+            overall.update(done_before + copied)
+        render_compact_progress(filename, dst_path, copied, src_size, current_index, total_files, overall)
+
+    try:
+        if src_size is None:
+            src_size = os.path.getsize(src_path)
+        if src_size == 0:
+            render_compact_progress(filename, dst_path, 0, 0, current_index, total_files, overall)
+
+        copy_file_data(src_path, dst_path, hasher, on_progress, backend)
+
         display_name = shorten_text(filename, 20)
-        target_path = os.path.relpath(os.path.dirname(dst_path), TARGET_BASE)
-        if target_path == ".":
-            target_path = os.path.basename(os.path.dirname(dst_path))
-        print(f"\r\033[K{current_index:>3}/{total_files:<3} {display_name:<20} -> {shorten_text(target_path, 24):<24} ✅ 100% ⠏")
+        target_path = format_target_label(dst_path)
+        print(f"{CLEAR_LINE}{current_index:>3}/{total_files:<3} {display_name:<20} -> {shorten_text(target_path, 24):<24} ✅ 100% ⠏")
         return True
         
     except Exception as e:
-        print(f"\r❌ {current_index:>3}/{total_files:<3} {shorten_text(filename, 20)}: {e}")
+        if overall is not None:
+            overall.done_bytes = done_before
+        print(f"{CLEAR_LINE}❌ {current_index:>3}/{total_files:<3} {shorten_text(filename, 20)}: {e}")
         return False
 
-# === CREATE TARGET BASE IF NOT EXISTS ===
-os.makedirs(TARGET_BASE, exist_ok=True)
 
-try:
-    print("🔍 Scanning files...")
-    files_to_copy = collect_files_to_copy(SDCARD_PATH, TARGET_BASE)
-    total_files = len(files_to_copy)
-    print(f"Found {total_files} files to copy")
+class ParallelProgress:
+    """One combined status line for several files copying at once.
+
+    With a ByteEta, the line shows completion and ETA for the whole run
+    rather than for the files submitted so far.
+    """
+
+    def __init__(self, workers, eta=None):
+        self.workers = workers
+        self.eta = eta
+        self.total_files = 0
+        self.total_bytes = 0
+        self.done_files = 0
+        self.copied_bytes = 0
+        self.active = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_job(self, size):
+        with self.lock:
+            self.total_files += 1
+            self.total_bytes += size
+
+    def file_started(self):
+        with self.lock:
+            self.active += 1
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.copied_bytes += count
+            if self.eta is not None:
+                self.eta.update(self.copied_bytes)
+            if should_redraw():
+                self.draw()
+
+    def file_finished(self, line):
+        """Print a permanent line for a finished file, then redraw the status."""
+        with self.lock:
+            self.active -= 1
+            self.done_files += 1
+            print(f"{CLEAR_LINE}{line}")
+            if IS_TTY:
+                self.draw()
+
+    def draw(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.copied_bytes / elapsed / (1024 * 1024)
+        if self.eta is not None:
+            percentage = self.eta.percentage()
+            overall = f"  {self.eta.label()}"
+        else:
+            percentage = (self.copied_bytes / self.total_bytes) * 100 if self.total_bytes else 100
+            overall = ""
+        print(
+            f"{CLEAR_LINE}⚙️  {self.done_files:>3}/{self.total_files:<3} files "
+            f"[{build_progress_bar(percentage)}] {percentage:5.1f}% "
+            f"{self.copied_bytes / (1024 * 1024):8.1f} MB {rate:7.1f} MB/s  {self.active}/{self.workers} workers busy{overall}",
+            end=LINE_END,
+            flush=IS_TTY,
+        )
+
+
+class ParallelCopier:
+    """Copies files on a pool of worker threads as they are submitted.
+
+    Jobs are (index, src_path, dst_path, filename, src_stat) tuples. At most
+    a few jobs per worker are kept in flight, so submit() blocks while the
+    pool is saturated. Finished jobs are collected with completed() on the
+    caller's thread, which keeps manifest updates off the workers. With
+    checksums off, no digest is taken (the checksum is None) and the "auto"
+    backend may use the kernel copy paths.
+    """
+
+    def __init__(self, workers, total_files, show_progress=True, backend=None, algorithm=None, eta=None, checksums=True):
+        self.workers = workers
+        self.total_files = total_files
+        self.backend = backend
+        self.algorithm = algorithm or HASH_ALGORITHM
+        self.checksums = checksums
+        self.max_in_flight = workers * 2
+        self.progress = ParallelProgress(workers, eta) if show_progress else None
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = []
+        self.in_flight = set()  # destination paths of jobs not yet collected
+
+    def submit(self, job):
+        """Queue a job, waiting for a free slot if too many are in flight."""
+        if self.progress is not None:
+            self.progress.add_job(job[4].st_size)
+        self.in_flight.add(job[2])
+        self.pending.append(self.executor.submit(self.run, job))
+
+        running = [future for future in self.pending if not future.done()]
+        if len(running) >= self.max_in_flight:
+            wait(running, return_when=FIRST_COMPLETED)
+
+    def completed(self, wait_all=False):
+        """Yield (job, ok, checksum) for finished jobs."""
+        if wait_all:
+            wait(self.pending)
+        still_pending = []
+        for future in self.pending:
+            if future.done():
+                result = future.result()
+                self.in_flight.discard(result[0][2])
+                yield result
+            else:
+                still_pending.append(future)
+        self.pending = still_pending
+
+    def run(self, job):
+        index, src_path, dst_path, file = job[:4]
+        progress = self.progress
+        hasher = new_hasher(self.algorithm) if self.checksums else None
+        last = 0
+
+        def on_progress(copied):
+            nonlocal last
+            if progress is not None:
+                progress.add_bytes(copied - last)
+            last = copied
+
+        if progress is not None:
+            progress.file_started()
+        try:
+            copy_file_data(src_path, dst_path, hasher, on_progress, self.backend)
+        except Exception as e:
+            if progress is not None:
+                progress.file_finished(f"❌ {index:>3}/{self.total_files:<3} {shorten_text(file, 20)}: {e}")
+            return job, False, None
+
+        if progress is not None:
+            progress.file_finished(
+                f"{index:>3}/{self.total_files:<3} {shorten_text(file, 20):<20} -> "
+                f"{shorten_text(format_target_label(dst_path), 24):<24} ✅ 100% ⠏"
+            )
+        return job, True, hasher.hexdigest() if hasher is not None else None
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.progress is not None:
+            end_progress_line()
+
+
+def copy_files_parallel(jobs, workers, total_files, show_progress=True, backend=None, algorithm=None):
+    """Copy a list of jobs on a worker pool, yielding (job, ok, checksum) as they finish."""
+    copier = ParallelCopier(workers, total_files, show_progress, backend, algorithm)
+    try:
+        for job in jobs:
+            copier.submit(job)
+            yield from copier.completed()
+        yield from copier.completed(wait_all=True)
+    finally:
+        copier.close()
+
+
+class CardIngest:
+    """Scans and copies one card on its own reader thread during a multi-card run.
+
+    Destination writes go through the shared DestinationScheduler, so the
+    cards take turns on the target disk while each one keeps reading.
+    """
+
+    def __init__(self, source, label, scheduler, progress, manifest, capture_dates, args, card_id=None, since=None, content_index=None):
+        self.source = source
+        self.label = label
+        self.scheduler = scheduler
+        self.progress = progress
+        self.manifest = manifest
+        self.content_index = content_index
+        self.args = args
+        self.card_id = card_id
+        self.since = since
+        self.mark = since.copy() if since is not None else HighWaterMark()
+        self.scanner = FileScanner(source, TARGET_BASE, capture_dates, since=since)
+        self.comparator = TieredComparator(args.hash, check_mtime=False)
+        self.scanned_files = 0
+        self.done_files = 0
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.skipped_files = 0
+        self.linked_files = 0
+        self.linked_bytes = 0
+        self.renamed_files = 0
+        self.failed_files = 0
+        self.verified_files = 0
+        self.failed_verifications = 0
+        self.scan_error = None
+        self.unreadable = self.scanner.unreadable
+        self.elapsed = 0.0
+        self.finished = False
+        self.thread = threading.Thread(target=self.run, name=f"card-{label}", daemon=True)
+
+    def total_label(self):
+        return self.scanner.total_label()
+
+    def start(self):
+        self.scanner.start()
+        self.thread.start()
+
+    def join(self):
+        self.thread.join()
+
+    def report(self, line, mark=""):
+        self.done_files += 1
+        self.progress.file_finished(f"{mark}{shorten_text(self.label, 12):<12} {line}")
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            records = self.scanner
+            if self.args.order != "scan":
+                # Like single-card mode: scan the whole card, then copy in the chosen order
+                records = order_records(list(self.scanner), self.args.order)
+            for index, record in enumerate(records, start=1):
+                self.scanned_files = index
+                self.mark.advance(record)
+                self.ingest(index, record)
+            self.scan_error = self.scanner.error
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self.finished = True
+
+    def ingest(self, index, record):
+        src_path, planned, file, src_stat = record.src_path, record.dst_path, record.name, record.stat
+        label = f"{index:>3}/{self.total_label():<4} {shorten_text(file, 20):<20} -> {shorten_text(format_target_label(planned), 24):<24}"
+        manifest, content_index, algorithm = self.manifest, self.content_index, self.args.hash
+
+        # Another card may be copying a file with the same name and date right now
+        with self.scheduler.claim(planned):
+            try:
+                status, checksum = check_destination(record, manifest, self.comparator, content_index)
+            except OSError as e:
+                self.failed_files += 1
+                self.report(f"{label} {e}", "❌ ")
+                return
+            dst_path = record.dst_path
+            # Only a suffixed name that gets a new file counts as a collision, not one found there already
+            renamed = dst_path != planned
+            if status != "copy":
+                durable_writes.finished(dst_path)
+                if status in ("identical", "linked"):
+                    if manifest is not None:
+                        manifest.record(src_path, src_stat, dst_path, checksum, algorithm)
+                    index_copy(content_index, dst_path, checksum)
+                if status == "linked":
+                    self.renamed_files += renamed
+                    self.linked_files += 1
+                    self.linked_bytes += src_stat.st_size
+                    self.report(f"{label} linked", "🔗 ")
+                    return
+                self.skipped_files += 1
+                self.report(f"{label} skipped", "⏩ ")
+                return
+
+            # Only the manifest and --verify need the digest; the content index fills it in when asked
+            hasher = new_hasher(algorithm) if manifest is not None or self.args.verify else None
+            last = 0
+
+            def on_progress(copied):
+                nonlocal last
+                self.progress.add_bytes(copied - last)
+                last = copied
+
+            try:
+                self.copied_bytes += copy_file_data(
+                    src_path, dst_path, hasher, on_progress, self.args.copy_backend, self.scheduler.writer(self.label)
+                )
+            except Exception as e:
+                self.failed_files += 1
+                self.report(f"{label} {e}", "❌ ")
+                return
+        self.copied_files += 1
+        self.renamed_files += renamed
+        checksum = hasher.hexdigest() if hasher is not None else None
+
+        verified = False
+        if self.args.verify:
+            try:
+                verified = verify_copy(dst_path, checksum, algorithm)
+            except OSError:
+                verified = False
+            if not verified:
+                self.failed_verifications += 1
+                remove_failed_copy(dst_path)
+                self.report(f"{label} verification failed, copy removed", "❌ ")
+                return
+            self.verified_files += 1
+        if manifest is not None:
+            manifest.record(src_path, src_stat, dst_path, checksum, algorithm, verified=verified)
+        index_copy(content_index, dst_path, checksum)
+        self.report(f"{label} ✅ 100% ⠏")
+
+
+def ingest_cards(sources, args, manifest, capture_dates, card_marks, content_index=None):
+    """Ingest several cards at once, one reader thread each, sharing the destination disk."""
+    scheduler = DestinationScheduler(args.write_slots)
+    progress = MultiCardProgress()
+    cards = []
+    for source in sources:
+        card_id, since = load_card_mark(card_marks, source, args.full)
+        card = CardIngest(
+            source,
+            card_label(source, [c.label for c in cards]),
+            scheduler,
+            progress,
+            manifest,
+            capture_dates,
+            args,
+            card_id,
+            since,
+            content_index,
+        )
+        cards.append(card)
+        progress.add_card(card)
+
+    print(f"📇 Ingesting {len(cards)} cards: {', '.join(card.label for card in cards)}")
     print()  # Add extra space above copying progress
-    
-    if total_files == 0:
-        print("ℹ️ No files found to copy.")
+    started = time.perf_counter()
+    for card in cards:
+        card.start()
+    for card in cards:
+        card.join()
+    end_progress_line()
+    durable = flush_copies()
+    elapsed = time.perf_counter() - started
+    for card in cards:
+        if card.scanned_files and not card.failed_files and not card.failed_verifications and not card.scan_error and not card.unreadable and durable:
+            save_card_mark(card_marks, card.card_id, card.mark)
+
+    if not any(card.scanned_files or card.scan_error or card.unreadable for card in cards):
+        print("ℹ️ No new files found to copy." if any(card.since is not None for card in cards) else "ℹ️ No files found to copy.")
         sys.exit(0)
-    
-    copied_files = 0
-    skipped_files = 0
-    
-    for index, (src_path, dst_path, file) in enumerate(files_to_copy, start=1):
-        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
 
-        # Skip if file already exists and is identical
-        if os.path.exists(dst_path):
-            src_stat = os.stat(src_path)
-            dst_stat = os.stat(dst_path)
-
-            same_size = src_stat.st_size == dst_stat.st_size
-            same_mtime = int(src_stat.st_mtime) == int(dst_stat.st_mtime)
-            same_checksum = get_md5(src_path) == get_md5(dst_path)
-
-            if same_size and same_mtime and same_checksum:
-                rel_target = os.path.relpath(os.path.dirname(dst_path), TARGET_BASE)
-                if rel_target == ".":
-                    rel_target = os.path.basename(os.path.dirname(dst_path))
-                print(f"\r⏩ {index:>3}/{total_files:<3} {shorten_text(file, 20)} -> {shorten_text(rel_target, 24)} skipped")
-                skipped_files += 1
+    print(f"\n🎉 Copy operation completed!")
+    print(f"📈 Summary ({elapsed:.1f}s wall time):")
+    for card in cards:
+        waited = scheduler.waited.get(card.label, 0.0)
+        print(f"   📇 {card.label} ({card.source}{', new files only' if card.since is not None else ''})")
+        print(f"      • Files scanned: {card.scanned_files}")
+        if card.scan_error:
+            print(f"      ❌ Scan stopped early, the rest of the card was not copied: {card.scan_error}")
+        report_unreadable(card.unreadable, "      ")
+        print(f"      • Files copied: {card.copied_files} ({card.copied_bytes / (1024 * 1024):.1f} MB in {card.elapsed:.1f}s, {waited:.1f}s waiting for the destination)")
+        print(f"      • Files skipped (duplicates): {card.skipped_files}")
+        if card.linked_files:
+            print(f"      • Files hardlinked to copies already in the archive: {card.linked_files} ({card.linked_bytes / (1024 * 1024):.1f} MB not copied)")
+        if card.renamed_files:
+            print(f"      • Name collisions (saved under a suffixed name): {card.renamed_files}")
+        if card.failed_files:
+            print(f"      • Files failed: {card.failed_files}")
+        print(f"      • Duplicate check: {card.comparator.summary()}")
+        if args.verify:
+            print(f"      • Files verified: {card.verified_files}")
+            print(f"      • Verification failures: {card.failed_verifications}")
+    if partial_copies.resumed_files:
+        print(f"   • Copies resumed: {partial_copies.resumed_files} ({partial_copies.resumed_bytes / (1024 * 1024):.1f} MB not copied again)")
+    report_durability(not any(card.failed_files or card.failed_verifications or card.scan_error or card.unreadable for card in cards))
+    METRICS.note(
+        cards={
+            card.label: {
+                "source": card.source,
+                "incremental": card.since is not None,
+                "files_scanned": card.scanned_files,
+                "entries_unreadable": len(card.unreadable),
+                "files_copied": card.copied_files,
+                "bytes_copied": card.copied_bytes,
+                "files_skipped": card.skipped_files,
+                "files_linked": card.linked_files,
+                "files_renamed": card.renamed_files,
+                "files_failed": card.failed_files,
+                "files_verified": card.verified_files,
+                "verification_failures": card.failed_verifications,
+                "seconds": round(card.elapsed, 3),
+                "seconds_waiting_for_destination": round(scheduler.waited.get(card.label, 0.0), 3),
+            }
+            for card in cards
+        },
+        files_scanned=sum(card.scanned_files for card in cards),
+        files_copied=sum(card.copied_files for card in cards),
+        files_skipped=sum(card.skipped_files for card in cards),
+        files_linked=sum(card.linked_files for card in cards),
+        files_renamed=sum(card.renamed_files for card in cards),
+        files_verified=sum(card.verified_files for card in cards),
+        verification_failures=sum(card.failed_verifications for card in cards),
+        copies_resumed=partial_copies.resumed_files,
+        durable=durable,
+    )
+
+
+def flush_copies():
+    """Wait for the last durability checkpoint; returns True if every copy was flushed."""
+    if durable_writes.level == "batch" and durable_writes.pending:
+        print("💾 Flushing copies to disk...")
+    return durable_writes.finish()
+
+
+def report_durability(complete):
+    """Print the durability summary lines.
+
+    complete says every file on the card was read and is in the archive: no
+    failed copies or verifications, and no folder or file left unread.
+    """
+    if durable_writes.level != "none":
+        print(f"   • Durability: {durable_writes.summary()}")
+    for path, error in durable_writes.errors[:5]:
+        print(f"   ❌ Could not flush {path}: {error}")
+    if durable_writes.level == "none":
+        print("\nℹ️ Copies may still be in the write cache (--durability none); eject the destination before wiping the card.")
+    elif complete and not durable_writes.errors:
+        print("\n🧽 Every file is on disk: the card is safe to wipe.")
+    else:
+        print("\n⚠️ Not every file was copied and flushed to disk: do not wipe the card yet.")
+
+
+def verify_copy(dst_path, expected_checksum, algorithm):
+    """Re-read a finished copy from disk and compare it with the streamed digest.
+
+    The file is flushed and dropped from the page cache first (where the
+    platform allows it) so the bytes come back from the destination device
+    rather than from memory.
+    """
+    fd = os.open(dst_path, os.O_RDONLY)
+    try:
+        with METRICS.phase("verify", dst_path) as phase:
+            os.fsync(fd)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            with os.fdopen(fd, "rb", closefd=False) as dst_file:
+                hasher = new_hasher(algorithm)
+                phase.nbytes = hash_file(dst_file, hasher)
+    finally:
+        os.close(fd)
+    return hasher.hexdigest() == expected_checksum
+
+
+def remove_failed_copy(dst_path):
+    """Delete a copy that failed verification, so the next run copies it again under its own name."""
+    try:
+        os.remove(dst_path)
+    except OSError:
+        pass
+
+
+class DestinationVerifier:
+    """Verifies finished copies on a background thread while the next file copies."""
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = []
+
+    def submit(self, job, checksum):
+        """Queue a copied file for read-back verification."""
+        dst_path = job[2]
+        self.pending.append((job, checksum, self.executor.submit(verify_copy, dst_path, checksum, self.algorithm)))
+
+    def completed(self, wait=False):
+        """Yield (job, checksum, ok) for finished verifications."""
+        still_pending = []
+        for job, checksum, future in self.pending:
+            if not wait and not future.done():
+                still_pending.append((job, checksum, future))
                 continue
+            try:
+                ok = future.result()
+            except OSError:
+                ok = False
+            yield job, checksum, ok
+        self.pending = still_pending
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_target_label(dst_path):
+    """Return the destination folder relative to TARGET_BASE for display."""
+    return relative_target_label(os.path.dirname(dst_path), TARGET_BASE)
 
-        if copy_file_with_progress(src_path, dst_path, file, index, total_files):
-            copied_files += 1
+
+def rebuild_manifest(manifest, source_dir, target_base, comparator, capture_dates=None):
+    """Re-create manifest entries for files already present in the target."""
+    print("🔍 Scanning files...")
+    files_to_copy = collect_files_to_copy(source_dir, target_base, capture_dates)
+    total_files = len(files_to_copy)
+    manifest.clear()
+    recorded = 0
+
+    for index, record in enumerate(files_to_copy, start=1):
+        src_path, dst_path, file, src_stat = record.src_path, record.dst_path, record.name, record.stat
+        dst_stat = stat_or_none(dst_path)
+        if dst_stat is None:
+            continue
+
+        identical, checksum = comparator.compare(src_path, dst_path, src_stat, dst_stat)
+        if identical:
+            manifest.record(src_path, src_stat, dst_path, checksum, comparator.algorithm)
+            recorded += 1
+            print(f"{CLEAR_LINE}{index:>3}/{total_files:<3} {shorten_text(file, 20)} -> {shorten_text(format_target_label(dst_path), 24)} recorded", end=LINE_END, flush=IS_TTY)
+
+    manifest.commit()
+    print(f"\n📒 Manifest rebuilt: {recorded} of {total_files} files already ingested")
+    print(f"   • Duplicate check: {comparator.summary()}")
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Copy SD card files into YYYY/YYYYMMDD folders.")
+    parser.add_argument(
+        "--rebuild-manifest",
+        action="store_true",
+        help="verify files already in TARGET_BASE and rebuild the ingest manifest, then exit",
+    )
+    parser.add_argument(
+        "--date-source",
+        choices=("capture", "filesystem"),
+        default=DATE_SOURCE,
+        help="date files by the capture time in their header or by the filesystem timestamp (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="scan the whole card even if it was ingested before, instead of only files newer than its high-water mark",
+    )
+    parser.add_argument(
+        "--exact-count",
+        action="store_true",
+        help="scan the whole card before copying so progress shows the exact file count",
+    )
+    parser.add_argument(
+        "--order",
+        choices=SCHEDULE_POLICIES,
+        default=COPY_ORDER,
+        help="copy order: as scanned (streaming), small-first, large-first or grouped by-folder; "
+        "anything but scan reads the whole card first (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=COPY_WORKERS,
+        help="number of files to copy at the same time (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cards",
+        nargs="+",
+        metavar="PATH",
+        help="card folders to ingest instead of SDCARD_PATH; with two or more, each card gets its own reader",
+    )
+    parser.add_argument(
+        "--write-slots",
+        type=int,
+        default=DESTINATION_WRITE_SLOTS,
+        help="destination writes in flight at once when ingesting several cards (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--copy-backend",
+        choices=COPY_BACKENDS,
+        default=COPY_BACKEND,
+        help="how file data is moved (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        default=VERIFY_COPIES,
+        help="read every copy back from the destination and compare it with the digest taken while copying",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=DURABILITY_LEVELS,
+        default=DURABILITY,
+        help="when copies are flushed to disk: none, file (fsync each copy) or batch "
+        "(fsync per date folder at checkpoints) (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--hash",
+        choices=HASH_ALGORITHMS,
+        default=HASH_ALGORITHM,
+        help="checksum used for duplicate checks, verification and the manifest (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-manifest",
+        action="store_true",
+        help="ignore the ingest manifest and compare checksums for every existing file",
+    )
+    parser.add_argument(
+        "--no-content-index",
+        action="store_true",
+        help="do not look for copies of new files elsewhere in TARGET_BASE (they are copied instead of hardlinked)",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="write a JSON run report with time and bytes per phase (scan, stat, date, dedup, copy, ...) to PATH",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="include every per-file phase call in the --metrics report",
+    )
+    parser.add_argument(
+        "--latency-histogram",
+        action="store_true",
+        help="include per-file latency percentiles and histograms per phase in the --metrics report",
+    )
+    args = parser.parse_args(argv)
+    if (args.trace or args.latency_histogram) and not args.metrics:
+        parser.error("--trace and --latency-histogram need --metrics PATH")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers < 1:
+        print("❌ --workers must be at least 1")
+        sys.exit(1)
+    if args.write_slots < 1:
+        print("❌ --write-slots must be at least 1")
+        sys.exit(1)
+    sources = args.cards or [SDCARD_PATH]
+    source_dir = sources[0]
+
+    if args.metrics:
+        METRICS.enable(trace=args.trace, histograms=args.latency_histogram)
+        METRICS.note(workers=args.workers, copy_backend=args.copy_backend, hash=args.hash, verify=args.verify, card_count=len(sources), order=args.order, durability=args.durability)
+
+    # === CREATE TARGET BASE IF NOT EXISTS ===
+    os.makedirs(TARGET_BASE, exist_ok=True)
+
+    partial_copies.target_base = TARGET_BASE
+    durable_writes.configure(args.durability, TARGET_BASE)
+    removed, freed = partial_copies.cleanup()
+    if removed:
+        print(f"🧹 Removed {removed} stale partial copies ({freed / (1024 * 1024):.1f} MB)")
+
+    if args.verify and args.copy_backend in KERNEL_BACKENDS:
+        print(f"ℹ️ --verify needs the copied bytes to pass through Python; using readinto instead of {args.copy_backend}")
+        args.copy_backend = "readinto"
+    if len(sources) > 1 and args.copy_backend in KERNEL_BACKENDS:
+        print(f"ℹ️ Multi-card ingest schedules destination writes from Python; using readinto instead of {args.copy_backend}")
+        args.copy_backend = "readinto"
+
+    manifest = None if args.no_manifest else IngestManifest(TARGET_BASE)
+    card_marks = CardMarks()
+    content_index = None
+    if CONTENT_INDEX and not args.no_content_index:
+        content_index = ContentIndex(TARGET_BASE, args.hash)
+    verifier = DestinationVerifier(args.hash) if args.verify else None
+    # Content decides: the mtime of a destination may have been changed, or come from a hardlinked copy
+    comparator = TieredComparator(args.hash, check_mtime=False)
+    capture_dates = CaptureDateCache() if args.date_source == "capture" else None
+
+    try:
+        if args.rebuild_manifest:
+            if manifest is None:
+                print("❌ --rebuild-manifest cannot be combined with --no-manifest")
+                sys.exit(1)
+            if len(sources) > 1:
+                print("❌ --rebuild-manifest works on one card at a time")
+                sys.exit(1)
+            rebuild_manifest(manifest, source_dir, TARGET_BASE, comparator, capture_dates)
+            if content_index is not None:
+                print(f"🗂️  Content index rebuilt: {content_index.rebuild()} files in {TARGET_BASE}")
+            return
+
+        if content_index is not None and content_index.is_new:
+            print(f"🗂️  Indexing files already in {TARGET_BASE}...")
+            print(f"🗂️  Indexed {content_index.rebuild()} files")
+
+        if len(sources) > 1:
+            if args.exact_count or args.workers > 1:
+                print("ℹ️ --exact-count and --workers do not apply to multi-card ingest; each card has one reader")
+            ingest_cards(sources, args, manifest, capture_dates, card_marks, content_index)
+            return
+
+        card_id, since = load_card_mark(card_marks, source_dir, args.full)
+        mark = since.copy() if since is not None else HighWaterMark()
+        if since is not None:
+            print(f"📌 Card ingested before; scanning only files after {since.folder:03d}/{since.file:04d} (--full to rescan all)")
+
+        scanner = None
+        unreadable = []
+        if args.exact_count or args.order != "scan":
+            print("🔍 Scanning files...")
+            files_to_copy = order_records(collect_files_to_copy(source_dir, TARGET_BASE, capture_dates, since, unreadable), args.order)
+            total_files = len(files_to_copy)
+            print(f"Found {total_files} files to copy" + (f", copying {args.order}" if args.order != "scan" else ""))
+            print()  # Add extra space above copying progress
+
+            if total_files == 0 and not unreadable:
+                print("ℹ️ No files found to copy.")
+                sys.exit(0)
+
+            total_label = lambda: total_files  # noqa: E731
+            overall = ByteEta(sum(record.size for record in files_to_copy))
         else:
-            rel_target = os.path.relpath(os.path.dirname(dst_path), TARGET_BASE)
-            if rel_target == ".":
-                rel_target = os.path.basename(os.path.dirname(dst_path))
-            print(f"\r❌ {index:>3}/{total_files:<3} {shorten_text(file, 20)} -> {shorten_text(rel_target, 24)} failed")
+            # Copy while the card is still being scanned; the totals are running counts
+            files_to_copy = scanner = FileScanner(source_dir, TARGET_BASE, capture_dates, since=since)
+            unreadable = scanner.unreadable
+            files_to_copy.start()
+            total_label = files_to_copy.total_label
+            overall = ByteEta(estimated=True)
+            print("🔍 Scanning and copying files...")
+            print()  # Add extra space above copying progress
+
+        total_files = total_label()
+        scanned_files = 0
+        copied_files = 0
+        skipped_files = 0
+        linked_files = 0
+        linked_bytes = 0
+        renamed_files = 0
+        renamed_copies = set()  # suffixed destinations being copied by the workers
+        failed_files = 0
+        verified_files = 0
+        failed_verifications = 0
+        # Only the manifest and --verify need the digest; the content index fills it in when asked,
+        # and without a hasher the "auto" backend can hand the copy to the kernel
+        checksums = manifest is not None or verifier is not None
+        copier = None
+        if args.workers > 1:
+            print(f"⚙️  Copying with {args.workers} workers")
+            copier = ParallelCopier(
+                args.workers, total_files, backend=args.copy_backend, algorithm=args.hash, eta=overall, checksums=checksums
+            )
+
+        def finish_copy(job, checksum):
+            """Record a copied file, or hand it to the verifier first."""
+            if verifier is not None:
+                verifier.submit(job, checksum)
+                return
+            if manifest is not None:
+                manifest.record(job[1], job[4], job[2], checksum, args.hash)
+            index_copy(content_index, job[2], checksum)
+
+        def collect_copied(wait_all=False):
+            nonlocal copied_files, failed_files, renamed_files
+            if copier is None:
+                return
+            for job, ok, checksum in copier.completed(wait_all):
+                if job[2] in renamed_copies:
+                    renamed_copies.discard(job[2])
+                    renamed_files += ok
+                if ok:
+                    copied_files += 1
+                    finish_copy(job, checksum)
+                else:
+                    failed_files += 1
+                    not_copied(job[4].st_size)
+
+        skipped_bytes = 0
+
+        def not_copied(size):
+            """Take a file that will not be copied out of the byte total behind the ETA."""
+            nonlocal skipped_bytes
+            skipped_bytes += size
+            if scanner is None:
+                overall.total_bytes -= size
+
+        def collect_verified(wait=False):
+            nonlocal verified_files, failed_verifications
+            if verifier is None:
+                return
+            for (index, src_path, dst_path, file, src_stat), checksum, ok in verifier.completed(wait):
+                if ok:
+                    verified_files += 1
+                    if manifest is not None:
+                        manifest.record(src_path, src_stat, dst_path, checksum, args.hash, verified=True)
+                    index_copy(content_index, dst_path, checksum)
+                else:
+                    failed_verifications += 1
+                    remove_failed_copy(dst_path)
+                    print(f"{CLEAR_LINE}❌ {index:>3}/{total_files:<3} {shorten_text(file, 20)} -> {shorten_text(format_target_label(dst_path), 24)} verification failed, copy removed")
+
+        for index, record in enumerate(files_to_copy, start=1):
+            src_path, planned, file, src_stat = record.src_path, record.dst_path, record.name, record.stat
+            scanned_files = index
+            mark.advance(record)
+            total_files = total_label()
+            if scanner is not None:
+                overall.total_bytes = scanner.discovered_bytes - skipped_bytes
+                overall.estimated = not scanner.finished
+            collect_copied()
+            collect_verified()
+            if copier is not None and planned in copier.in_flight:
+                # A file with the same name and date is still being copied; let it land first
+                collect_copied(wait_all=True)
+
+            try:
+                status, checksum = check_destination(record, manifest, comparator, content_index)
+            except OSError as e:
+                failed_files += 1
+                not_copied(src_stat.st_size)
+                print(f"{CLEAR_LINE}❌ {index:>3}/{total_files:<3} {shorten_text(file, 20)}: {e}")
+                continue
+            dst_path = record.dst_path
+            # Only a suffixed name that gets a new file counts as a collision, not one found there already
+            renamed = dst_path != planned
+            if status != "copy":
+                not_copied(src_stat.st_size)
+                durable_writes.finished(dst_path)
+                if status in ("identical", "linked"):
+                    if manifest is not None:
+                        manifest.record(src_path, src_stat, dst_path, checksum, args.hash)
+                    index_copy(content_index, dst_path, checksum)
+                if status == "linked":
+                    print(f"{CLEAR_LINE}🔗 {index:>3}/{total_files:<3} {shorten_text(file, 20)} -> {shorten_text(format_target_label(dst_path), 24)} linked")
+                    renamed_files += renamed
+                    linked_files += 1
+                    linked_bytes += src_stat.st_size
+                    continue
+                print(f"{CLEAR_LINE}⏩ {index:>3}/{total_files:<3} {shorten_text(file, 20)} -> {shorten_text(format_target_label(dst_path), 24)} skipped")
+                skipped_files += 1
+                continue
+
+            if copier is not None:
+                copier.total_files = total_files
+                if renamed:
+                    renamed_copies.add(dst_path)
+                copier.submit((index, src_path, dst_path, file, src_stat))
+                continue
+
+            hasher = new_hasher(args.hash) if checksums else None
+            if copy_file_with_progress(src_path, dst_path, file, index, total_files, hasher, args.copy_backend, src_stat.st_size, overall):
+                copied_files += 1
+                renamed_files += renamed
+                finish_copy((index, src_path, dst_path, file, src_stat), hasher.hexdigest() if hasher is not None else None)
+            else:
+                failed_files += 1
+                not_copied(src_stat.st_size)
+                print(f"{CLEAR_LINE}❌ {index:>3}/{total_files:<3} {shorten_text(file, 20)} -> {shorten_text(format_target_label(dst_path), 24)} failed")
+
+        if copier is not None:
+            collect_copied(wait_all=True)
+            copier.close()
+
+        scan_error = scanner.error if scanner is not None else None
+        if scan_error is not None:
+            print(f"{CLEAR_LINE}❌ Scan stopped early, the rest of the card was not copied: {scan_error}")
+        elif scanned_files == 0 and not unreadable:
+            print("ℹ️ No new files found to copy." if since is not None else "ℹ️ No files found to copy.")
+            sys.exit(0)
+
+        if verifier is not None and verifier.pending:
+            print(f"🔎 Verifying {len(verifier.pending)} remaining copies...")
+        collect_verified(wait=True)
+        durable = flush_copies()
+        # A folder or file that could not be read may sit below the mark; keep the old one
+        if not failed_files and not failed_verifications and scan_error is None and not unreadable and durable:
+            save_card_mark(card_marks, card_id, mark)
+
+        # Final summary
+        print(f"\n🎉 Copy operation completed!")
+        print(f"📈 Summary:")
+        print(f"   • Files scanned: {scanned_files}")
+        print(f"   • Files copied: {copied_files}")
+        print(f"   • Files skipped (duplicates): {skipped_files}")
+        if linked_files:
+            print(f"   • Files hardlinked to copies already in the archive: {linked_files} ({linked_bytes / (1024 * 1024):.1f} MB not copied)")
+        if renamed_files:
+            print(f"   • Name collisions (saved under a suffixed name): {renamed_files}")
+        if failed_files:
+            print(f"   • Files failed: {failed_files}")
+        print(f"   • Duplicate check: {comparator.summary()}")
+        if partial_copies.resumed_files:
+            print(f"   • Copies resumed: {partial_copies.resumed_files} ({partial_copies.resumed_bytes / (1024 * 1024):.1f} MB not copied again)")
+        if verifier is not None:
+            print(f"   • Files verified: {verified_files}")
+            print(f"   • Verification failures: {failed_verifications}")
+        if scan_error is not None:
+            print(f"   • Scan: stopped early ({scan_error})")
+        report_unreadable(unreadable)
+        report_durability(not failed_files and not failed_verifications and scan_error is None and not unreadable)
+        METRICS.note(
+            files_scanned=scanned_files,
+            files_copied=copied_files,
+            files_skipped=skipped_files,
+            files_linked=linked_files,
+            files_renamed=renamed_files,
+            files_failed=failed_files,
+            files_verified=verified_files,
+            verification_failures=failed_verifications,
+            copies_resumed=partial_copies.resumed_files,
+            incremental=since is not None,
+            scan_error=str(scan_error) if scan_error is not None else None,
+            entries_unreadable=len(unreadable),
+            durable=durable,
+        )
+
+    except KeyboardInterrupt:
+        print("\n\n⛔️ Operation cancelled by user. Exiting cleanly.")
+        sys.exit(0)
+    finally:
+        if capture_dates is not None:
+            capture_dates.close()
+        if verifier is not None:
+            verifier.close()
+        if manifest is not None:
+            manifest.close()
+        card_marks.close()
+        if content_index is not None:
+            content_index.close()
+        if args.metrics:
+            print(f"📊 Run report written to {METRICS.write(args.metrics, 'copy_group')}")
 
-    # Final summary
-    print(f"\n🎉 Copy operation completed!")
-    print(f"📈 Summary:")
-    print(f"   • Files copied: {copied_files}")
-    print(f"   • Files skipped (duplicates): {skipped_files}")
 
-except KeyboardInterrupt:
-    print("\n\n⛔️ Operation cancelled by user. Exiting cleanly.")
-    sys.exit(0)
+if __name__ == "__main__":
+    main()
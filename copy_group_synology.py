@@ -1,10 +1,32 @@
+import argparse
 import hashlib
 import os
-import re
-import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+from capture_date import CaptureDateCache, resolve_file_time
+from card_marks import CardMarks, HighWaterMark, card_identity
+from copy_progress import (
+    CLEAR_LINE,
+    ByteEta,
+    IS_TTY,
+    LINE_END,
+    build_progress_bar,
+    compact_path_label,
+    end_progress_line,
+    format_eta,
+    render_progress_line,
+    should_redraw,
+)
+from file_records import SCHEDULE_POLICIES, creation_time_from_stat, date_folders, order_records, scan_source_files
+from remote_inventory import CHANGED, INVENTORY_CACHE, SAME, RemoteInventory
+from rsync_progress import FileDone, FileFailed, TransferProgress
+from run_metrics import METRICS
+from transports import Compression, LocalTransport, RsyncDaemonTransport, RsyncSSHTransport, SFTPTransport
+
 # === CONFIGURATION ===
 # Source path (SD card)
 # SDCARD_PATH = "/Volumes/Untitled/DCIM/"      # Your SD card path
@@ -23,6 +45,60 @@ SYNOLOGY_PORT = 22  # SSH port (usually 22)
 # Paths
 SYNOLOGY_BASE_PATH = "/volume1/Photos/"  # Target base path on Synology; files go into YYYY/YYYYMMDD folders
 
+# Date files by the capture time in their EXIF/QuickTime header ("capture") or by filesystem time ("filesystem")
+DATE_SOURCE = "capture"
+
+# Only scan files newer than the card's high-water mark from its last complete upload (--full scans everything)
+INCREMENTAL_SCAN = True
+
+# List the whole remote library in one SSH call and only send missing or changed files
+USE_REMOTE_INVENTORY = True
+INVENTORY_TIMEOUT = 300  # seconds allowed for the remote listing
+INVENTORY_CACHE_MAX_AGE = 0  # reuse a local copy of the inventory up to this many seconds old (0 = always fetch)
+
+# How files reach the NAS: "rsync-ssh", "rsync-daemon", "sftp" (pure Python, needs paramiko)
+# or "local" (a local folder standing in for the NAS, for benchmarking and tuning without one)
+TRANSPORT = "rsync-ssh"
+
+# rsync-daemon: module that serves RSYNC_DAEMON_MODULE_PATH (SYNOLOGY_BASE_PATH must be inside it)
+RSYNC_DAEMON_MODULE = "Photos"
+RSYNC_DAEMON_MODULE_PATH = "/volume1/Photos/"
+RSYNC_DAEMON_PORT = 873
+RSYNC_DAEMON_PASSWORD_FILE = None  # file with the rsync daemon password, if the module needs one
+
+# local: remote paths are created under this folder, with simulated link characteristics
+LOCAL_TRANSPORT_ROOT = os.path.expanduser("~/copy_group_nas")
+LOCAL_LATENCY_MS = 0  # per remote operation round trip
+LOCAL_BANDWIDTH_MB_S = 0  # 0 = unlimited
+
+# "per-folder": one mkdir + upload per date folder; "single-session": one batched mkdir and one upload for everything
+TRANSFER_MODE = "per-folder"
+
+# Number of date folders uploaded at the same time over the shared connection (1 = one by one; per-folder mode)
+RSYNC_WORKERS = 1
+
+# Upload order: "scan" (as found on the card), "small-first", "large-first", "by-folder" (folder name order),
+# or "auto" (by-folder one at a time, large-first with RSYNC_WORKERS > 1)
+UPLOAD_ORDER = "auto"
+
+# Wire compression for compressible file types on slow links (rsync -z; JPEG, HEIF and video are never compressed)
+# "auto": measure the link at the start of the run and compress only if it is slower than COMPRESS_BELOW_MB_S
+COMPRESSION = "auto"  # auto, on or off
+COMPRESSION_ALGORITHM = "zstd"  # zstd needs rsync 3.2+ on both ends; falls back to zlib
+COMPRESSION_LEVEL = 3  # zstd 1-19 (zlib 1-9)
+COMPRESS_BELOW_MB_S = 20
+COMPRESSIBLE_EXTENSIONS = (".dng", ".raw", ".xmp")
+
+# Check every uploaded file against a digest taken on the NAS (one batched hashing command) and re-send mismatches
+VERIFY_UPLOADS = True
+VERIFY_ALGORITHM = "md5"  # md5 (md5sum) or blake2b (b2sum, coreutils 8.26+ on the NAS)
+VERIFY_RETRIES = 1  # times a mismatched file is re-sent and checked again
+
+# Write a JSON run report with time and bytes per phase (scan, stat, date, remote_list, remote_mkdir, upload)
+METRICS_REPORT = None  # e.g. os.path.expanduser("~/copy_group_synology_report.json")
+METRICS_TRACE = False  # include every per-file phase call in the report
+METRICS_HISTOGRAMS = False  # include per-file latency percentiles and histograms per phase
+
 
 def get_md5(file_path, chunk_size=8192):
     """Calculate MD5 checksum of a file."""
@@ -37,50 +113,41 @@ def get_md5(file_path, chunk_size=8192):
         return None
 
 
-def run_ssh_command(command, capture_output=True):
-    """Run a command on the Synology NAS via SSH."""
-    ssh_cmd = [
-        "ssh",
-        "-p",
-        str(SYNOLOGY_PORT),
-        "-o",
-        "StrictHostKeyChecking=no",
-        "-o",
-        "ConnectTimeout=10",
-        "-o",
-        "ControlMaster=auto",
-        "-o",
-        "ControlPath=/tmp/ssh_mux_%h_%p_%r",
-        "-o",
-        "ControlPersist=5m",
-        f"{SYNOLOGY_USER}@{SYNOLOGY_HOST}",
-        command,
-    ]
-
-    try:
-        result = subprocess.run(
-            ssh_cmd, capture_output=capture_output, text=True, timeout=30
+def create_transport():
+    """Build the transport selected by TRANSPORT."""
+    if TRANSPORT == "rsync-ssh":
+        return RsyncSSHTransport(SYNOLOGY_HOST, SYNOLOGY_USER, SYNOLOGY_PORT)
+    if TRANSPORT == "rsync-daemon":
+        return RsyncDaemonTransport(
+            SYNOLOGY_HOST,
+            RSYNC_DAEMON_MODULE,
+            RSYNC_DAEMON_MODULE_PATH,
+            SYNOLOGY_USER,
+            RSYNC_DAEMON_PORT,
+            RSYNC_DAEMON_PASSWORD_FILE,
         )
-        return result
-    except subprocess.TimeoutExpired:
-        print(f"❌ SSH command timed out: {command}")
-        return None
-    except Exception as e:
-        print(f"❌ SSH command failed: {e}")
-        return None
+    if TRANSPORT == "sftp":
+        return SFTPTransport(SYNOLOGY_HOST, SYNOLOGY_USER, SYNOLOGY_PORT)
+    if TRANSPORT == "local":
+        return LocalTransport(LOCAL_TRANSPORT_ROOT, LOCAL_LATENCY_MS / 1000, LOCAL_BANDWIDTH_MB_S * 1024 * 1024)
+    raise ValueError(f"Unknown TRANSPORT: {TRANSPORT}")
+
+
+def relative_remote_path(remote_path):
+    """Path below SYNOLOGY_BASE_PATH, as used for upload items and results."""
+    return remote_path[len(SYNOLOGY_BASE_PATH) :].strip("/")
 
 
 def get_file_creation_time(src_path):
     """Return the best available creation timestamp for a source file."""
-    stat = os.stat(src_path)
-    return stat.st_birthtime if hasattr(stat, "st_birthtime") else stat.st_ctime
+    return creation_time_from_stat(os.stat(src_path))
 
 
-def build_remote_target_dir(src_path):
+def build_remote_target_dir(src_path, creation_time=None):
     """Build the remote target directory for a source file."""
-    creation_time = get_file_creation_time(src_path)
-    year_folder = datetime.fromtimestamp(creation_time).strftime("%Y")
-    date_folder = datetime.fromtimestamp(creation_time).strftime("%Y%m%d")
+    if creation_time is None:
+        creation_time = get_file_creation_time(src_path)
+    year_folder, date_folder = date_folders(creation_time)
     extension = os.path.splitext(src_path)[1].lower()
 
     if extension == ".dng":
@@ -89,245 +156,370 @@ def build_remote_target_dir(src_path):
     return f"{SYNOLOGY_BASE_PATH}{year_folder}/{date_folder}"
 
 
-def shorten_text(text, max_len=24):
-    """Shorten a label while keeping it readable."""
-    if len(text) <= max_len:
-        return text
-    if max_len <= 3:
-        return text[:max_len]
-    return text[: max_len - 3] + "..."
-
-
-def compact_path_label(path, max_len=24):
-    """Show the most useful tail of a target path."""
-    parts = [part for part in path.strip("/").split("/") if part]
-    if not parts:
-        return path
-
-    tail = "/".join(parts[-3:])
-    return shorten_text(tail, max_len)
-
-
-def build_progress_bar(percentage, bar_length=22):
-    """Build a red-to-yellow progress bar for terminal output."""
-    colors = [
-        "\033[38;5;52m",  # Dark Red
-        "\033[38;5;88m",  # Red
-        "\033[38;5;124m",  # Medium Red
-        "\033[38;5;160m",  # Bright Red
-        "\033[38;5;196m",  # Vivid Red
-        "\033[38;5;202m",  # Orange-Red
-        "\033[38;5;208m",  # Orange
-        "\033[38;5;214m",  # Yellow-Orange
-        "\033[38;5;220m",  # Yellow
-        "\033[38;5;226m",  # Bright Yellow
-    ]
-
-    filled_length = int(bar_length * percentage // 100)
-    bar = ""
-
-    for i in range(filled_length):
-        color_idx = min(int((i / max(filled_length, 1)) * len(colors)), len(colors) - 1)
-        bar += colors[color_idx] + "█"
-
-    if 0 < filled_length < bar_length:
-        edge_color = colors[
-            min(int((percentage / 100) * (len(colors) - 1)), len(colors) - 1)
-        ]
-        edge_chars = ["▊", "▋", "▌", "▍", "▎", "▏"]
-        edge_idx = min(int((percentage / 100) * len(edge_chars)), len(edge_chars) - 1)
-        bar += edge_color + edge_chars[edge_idx]
-        filled_length += 1
-
-    remaining = bar_length - filled_length
-    if remaining > 0:
-        bar += "\033[38;5;240m" + "░" * remaining
+class TransferProgressView:
+    """Renders the progress events of one upload and tracks the file position.
+
+    Each finished file gets a permanent line, the overall progress figure
+    drives the live line, and per-file errors are printed as they arrive.
+    With a RsyncProgressBoard, progress is reported to the board instead so
+    several concurrent transfers share one status line.
+    """
+
+    def __init__(self, target_label, total_files, start_index, board=None, overall=None):
+        self.target_label = target_label
+        self.total_files = total_files
+        self.start_index = start_index
+        self.board = board
+        self.overall = overall  # ByteEta for the whole run, shown after the bar
+        self.done_before = overall.done_bytes if overall is not None else 0
+        self.log = board.log if board is not None else print
+        self.done = 0
+        self.update_index = 0
+        self.saw_progress = False
+        self.last_finished = time.perf_counter()
+
+    def __call__(self, event):
+        if isinstance(event, TransferProgress):
+            if self.board is not None:
+                self.board.progress(self.target_label, event.transferred)
+                return
+            self.update_index += 1
+            if self.overall is not None:
+                self.overall.update(self.done_before + event.transferred)
+            if render_progress_line(
+                min(event.percentage, 99.9),
+                "copying",
+                self.target_label,
+                self.update_index,
+                min(self.start_index + self.done + 1, self.total_files),
+                self.total_files,
+                suffix=self.overall.label() if self.overall is not None else "",
+            ):
+                self.saw_progress = True
+
+        elif isinstance(event, FileDone):
+            self.done += 1
+            # Upload time of a file: since the previous one in this transfer finished
+            now = time.perf_counter()
+            METRICS.add("upload", now - self.last_finished, event.size, event.name)
+            self.last_finished = now
+            if self.board is not None:
+                self.board.file_done(self.target_label)
+                return
+            render_progress_line(
+                100.0,
+                os.path.basename(event.name),
+                self.target_label,
+                self.update_index,
+                self.start_index + self.done,
+                self.total_files,
+            )
+            end_progress_line()
+            self.saw_progress = False
 
-    return bar + "\033[0m"
+        elif isinstance(event, FileFailed):
+            self.close()
+            self.log(f"⚠️ {event.message}")
 
+        elif self.board is None and event.text.startswith(("sent ", "total size is ")):
+            self.close()
+            print(event.text)
 
-def render_progress_line(
-    percentage, file_label, target_label, update_index, current_index, total_files
-):
-    """Render a colored progress line similar to the local copy path."""
-    indicator_chars = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
-    indicator = indicator_chars[update_index % len(indicator_chars)]
-    progress_bar = build_progress_bar(percentage)
-    display_name = shorten_text(file_label, 18)
-
-    if percentage >= 100:
-        percentage_color = "\033[38;5;226m\033[1m"
-    elif percentage >= 75:
-        percentage_color = "\033[38;5;220m\033[1m"
-    elif percentage >= 50:
-        percentage_color = "\033[38;5;208m\033[1m"
-    else:
-        percentage_color = "\033[38;5;196m\033[1m"
+    def close(self):
+        if self.saw_progress:
+            end_progress_line()
+            self.saw_progress = False
 
-    print(
-        f"\r\033[K{current_index:>3}/{total_files:<3} {display_name:<18} -> {target_label:<24} "
-        f"[{progress_bar}] {percentage_color}{percentage:5.1f}%\033[0m {indicator}",
-        end="",
-        flush=True,
-    )
 
+def upload_single_session(transport, batches, total_files, backup_suffix=None, create_dirs=(), overall=None):
+    """Upload every batch in one transport session.
 
-def stream_rsync_output(process, target_label, total_files, start_index):
-    """Stream rsync output and rewrite progress lines with color."""
-    progress_pattern = re.compile(r"(?P<percent>\d{1,3}(?:\.\d+)?)%")
-    buffer = ""
-    saw_progress = False
-    update_index = 0
-    current_file = ""
-    current_index = start_index
+    The directories in create_dirs are made first with one batched call. For
+    rsync this is a single --files-from run that places every file in its
+    date folder. Returns the TransferOutcome, keyed by YYYY/YYYYMMDD/NAME, or
+    None if the session could not start.
+    """
+    try:
+        with METRICS.phase("remote_mkdir"):
+            created = transport.make_dirs(list(create_dirs))
+        if not created:
+            print("❌ Failed to create remote directories")
+            return None
+
+        items = [
+            (record.src_path, f"{relative_remote_path(target_dir)}/{record.name}")
+            for _, target_dir, records, _ in batches
+            for record in records
+        ]
+        label = compact_path_label(SYNOLOGY_BASE_PATH)
+        print(f"📦 Single session: {len(items)} files into {len(batches)} folders")
+
+        view = TransferProgressView(label, total_files, 0, overall=overall)
+        try:
+            outcome = transport.upload(items, SYNOLOGY_BASE_PATH, backup_suffix, view)
+        finally:
+            view.close()
+        if outcome.returncode == 0:
+            print(f"✅ {label} done")
+        else:
+            print(f"❌ {label} finished with errors (exit code {outcome.returncode})")
+        return outcome
 
-    def flush_buffer(line):
-        nonlocal saw_progress, update_index, current_file, current_index
+    except Exception as e:
+        print(f"❌ Single session error: {e}")
+        return None
 
-        text = line.strip()
-        if not text:
-            return
 
-        match = progress_pattern.search(text)
-        if match:
-            percentage = min(float(match.group("percent")), 100.0)
-            render_progress_line(
-                percentage,
-                current_file or "copying",
-                target_label,
-                update_index,
-                current_index,
-                total_files,
-            )
-            update_index += 1
-            saw_progress = True
-            return
-
-        ignored_prefixes = (
-            "sending incremental file list",
-            "sent ",
-            "total size is ",
-            "created directory ",
-            "receiving incremental file list",
-            "building file list",
+class RsyncProgressBoard:
+    """One merged status line for several rsync transfers running at once."""
+
+    def __init__(self, total_files, total_bytes, workers):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.workers = workers
+        self.done_files = 0
+        self.done_bytes = 0
+        self.active = {}  # folder label -> bytes its rsync has sent so far
+        self.started = time.monotonic()
+        self.eta = ByteEta(total_bytes)
+        self.lock = threading.Lock()
+
+    def log(self, line):
+        """Print a permanent line above the status line."""
+        with self.lock:
+            print(f"{CLEAR_LINE}{line}")
+            if IS_TTY:
+                self.draw()
+
+    def progress(self, label, transferred):
+        """Record the cumulative bytes one folder's rsync has sent so far."""
+        with self.lock:
+            self.active[label] = transferred
+            if should_redraw():
+                self.draw()
+
+    def file_done(self, label):
+        with self.lock:
+            self.done_files += 1
+            if should_redraw():
+                self.draw()
+
+    def folder_finished(self, label):
+        with self.lock:
+            self.done_bytes += self.active.pop(label, 0)
+
+    def transferred_bytes(self):
+        return self.done_bytes + sum(self.active.values())
+
+    def throughput(self):
+        """Aggregate MB/s across all transfers so far."""
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return self.transferred_bytes() / elapsed / (1024 * 1024)
+
+    def draw(self):
+        transferred = self.transferred_bytes()
+        self.eta.update(transferred)
+        percentage = self.eta.percentage()
+        print(
+            f"{CLEAR_LINE}⚙️  {self.done_files:>3}/{self.total_files:<3} files "
+            f"[{build_progress_bar(percentage)}] {percentage:5.1f}% "
+            f"{transferred / (1024 * 1024):8.1f} MB {self.throughput():7.1f} MB/s  "
+            f"{len(self.active)}/{self.workers} folders busy  ETA {format_eta(self.eta.eta())}",
+            end=LINE_END,
+            flush=IS_TTY,
         )
 
-        if any(text.startswith(prefix) for prefix in ignored_prefixes):
-            if saw_progress:
-                print()
-                saw_progress = False
-            print(text)
-            return
-
-        if text != current_file:
-            current_file = os.path.basename(text.rstrip("/")) or text
-            current_index += 1
-
-        if saw_progress:
-            print()
-            saw_progress = False
-
-    while True:
-        char = process.stdout.read(1) if process.stdout else ""
-        if char == "":
-            break
-
-        if char in "\r\n":
-            flush_buffer(buffer)
-            buffer = ""
-        else:
-            buffer += char
-
-    flush_buffer(buffer)
-
-    if saw_progress:
-        print()
 
+def collect_files_by_target_dir(directory, capture_dates=None, since=None, unreadable=None):
+    """Group FileRecords for non-hidden source files by their remote target directory.
 
-def collect_files_by_target_dir(directory):
-    """Group non-hidden source files by their final remote target directory."""
+    With a HighWaterMark as since, only files newer than the mark are collected.
+    Folders and files that could not be read are appended to unreadable as (path, error).
+    """
     files_by_target_dir = {}
     print("🔍 Scanning files...")
 
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.startswith("."):
-                continue
+    for record in scan_source_files(directory, since, unreadable):
+        try:
+            target_dir = build_remote_target_dir(record.src_path, resolve_file_time(record, capture_dates))
+        except Exception as e:
+            print(f"\n⚠️ Skipping {record.src_path}: {e}")
+            continue
 
-            src_path = os.path.join(root, file)
+        files_by_target_dir.setdefault(target_dir, []).append(record)
 
-            try:
-                target_dir = build_remote_target_dir(src_path)
-            except Exception as e:
-                print(f"\n⚠️ Skipping {src_path}: {e}")
-                continue
+    return files_by_target_dir
 
-            files_by_target_dir.setdefault(target_dir, []).append(src_path)
 
-    return files_by_target_dir
+def upload_order():
+    """The SCHEDULE_POLICIES entry UPLOAD_ORDER stands for in this run."""
+    if UPLOAD_ORDER != "auto":
+        if UPLOAD_ORDER not in SCHEDULE_POLICIES:
+            raise ValueError(f"Unknown UPLOAD_ORDER: {UPLOAD_ORDER}")
+        return UPLOAD_ORDER
+    # Concurrent uploads start the largest folders first so the long transfers overlap with the short ones
+    if TRANSFER_MODE == "per-folder" and RSYNC_WORKERS > 1:
+        return "large-first"
+    return "by-folder"
+
+
+def order_batches(batches, policy):
+    """Put upload batches (and the files inside them) in the order of a schedule policy.
+
+    scan keeps the order folders were found in and by-folder sorts them by
+    name; small-first and large-first order folders by the bytes they still
+    have to send, and files inside each folder by size.
+    """
+    if policy == "by-folder":
+        return sorted(batches, key=lambda batch: batch[1])
+    if policy == "scan":
+        return list(batches)
+    batches = [
+        (folder_index, target_dir, order_records(records, policy), start_index)
+        for folder_index, target_dir, records, start_index in batches
+    ]
+    return sorted(
+        batches,
+        key=lambda batch: sum(record.size for record in batch[2]),
+        reverse=policy == "large-first",
+    )
 
 
-def rsync_folder_batch(src_paths, target_dir, start_index, total_files):
-    """Copy a batch of files to one Synology date folder using rsync."""
+def upload_folder_batch(
+    transport, records, target_dir, start_index, total_files, create_dir=True, backup_suffix=None, board=None, overall=None
+):
+    """Copy a batch of files to one Synology date folder.
+
+    Without a backup_suffix, files already present remotely are left alone
+    (rsync --ignore-existing). With one, the caller has already diffed
+    against the remote inventory: every file is sent, and a replaced remote
+    file is kept under its name plus the suffix. With a board, output goes to
+    the shared progress view. Returns the TransferOutcome keyed by
+    YYYY/YYYYMMDD/NAME, or None if the upload could not run.
+    """
+    log = board.log if board is not None else print
     try:
-        remote_dir = f"{target_dir}/"
-
-        mkdir_cmd = f"mkdir -p '{remote_dir}'"
-        mkdir_result = run_ssh_command(mkdir_cmd, capture_output=False)
-        if not mkdir_result or mkdir_result.returncode != 0:
-            print(f"❌ Failed to create remote directory: {remote_dir}")
-            return False
-
-        rsync_cmd = [
-            "rsync",
-            "-av",  # archive, verbose; no compression for faster LAN photo/video copy
-            "--progress",
-            "--partial",
-            "--inplace",
-            "--timeout=30",
-            "--ignore-existing",  # skip files already present remotely
-            "-e",
-            f"ssh -p {SYNOLOGY_PORT} -o StrictHostKeyChecking=no -o ControlMaster=auto -o ControlPath=/tmp/ssh_mux_%h_%p_%r -o ControlPersist=5m",
-            *src_paths,
-            f"{SYNOLOGY_USER}@{SYNOLOGY_HOST}:{remote_dir}",
-        ]
+        if create_dir:
+            with METRICS.phase("remote_mkdir", target_dir):
+                created = transport.make_dirs([target_dir])
+        if create_dir and not created:
+            log(f"❌ Failed to create remote directory: {target_dir}/")
+            return None
 
         compact_label = compact_path_label(target_dir)
-        print(f"📁 {compact_label} ({len(src_paths)} files)")
-
-        # Run rsync with real-time output
-        process = subprocess.Popen(
-            rsync_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
-            bufsize=1,
-        )
+        log(f"📁 {compact_label} ({len(records)} files)")
+
+        relative_dir = relative_remote_path(target_dir)
+        items = [(record.src_path, f"{relative_dir}/{record.name}") for record in records]
+        view = TransferProgressView(compact_label, total_files, start_index, board, overall)
+        try:
+            outcome = transport.upload(items, SYNOLOGY_BASE_PATH, backup_suffix, view)
+        finally:
+            view.close()
+            if board is not None:
+                board.folder_finished(compact_label)
+
+        if outcome.returncode == 0:
+            log(f"✅ {compact_label} done")
+        else:
+            log(f"❌ {compact_label} failed (exit code {outcome.returncode})")
+        return outcome
 
-        stream_rsync_output(process, compact_label, total_files, start_index)
-        process.wait()
+    except Exception as e:
+        log(f"❌ {compact_path_label(target_dir)} error: {e}")
+        return None
 
-        if process.returncode == 0:
-            print(f"✅ {compact_label} done")
-            return True
 
-        print(f"❌ {compact_label} failed")
-        return False
+def find_mismatches(transport, pending):
+    """Hash the pending files on the NAS in one call; return the keys whose digest differs, or None.
 
-    except Exception as e:
-        print(f"❌ {compact_path_label(target_dir)} error: {e}")
-        return False
+    pending maps YYYY/YYYYMMDD/NAME to (target_dir, record, local digest);
+    a file without a local digest or missing on the NAS counts as a mismatch.
+    """
+    remote_paths = {SYNOLOGY_BASE_PATH.rstrip("/") + "/" + key: key for key in pending}
+    total_bytes = sum(record.size for _, record, _ in pending.values())
+    timeout = 60 + total_bytes / (30 * 1024 * 1024)  # allow the NAS disk at least 30 MB/s
+    with METRICS.phase("remote_verify", nbytes=total_bytes):
+        remote = transport.remote_digests(list(remote_paths), VERIFY_ALGORITHM, timeout)
+    if remote is None:
+        return None
+    return [key for path, key in remote_paths.items() if pending[key][2] is None or remote.get(path) != pending[key][2]]
+
+
+def verify_uploads(transport, sent):
+    """Check every file sent this run against the NAS and repair the ones that differ.
+
+    Local digests were taken from the bytes read for the transfer, so the
+    check costs one batched read on the NAS. Mismatched files are re-sent
+    with replace (rsync rewrites only the damaged blocks) and checked
+    again, up to VERIFY_RETRIES times. Returns (verified keys, number of
+    files re-sent, keys still failing), or None if the transport cannot
+    hash on the NAS.
+    """
+    print(f"🔎 Verifying {len(sent)} uploaded file(s) on the NAS ({VERIFY_ALGORITHM})...")
+    pending = dict(sent)
+    resent = 0
+    for attempt in range(VERIFY_RETRIES + 1):
+        mismatched = find_mismatches(transport, pending)
+        if mismatched is None:
+            return None
+        if not mismatched or attempt == VERIFY_RETRIES:
+            break
+        print(f"🔁 Re-sending {len(mismatched)} file(s) that failed verification")
+        items = [(pending[key][1].src_path, key) for key in mismatched]
+        view = TransferProgressView(compact_path_label(SYNOLOGY_BASE_PATH), len(items), 0)
+        try:
+            outcome = transport.upload(items, SYNOLOGY_BASE_PATH, None, view, replace=True)
+        finally:
+            view.close()
+        resent += len(items)
+        pending = {
+            key: (pending[key][0], pending[key][1], outcome.digests.get(key, pending[key][2])) for key in mismatched
+        }
+
+    failed = set(mismatched)
+    if failed:
+        print(f"❌ {len(failed)} file(s) still differ on the NAS")
+    else:
+        print(f"✅ All {len(sent)} uploaded file(s) match")
+    return [key for key in sent if key not in failed], resent, mismatched
+
+
+def load_remote_inventory(transport):
+    """Return the remote file inventory from the local cache or one listing call.
+
+    Returns None if the listing fails, in which case the caller falls back to
+    leaving existing remote files alone (rsync --ignore-existing).
+    """
+    if INVENTORY_CACHE_MAX_AGE:
+        inventory = RemoteInventory.load(SYNOLOGY_BASE_PATH, INVENTORY_CACHE, INVENTORY_CACHE_MAX_AGE)
+        if inventory is not None:
+            age_minutes = (time.time() - inventory.fetched_at) / 60
+            print(f"📒 Using cached remote inventory ({len(inventory)} files, {age_minutes:.0f} min old)")
+            return inventory
+
+    print("📋 Fetching remote inventory...")
+    with METRICS.phase("remote_list"):
+        listing = transport.list_files(SYNOLOGY_BASE_PATH, timeout=INVENTORY_TIMEOUT)
+    if listing is None:
+        print("⚠️ Could not list remote files; falling back to skipping existing files")
+        return None
+
+    inventory = RemoteInventory.parse(SYNOLOGY_BASE_PATH, listing)
+    print(f"📋 {len(inventory)} files already on the NAS")
+    if INVENTORY_CACHE_MAX_AGE:
+        inventory.save(INVENTORY_CACHE)
+    return inventory
 
 
-def test_ssh_connection():
-    """Test SSH connection to Synology."""
-    print("🔐 Authenticating SSH connection to Synology...")
-    result = run_ssh_command("echo 'SSH connection successful'")
-    if result and result.returncode == 0:
-        print("✅ SSH connection successful!")
+def test_connection(transport):
+    """Test the connection to Synology."""
+    print(f"🔐 Connecting to Synology ({transport.name})...")
+    if transport.check():
+        print("✅ Connection successful!")
         return True
     else:
-        print("❌ SSH connection failed!")
+        print("❌ Connection failed!")
         print("Please check:")
         print(f"  • Synology IP: {SYNOLOGY_HOST}")
         print(f"  • Username: {SYNOLOGY_USER}")
@@ -336,85 +528,329 @@ def test_ssh_connection():
         return False
 
 
-def cleanup_ssh_connection():
-    """Clean up SSH connection multiplexing."""
-    try:
-        # Close the SSH connection
-        ssh_cmd = [
-            "ssh",
-            "-p",
-            str(SYNOLOGY_PORT),
-            "-o",
-            "ControlMaster=auto",
-            "-o",
-            "ControlPath=/tmp/ssh_mux_%h_%p_%r",
-            "-O",
-            "exit",
-            f"{SYNOLOGY_USER}@{SYNOLOGY_HOST}",
-        ]
-        subprocess.run(ssh_cmd, capture_output=True, timeout=10)
-    except Exception:
-        pass  # Ignore cleanup errors
+def choose_compression(transport, batches, mode=COMPRESSION):
+    """Decide how uploads of COMPRESSIBLE_EXTENSIONS are sent; returns (Compression or None, description).
+
+    In "auto" mode the link is probed once and compression is used only if
+    it is slower than COMPRESS_BELOW_MB_S, where the CPU time is cheaper
+    than the bytes saved.
+    """
+    extensions = "/".join(extension.lstrip(".").upper() for extension in COMPRESSIBLE_EXTENSIONS)
+    if mode == "off":
+        return None, "off"
+    if not any(
+        os.path.splitext(record.name)[1].lower() in COMPRESSIBLE_EXTENSIONS
+        for _, _, records, _ in batches
+        for record in records
+    ):
+        return None, f"off (no {extensions} files to send)"
+    available = transport.compressors()
+    if not available:
+        return None, f"off (not supported by the {transport.name} transport)"
+
+    if mode == "auto":
+        with METRICS.phase("link_probe"):
+            rate = transport.measure_throughput()
+        if rate is None:
+            return None, "off (link speed could not be measured; set COMPRESSION = \"on\" to force it)"
+        link_mb_s = rate / (1024 * 1024)
+        METRICS.note(link_mb_s=round(link_mb_s, 1))
+        if link_mb_s >= COMPRESS_BELOW_MB_S:
+            return None, f"off (link {link_mb_s:.1f} MB/s, threshold {COMPRESS_BELOW_MB_S} MB/s)"
+        reason = f"link {link_mb_s:.1f} MB/s, below {COMPRESS_BELOW_MB_S} MB/s"
+    else:
+        reason = "forced on"
 
+    if COMPRESSION_ALGORITHM in available:
+        compression = Compression(COMPRESSION_ALGORITHM, COMPRESSION_LEVEL, COMPRESSIBLE_EXTENSIONS)
+    else:
+        compression = Compression("zlib", max(1, min(COMPRESSION_LEVEL, 9)), COMPRESSIBLE_EXTENSIONS)
+        reason += f"; {COMPRESSION_ALGORITHM} not available"
+    return compression, f"{compression} for {extensions} ({reason})"
+
+
+def card_destination(transport):
+    """Key under which card high-water marks are stored for this NAS folder."""
+    if transport.name == "local":
+        return f"local:{os.path.abspath(LOCAL_TRANSPORT_ROOT)}:{SYNOLOGY_BASE_PATH}"
+    return f"{transport.name}:{SYNOLOGY_USER}@{SYNOLOGY_HOST}:{SYNOLOGY_BASE_PATH}"
+
+
+def parse_args(argv=None):
+    """Parse command-line options; everything else is set in the configuration above."""
+    parser = argparse.ArgumentParser(description="Upload SD card files to a Synology NAS in YYYY/YYYYMMDD folders.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        default=not INCREMENTAL_SCAN,
+        help="scan the whole card even if it was uploaded before, instead of only files newer than its high-water mark",
+    )
+    parser.add_argument(
+        "--no-verify",
+        dest="verify",
+        action="store_false",
+        default=VERIFY_UPLOADS,
+        help="skip checking uploaded files against digests computed on the NAS",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=("auto", "on", "off"),
+        default=COMPRESSION,
+        help=f"compress {'/'.join(COMPRESSIBLE_EXTENSIONS)} uploads: auto = only when the link is slower than {COMPRESS_BELOW_MB_S} MB/s",
+    )
+    return parser.parse_args(argv)
 
-try:
-    # Test SSH connection first
-    if not test_ssh_connection():
-        sys.exit(1)
 
-    # Check if source directory exists
-    if not os.path.exists(SDCARD_PATH):
-        print(f"❌ Source directory not found: {SDCARD_PATH}")
-        print("Please check your SDCARD_PATH configuration.")
-        sys.exit(1)
+def main(argv=None):
+    args = parse_args(argv)
+    transport = create_transport()
+    if METRICS_REPORT:
+        METRICS.enable(trace=METRICS_TRACE, histograms=METRICS_HISTOGRAMS)
+        METRICS.note(transport=transport.name, transfer_mode=TRANSFER_MODE, workers=RSYNC_WORKERS, order=upload_order())
+    try:
+        # Test the connection first
+        if not test_connection(transport):
+            sys.exit(1)
+
+        # Check if source directory exists
+        if not os.path.exists(SDCARD_PATH):
+            print(f"❌ Source directory not found: {SDCARD_PATH}")
+            print("Please check your SDCARD_PATH configuration.")
+            sys.exit(1)
+
+        # Cards uploaded before are only scanned past their high-water mark
+        card_marks = CardMarks()
+        card_id = card_identity(SDCARD_PATH)
+        since = None
+        if card_id is not None and not args.full:
+            since = card_marks.load(card_id, card_destination(transport))
+        if since is not None:
+            print(f"📌 Card uploaded before; scanning only files after {since.folder:03d}/{since.file:04d} (--full to rescan all)")
+        mark = since.copy() if since is not None else HighWaterMark()
+
+        # First, group files by target date folder
+        capture_dates = CaptureDateCache() if DATE_SOURCE == "capture" else None
+        unreadable = []
+        try:
+            files_by_target_dir = collect_files_by_target_dir(SDCARD_PATH, capture_dates, since, unreadable)
+        finally:
+            if capture_dates is not None:
+                capture_dates.close()
+        total_files = sum(len(files) for files in files_by_target_dir.values())
+        total_folders = len(files_by_target_dir)
+
+        print(f"Found {total_files} files to copy across {total_folders} target folder(s)")
+        for path, error in unreadable:
+            print(f"❌ Could not read {path}: {error}")
+        print()  # Add extra space above copying progress
+
+        if total_files == 0 and not unreadable:
+            card_marks.close()
+            print("ℹ️ No new files found to copy." if since is not None else "ℹ️ No files found to copy.")
+            sys.exit(0)
+
+        inventory = load_remote_inventory(transport) if USE_REMOTE_INVENTORY else None
+        backup_suffix = None
+        if inventory is not None:
+            backup_suffix = datetime.now().strftime(".~%Y%m%d-%H%M%S~")
+        print()
 
-    # First, group files by target date folder
-    files_by_target_dir = collect_files_by_target_dir(SDCARD_PATH)
-    total_files = sum(len(files) for files in files_by_target_dir.values())
-    total_folders = len(files_by_target_dir)
+        attempted_files = 0
+        transferred_files = 0
+        unchanged_files = 0
+        changed_files = 0
+        completed_folders = 0
+        failed_folders = 0
+
+        current_file_index = 0
+
+        # Work out what each folder still needs before starting any transfer
+        order = upload_order()
+        batches = []
+        folders = sorted(files_by_target_dir) if order == "by-folder" else list(files_by_target_dir)
+        for folder_index, target_dir in enumerate(folders, start=1):
+            records = files_by_target_dir[target_dir]
+            folder_size = len(records)
+
+            if inventory is not None:
+                to_send = []
+                for record in records:
+                    state = inventory.classify(f"{target_dir}/{record.name}", record.stat)
+                    if state == SAME:
+                        unchanged_files += 1
+                        continue
+                    if state == CHANGED:
+                        changed_files += 1
+                    to_send.append(record)
+                records = to_send
+
+            if records:
+                batches.append((folder_index, target_dir, records, current_file_index))
+            else:
+                completed_folders += 1
+            current_file_index += folder_size
+
+        batches = order_batches(batches, order)
+        # Byte-weighted progress and ETA over what is actually sent
+        overall = ByteEta(sum(record.size for batch in batches for record in batch[2]))
+        if order != "by-folder":
+            print(f"🗂️  Uploading {order}")
+        transport.compression, compression_label = choose_compression(transport, batches, args.compress)
+        if batches:
+            print(f"🗜️  Compression: {compression_label}")
+
+        def start_batch(folder_index, target_dir, records, start_index, board=None):
+            if board is None:
+                print(f"[{folder_index:>3}/{total_folders:<3} folders] 📁", end=" ")
+            create_dir = inventory is None or not inventory.has_dir(target_dir)
+            return upload_folder_batch(
+                transport, records, target_dir, start_index, total_files, create_dir, backup_suffix, board, overall
+            )
 
-    print(f"Found {total_files} files to copy across {total_folders} target folder(s)")
-    print()  # Add extra space above copying progress
+        failed_files = []
+        sent = {}  # YYYY/YYYYMMDD/NAME -> (target_dir, record, local digest), awaiting verification
+        if args.verify:
+            transport.digest_algorithm = VERIFY_ALGORITHM
+
+        def finish_batch(target_dir, records, outcome):
+            nonlocal attempted_files, transferred_files, completed_folders, failed_folders
+            attempted_files += len(records)
+            folder_ok = True
+            relative_dir = relative_remote_path(target_dir)
+            for record in records:
+                key = f"{relative_dir}/{record.name}"
+                if outcome is None or not outcome.succeeded(key):
+                    failed_files.append(key)
+                    folder_ok = False
+                    continue
+                if key in outcome.done:
+                    transferred_files += 1
+                    if args.verify:
+                        sent[key] = (target_dir, record, outcome.digests.get(key))
+                        continue
+                if inventory is not None:
+                    inventory.add(f"{target_dir}/{record.name}", record.stat)
+            if folder_ok:
+                completed_folders += 1
+            else:
+                failed_folders += 1
+
+        board = None
+        if TRANSFER_MODE == "single-session" and batches:
+            create_dirs = [
+                target_dir
+                for _, target_dir, _, _ in batches
+                if inventory is None or not inventory.has_dir(target_dir)
+            ]
+            outcome = upload_single_session(transport, batches, total_files, backup_suffix, create_dirs, overall)
+            for _, target_dir, records, _ in batches:
+                finish_batch(target_dir, records, outcome)
+        elif RSYNC_WORKERS > 1 and len(batches) > 1:
+            board = RsyncProgressBoard(
+                sum(len(batch[2]) for batch in batches),
+                sum(record.size for batch in batches for record in batch[2]),
+                RSYNC_WORKERS,
+            )
+            print(f"⚙️  Uploading {len(batches)} folders with {RSYNC_WORKERS} concurrent {transport.name} workers")
+            with ThreadPoolExecutor(max_workers=RSYNC_WORKERS) as executor:
+                futures = {executor.submit(start_batch, *batch, board): batch for batch in batches}
+                for future in as_completed(futures):
+                    _, target_dir, records, _ = futures[future]
+                    finish_batch(target_dir, records, future.result())
+            end_progress_line()
+        else:
+            for batch in batches:
+                finish_batch(batch[1], batch[2], start_batch(*batch))
+
+        verified_files = 0
+        resent_files = 0
+        verification = verify_uploads(transport, sent) if sent else None
+        if sent and verification is None:
+            print(f"⚠️ The {transport.name} transport cannot hash files on the NAS; uploads not verified")
+        verified_keys = list(sent)
+        if verification is not None:
+            verified_keys, resent_files, mismatched = verification
+            verified_files = len(verified_keys)
+            failed_files.extend(mismatched)
+        if inventory is not None:
+            for key in verified_keys:
+                target_dir, record, _ = sent[key]
+                inventory.add(f"{target_dir}/{record.name}", record.stat)
+
+        if inventory is not None and INVENTORY_CACHE_MAX_AGE:
+            inventory.save(INVENTORY_CACHE)
+
+        # Only a run that got every file onto the NAS may move the mark past them;
+        # a folder or file that could not be read may sit below the new mark
+        if card_id is not None and not failed_files and not unreadable:
+            for records in files_by_target_dir.values():
+                for record in records:
+                    mark.advance(record)
+            card_marks.save(card_id, card_destination(transport), mark)
+        card_marks.close()
+
+        # Final summary
+        print(f"\n🎉 Copy operation completed!")
+        print(f"📈 Summary:")
+        print(f"   • Files attempted: {attempted_files}")
+        print(f"   • Files transferred: {transferred_files}")
+        print(f"   • Files failed: {len(failed_files)}")
+        if unreadable:
+            print(f"   • Card folders or files that could not be read (not uploaded): {len(unreadable)}")
+        print(f"   • Target folders completed: {completed_folders}")
+        print(f"   • Target folders failed: {failed_folders}")
+        if inventory is not None:
+            print(f"   • Files already on the NAS (skipped): {unchanged_files}")
+            print(f"   • Changed files re-sent: {changed_files}")
+            if changed_files:
+                print(f"   • Previous remote copies kept as *{backup_suffix}")
+        else:
+            print("   • Existing remote files left untouched (not re-sent)")
+        print(f"   • Compression: {compression_label}")
+        if verification is not None:
+            print(f"   • Verified on the NAS ({VERIFY_ALGORITHM}): {verified_files}")
+            print(f"   • Re-sent after a failed check: {resent_files}")
+        if board is not None:
+            elapsed = time.monotonic() - board.started
+            print(
+                f"   • Transferred {board.transferred_bytes() / (1024 * 1024):.1f} MB in {elapsed:.1f} s "
+                f"({board.throughput():.1f} MB/s aggregate)"
+            )
 
-    if total_files == 0:
-        print("ℹ️ No files found to copy.")
-        sys.exit(0)
+        METRICS.note(
+            files_attempted=attempted_files,
+            files_transferred=transferred_files,
+            files_failed=len(failed_files),
+            entries_unreadable=len(unreadable),
+            files_unchanged=unchanged_files,
+            compression=compression_label,
+            files_verified=verified_files,
+            files_resent=resent_files,
+            incremental=since is not None,
+        )
 
-    attempted_files = 0
-    completed_folders = 0
-    failed_folders = 0
+        if failed_files:
+            print("\n⚠️ Not copied (will be retried on the next run):")
+            for path in failed_files[:20]:
+                print(f"   • {path}")
+            if len(failed_files) > 20:
+                print(f"   • ... and {len(failed_files) - 20} more")
 
-    current_file_index = 0
+        # Close the connection
+        transport.close()
 
-    for folder_index, target_dir in enumerate(sorted(files_by_target_dir), start=1):
-        src_paths = files_by_target_dir[target_dir]
-        attempted_files += len(src_paths)
+    except KeyboardInterrupt:
+        print("\n\n⛔️ Operation cancelled by user. Exiting cleanly.")
+        transport.close()
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n❌ Unexpected error: {e}")
+        transport.close()
+        sys.exit(1)
+    finally:
+        if METRICS_REPORT:
+            print(f"📊 Run report written to {METRICS.write(METRICS_REPORT, 'copy_group_synology')}")
 
-        print(f"[{folder_index:>3}/{total_folders:<3} folders] 📁", end=" ")
 
-        if rsync_folder_batch(src_paths, target_dir, current_file_index, total_files):
-            completed_folders += 1
-        else:
-            failed_folders += 1
-
-        current_file_index += len(src_paths)
-
-    # Final summary
-    print(f"\n🎉 Copy operation completed!")
-    print(f"📈 Summary:")
-    print(f"   • Files attempted: {attempted_files}")
-    print(f"   • Target folders completed: {completed_folders}")
-    print(f"   • Target folders failed: {failed_folders}")
-    print("   • Existing remote files skipped by rsync --ignore-existing")
-
-    # Clean up SSH connection
-    cleanup_ssh_connection()
-
-except KeyboardInterrupt:
-    print("\n\n⛔️ Operation cancelled by user. Exiting cleanly.")
-    cleanup_ssh_connection()
-    sys.exit(0)
-except Exception as e:
-    print(f"\n❌ Unexpected error: {e}")
-    cleanup_ssh_connection()
-    sys.exit(1)
+if __name__ == "__main__":
+    main()
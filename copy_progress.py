@@ -0,0 +1,234 @@
+import os
+import sys
+import time
+from functools import lru_cache
+
+# Redraw at most this often; completed (100%) lines are always drawn
+REDRAW_INTERVAL = 0.1
+# When stdout is not a terminal (cron/launchd logs), print plain lines this often
+PLAIN_INTERVAL = 5.0
+# Throughput behind the ETA: sampled this often, smoothed with this weight for the newest sample
+ETA_SAMPLE_INTERVAL = 1.0
+ETA_SMOOTHING = 0.3
+
+IS_TTY = sys.stdout.isatty()
+CLEAR_LINE = "\r\033[K" if IS_TTY else ""
+LINE_END = "" if IS_TTY else "\n"
+RESET = "\033[0m" if IS_TTY else ""
+
+BAR_COLORS = [
+    "\033[38;5;52m",  # Dark Red
+    "\033[38;5;88m",  # Red
+    "\033[38;5;124m",  # Medium Red
+    "\033[38;5;160m",  # Bright Red
+    "\033[38;5;196m",  # Vivid Red
+    "\033[38;5;202m",  # Orange-Red
+    "\033[38;5;208m",  # Orange
+    "\033[38;5;214m",  # Yellow-Orange
+    "\033[38;5;220m",  # Yellow
+    "\033[38;5;226m",  # Bright Yellow
+]
+EDGE_CHARS = ["▊", "▋", "▌", "▍", "▎", "▏"]
+EMPTY_COLOR = "\033[38;5;240m"
+INDICATOR_CHARS = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
+
+_last_draw = 0.0
+
+
+def should_redraw(force=False):
+    """Return True if enough time has passed since the last progress draw."""
+    global _last_draw
+    now = time.monotonic()
+    interval = REDRAW_INTERVAL if IS_TTY else PLAIN_INTERVAL
+    if force or now - _last_draw >= interval:
+        _last_draw = now
+        return True
+    return False
+
+
+def shorten_text(text, max_len=24):
+    """Shorten a label while keeping it readable."""
+    if len(text) <= max_len:
+        return text
+    if max_len <= 3:
+        return text[:max_len]
+    return text[: max_len - 3] + "..."
+
+
+@lru_cache(maxsize=4096)
+def compact_path_label(path, max_len=24):
+    """Show the most useful tail of a target path."""
+    parts = [part for part in path.strip("/").split("/") if part]
+    if not parts:
+        return path
+
+    tail = "/".join(parts[-3:])
+    return shorten_text(tail, max_len)
+
+
+@lru_cache(maxsize=4096)
+def relative_target_label(target_dir, target_base, max_len=24):
+    """Show a target folder relative to the destination base."""
+    label = os.path.relpath(target_dir, target_base)
+    if label == ".":
+        label = os.path.basename(target_dir)
+    return shorten_text(label, max_len)
+
+
+@lru_cache(maxsize=None)
+def _gradient(filled_length):
+    return "".join(
+        BAR_COLORS[min(int((i / max(filled_length, 1)) * len(BAR_COLORS)), len(BAR_COLORS) - 1)] + "█"
+        for i in range(filled_length)
+    )
+
+
+@lru_cache(maxsize=None)
+def _bar(filled_length, color_idx, edge_idx, bar_length, plain):
+    if plain:
+        return "#" * filled_length + "-" * (bar_length - filled_length)
+
+    bar = _gradient(filled_length)
+    if 0 < filled_length < bar_length:
+        bar += BAR_COLORS[color_idx] + EDGE_CHARS[edge_idx]
+        filled_length += 1
+
+    remaining = bar_length - filled_length
+    if remaining > 0:
+        bar += EMPTY_COLOR + "░" * remaining
+
+    return bar + "\033[0m"
+
+
+def build_progress_bar(percentage, bar_length=22):
+    """Build a red-to-yellow progress bar for terminal output.
+
+    Bars are assembled from cached segments, so repeated calls for the same
+    fill level cost a dictionary lookup.
+    """
+    percentage = max(0.0, min(percentage, 100.0))
+    filled_length = int(bar_length * percentage // 100)
+    color_idx = min(int((percentage / 100) * (len(BAR_COLORS) - 1)), len(BAR_COLORS) - 1)
+    edge_idx = min(int((percentage / 100) * len(EDGE_CHARS)), len(EDGE_CHARS) - 1)
+    return _bar(filled_length, color_idx, edge_idx, bar_length, not IS_TTY)
+
+
+def percentage_color(percentage):
+    """Color for the percentage figure."""
+    if not IS_TTY:
+        return ""
+    if percentage >= 100:
+        return "\033[38;5;226m\033[1m"
+    if percentage >= 75:
+        return "\033[38;5;220m\033[1m"
+    if percentage >= 50:
+        return "\033[38;5;208m\033[1m"
+    return "\033[38;5;196m\033[1m"
+
+
+def format_size(nbytes):
+    """Human-readable size: 512.0 KB, 12.3 MB, 4.56 GB."""
+    if nbytes >= 1024**3:
+        return f"{nbytes / 1024**3:.2f} GB"
+    if nbytes >= 1024**2:
+        return f"{nbytes / 1024**2:.1f} MB"
+    return f"{nbytes / 1024:.1f} KB"
+
+
+def format_eta(seconds):
+    """Remaining time as 42s, 3m05s or 1h12m; -- while unknown."""
+    if seconds is None:
+        return "--"
+    seconds = int(seconds + 0.5)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+class ByteEta:
+    """Byte-weighted completion and ETA from a moving throughput estimate.
+
+    Call update() with the cumulative bytes done. Throughput is sampled at
+    most every ETA_SAMPLE_INTERVAL and smoothed exponentially, so one slow
+    or fast burst (a stalled card, a cached file) does not swing the ETA.
+    total_bytes may grow while a streaming scan is still finding files
+    (set estimated while it is a running total) and shrink as files are
+    skipped.
+    """
+
+    def __init__(self, total_bytes=0, estimated=False):
+        self.total_bytes = total_bytes
+        self.estimated = estimated
+        self.done_bytes = 0
+        self.rate = None
+        self.started = self.sample_time = time.monotonic()
+        self.sample_bytes = 0
+
+    def update(self, done_bytes):
+        self.done_bytes = done_bytes
+        now = time.monotonic()
+        elapsed = now - self.sample_time
+        if elapsed >= ETA_SAMPLE_INTERVAL:
+            current = (done_bytes - self.sample_bytes) / elapsed
+            self.rate = current if self.rate is None else ETA_SMOOTHING * current + (1 - ETA_SMOOTHING) * self.rate
+            self.sample_time, self.sample_bytes = now, done_bytes
+
+    def percentage(self):
+        if not self.total_bytes:
+            return 100.0
+        return min(self.done_bytes / self.total_bytes * 100, 100.0)
+
+    def eta(self):
+        """Seconds left at the smoothed throughput (the average until the first sample), or None."""
+        rate = self.rate
+        if rate is None:
+            elapsed = time.monotonic() - self.started
+            rate = self.done_bytes / elapsed if elapsed > 0 else 0
+        if not rate:
+            return None
+        return max(self.total_bytes - self.done_bytes, 0) / rate
+
+    def label(self):
+        """e.g. "34.2% of 12.30 GB, ETA 4m12s" ("~" marks a total still being scanned)."""
+        return f"{self.percentage():4.1f}% of {'~' if self.estimated else ''}{format_size(self.total_bytes)}, ETA {format_eta(self.eta())}"
+
+
+def render_progress_line(
+    percentage,
+    file_label,
+    target_label,
+    update_index,
+    current_index,
+    total_files,
+    name_width=18,
+    force=False,
+    suffix="",
+):
+    """Render a colored progress line, at most once per REDRAW_INTERVAL.
+
+    suffix is appended after the indicator, e.g. a ByteEta label for the
+    whole run. Returns True if the line was drawn.
+    """
+    if not should_redraw(force or percentage >= 100):
+        return False
+
+    indicator = INDICATOR_CHARS[update_index % len(INDICATOR_CHARS)] if IS_TTY else ""
+    progress_bar = build_progress_bar(percentage)
+    display_name = shorten_text(file_label, name_width)
+
+    print(
+        f"{CLEAR_LINE}{current_index:>3}/{total_files:<3} {display_name:<{name_width}} -> {target_label:<24} "
+        f"[{progress_bar}] {percentage_color(percentage)}{percentage:5.1f}%{RESET} {indicator}"
+        f"{'  ' + suffix if suffix else ''}",
+        end=LINE_END,
+        flush=IS_TTY,
+    )
+    return True
+
+
+def end_progress_line():
+    """Move off an in-place progress line (a no-op in plain mode)."""
+    if IS_TTY:
+        print()
@@ -0,0 +1,194 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from run_metrics import METRICS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DURABILITY_LEVELS = ("none", "file", "batch")
+BATCH_SYNC_BYTES = 512 * 1024 * 1024  # unsynced bytes in one date folder that trigger an early checkpoint
+BATCH_MIN_BYTES = 64 * 1024 * 1024  # unsynced bytes in folders left behind before they are checkpointed
+
+
+def sync_fd(fd):
+    """Flush a file descriptor to stable storage.
+
+    On macOS fsync() only hands the data to the drive, which may keep it in
+    its own cache; F_FULLFSYNC asks the drive to write it out too.
+    """
+    if fcntl is not None and hasattr(fcntl, "F_FULLFSYNC"):
+        try:
+            fcntl.fcntl(fd, fcntl.F_FULLFSYNC)
+            return
+        except OSError:
+            pass  # not supported by this filesystem
+    os.fsync(fd)
+
+
+def sync_path(path):
+    """Flush a file, or a directory's entries, to stable storage."""
+    if os.name == "nt" and os.path.isdir(path):
+        return  # directories cannot be opened for fsync on Windows; NTFS journals their entries
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        sync_fd(fd)
+    finally:
+        os.close(fd)
+
+
+class DurableWrites:
+    """Makes finished copies durable according to a level from DURABILITY_LEVELS.
+
+    "none" leaves the data to the OS write cache. "file" flushes each copy
+    before it is renamed into place and then its folder, so every file is
+    on disk when it is reported, at the cost of one wait per file. "batch"
+    collects finished files per date folder (YYYY/YYYYMMDD, including its
+    DNG subfolder) and checkpoints a folder when files start arriving for
+    a different one, on a background thread while copying goes on: every
+    file of the folder first, then its directories and their parents up to
+    target_base. By then the disk has usually written most of the data
+    back. Folders left behind wait until they hold BATCH_MIN_BYTES between
+    them, so copy orders that hop between days (small-first, or a card
+    whose folders list out of date order) do not flush after every file.
+    A folder holding more than BATCH_SYNC_BYTES unsynced is checkpointed
+    early, and finish() checkpoints whatever is left. Safe to call from
+    copy worker threads.
+    """
+
+    def __init__(self, level="none", target_base=None, batch_bytes=BATCH_SYNC_BYTES, min_bytes=BATCH_MIN_BYTES):
+        self.level = level
+        self.target_base = target_base
+        self.batch_bytes = batch_bytes
+        self.min_bytes = min_bytes
+        self.lock = threading.Lock()
+        self.pending = {}  # date folder -> [paths] not synced yet
+        self.pending_bytes = {}  # date folder -> unsynced bytes
+        self.current = None  # date folder of the last finished file
+        self.executor = None
+        self.checkpoints = []
+        self.synced_files = 0
+        self.synced_dirs = 0
+        self.errors = []  # (path, error) for flushes that failed
+
+    def configure(self, level, target_base):
+        self.level = level
+        self.target_base = os.path.normpath(target_base)
+
+    def sync_before_rename(self, part_path):
+        """Flush a finished temp file ("file" level only)."""
+        if self.level != "file":
+            return
+        with METRICS.phase("fsync", part_path):
+            self._sync(part_path)
+            with self.lock:
+                self.synced_files += 1
+
+    def finished(self, dst_path, size=0, flushed=False):
+        """Record a file now in place at dst_path (copied, linked or already there).
+
+        flushed says sync_before_rename already flushed its data.
+        """
+        if self.level == "none":
+            return
+        folder = os.path.dirname(dst_path)
+        if self.level == "file":
+            with METRICS.phase("fsync", dst_path):
+                if not flushed:
+                    self._sync(dst_path)
+                    with self.lock:
+                        self.synced_files += 1
+                self._sync_folders([folder])
+            return
+
+        date_folder = self.date_folder(folder)
+        with self.lock:
+            self.pending.setdefault(date_folder, []).append(dst_path)
+            self.pending_bytes[date_folder] = self.pending_bytes.get(date_folder, 0) + size
+            left, self.current = self.current, date_folder
+            ready = []
+            if left != date_folder:
+                behind = [name for name in self.pending if name != date_folder]
+                if sum(self.pending_bytes[name] for name in behind) >= self.min_bytes:
+                    ready.extend(behind)
+            if self.pending_bytes[date_folder] >= self.batch_bytes:
+                ready.append(date_folder)
+            batches = [self._take_pending(name) for name in ready]
+        for batch in batches:
+            self._start_checkpoint(batch)
+
+    def date_folder(self, folder):
+        """The YYYY/YYYYMMDD folder under target_base that folder belongs to."""
+        if self.target_base is None:
+            return folder
+        relative = os.path.relpath(folder, self.target_base)
+        if relative.startswith(os.pardir):
+            return folder
+        return os.path.join(self.target_base, *relative.split(os.sep)[:2])
+
+    def finish(self):
+        """Run the last checkpoint and wait for all of them; returns True if everything was flushed."""
+        if self.level == "batch":
+            with self.lock:
+                batches = [self._take_pending(name) for name in list(self.pending)]
+            for batch in batches:
+                self._start_checkpoint(batch)
+            for checkpoint in self.checkpoints:
+                checkpoint.result()
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+        return not self.errors
+
+    def summary(self):
+        text = f"{self.level} ({self.synced_files} files and {self.synced_dirs} folders flushed"
+        if self.level == "batch":
+            text += f" in {len(self.checkpoints)} checkpoint(s)"
+        return text + ")"
+
+    def _take_pending(self, date_folder):
+        self.pending_bytes.pop(date_folder, None)
+        return self.pending.pop(date_folder)
+
+    def _start_checkpoint(self, batch):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=1)
+            self.checkpoints.append(self.executor.submit(self._checkpoint, batch))
+
+    def _checkpoint(self, paths):
+        """Flush every file of one date folder, then the directories holding them."""
+        with METRICS.phase("fsync", nbytes=0):
+            for path in paths:
+                self._sync(path)
+            with self.lock:
+                self.synced_files += len(paths)
+            self._sync_folders(sorted({os.path.dirname(path) for path in paths}, reverse=True))
+
+    def _sync_folders(self, folders):
+        """Flush each folder and its parents up to target_base, each once."""
+        seen = set()
+        for folder in folders:
+            while folder not in seen:
+                seen.add(folder)
+                self._sync(folder)
+                if self.target_base is None or os.path.normpath(folder) == self.target_base:
+                    break
+                parent = os.path.dirname(folder)
+                if parent == folder or not parent.startswith(self.target_base):
+                    break
+                folder = parent
+        with self.lock:
+            self.synced_dirs += len(seen)
+
+    def _sync(self, path):
+        try:
+            sync_path(path)
+        except FileNotFoundError:
+            pass  # removed since, e.g. a copy that failed verification
+        except OSError as e:
+            with self.lock:
+                self.errors.append((path, e))
@@ -0,0 +1,141 @@
+import hashlib
+import mmap
+import os
+
+try:
+    import xxhash
+except ImportError:  # optional; BLAKE2b is used when it is missing
+    xxhash = None
+
+HASH_ALGORITHMS = ("blake2b", "md5") + (("xxh3_128", "xxh64") if xxhash else ())
+
+SAMPLE_SIZE = 64 * 1024  # bytes hashed from each end of a file for the sample tier
+READ_SLICE = 8 * 1024 * 1024  # slice fed to the hasher per update
+TIERS = ("size", "mtime", "sample", "full")
+
+
+def new_hasher(algorithm="blake2b"):
+    """Return a hashlib-style object for one of HASH_ALGORITHMS."""
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=16)
+    if algorithm == "md5":
+        return hashlib.md5()
+    if xxhash is not None and algorithm in ("xxh3_128", "xxh64"):
+        return getattr(xxhash, algorithm)()
+    raise ValueError(f"Unknown or unavailable hash algorithm: {algorithm}")
+
+
+def hash_path(file_path, algorithm="blake2b"):
+    """Hash a whole file, using mmap for large reads where possible."""
+    hasher = new_hasher(algorithm)
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return hasher.hexdigest()
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, READ_SLICE):
+                        hasher.update(view[offset : offset + READ_SLICE])
+                finally:
+                    view.release()
+        except (OSError, ValueError):
+            hasher = new_hasher(algorithm)
+            f.seek(0)
+            buffer = bytearray(READ_SLICE)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                hasher.update(memoryview(buffer)[:read])
+    return hasher.hexdigest()
+
+
+def hash_sample(file_path, size, algorithm="blake2b", sample_size=SAMPLE_SIZE):
+    """Hash the first and last sample_size bytes of a file."""
+    hasher = new_hasher(algorithm)
+    with open(file_path, "rb") as f:
+        hasher.update(f.read(sample_size))
+        f.seek(max(size - sample_size, sample_size))
+        hasher.update(f.read(sample_size))
+    return hasher.hexdigest()
+
+
+class TieredComparator:
+    """Decide whether two files are identical using the cheapest test that can.
+
+    Tiers run in order and stop at the first one that proves a difference:
+    size, whole-second mtime, a head+tail sample hash, and finally a full hash.
+    With check_mtime off the mtime tier is left out, for destinations whose
+    timestamp says nothing about their content (touched files, or hardlinks
+    carrying the timestamp of another copy). Identical files always reach
+    the full hash, except small files where the sample would cover the whole
+    file anyway. Counts and bytes read per tier are kept so the savings can
+    be reported.
+    """
+
+    def __init__(self, algorithm="blake2b", sample_size=SAMPLE_SIZE, check_mtime=True):
+        self.algorithm = algorithm
+        self.sample_size = sample_size
+        self.check_mtime = check_mtime
+        self.resolved = dict.fromkeys(TIERS, 0)
+        self.bytes_read = dict.fromkeys(TIERS, 0)
+
+    def compare(self, src_path, dst_path, src_stat=None, dst_stat=None):
+        """Return (identical, source checksum or None)."""
+        src_stat = src_stat or os.stat(src_path)
+        dst_stat = dst_stat or os.stat(dst_path)
+
+        if src_stat.st_size != dst_stat.st_size:
+            self.resolved["size"] += 1
+            return False, None
+
+        if self.check_mtime and int(src_stat.st_mtime) != int(dst_stat.st_mtime):
+            self.resolved["mtime"] += 1
+            return False, None
+
+        size = src_stat.st_size
+        if size > 2 * self.sample_size:
+            self.bytes_read["sample"] += 4 * self.sample_size
+            if hash_sample(src_path, size, self.algorithm, self.sample_size) != hash_sample(
+                dst_path, size, self.algorithm, self.sample_size
+            ):
+                self.resolved["sample"] += 1
+                return False, None
+
+        self.resolved["full"] += 1
+        self.bytes_read["full"] += 2 * size
+        src_checksum = hash_path(src_path, self.algorithm)
+        return src_checksum == hash_path(dst_path, self.algorithm), src_checksum
+
+    def is_truncated_copy(self, src_path, dst_path, src_stat=None, dst_stat=None):
+        """Return True if dst_path is shorter than src_path and holds exactly its first bytes.
+
+        That is what an interrupted copy leaves behind, as opposed to a
+        different file that happens to share the name. An empty destination
+        proves nothing (every file starts with zero bytes), so it is kept as a
+        file of its own rather than overwritten; an empty source has no
+        shorter copy at all.
+        """
+        src_stat = src_stat or os.stat(src_path)
+        dst_stat = dst_stat or os.stat(dst_path)
+        length = dst_stat.st_size
+        if src_stat.st_size == 0 or length == 0 or length >= src_stat.st_size:
+            return False
+        self.bytes_read["full"] += 2 * length
+        with open(src_path, "rb") as src, open(dst_path, "rb") as dst:
+            while True:
+                expected = dst.read(READ_SLICE)
+                if not expected:
+                    return True
+                if src.read(len(expected)) != expected:
+                    return False
+
+    def summary(self):
+        """One-line description of how many files each tier resolved."""
+        tiers = TIERS[:3] if self.check_mtime else ("size", "sample")
+        parts = [f"{self.resolved[tier]} by {tier}" for tier in tiers]
+        parts.append(f"{self.resolved['full']} by full {self.algorithm}")
+        hashed_mb = (self.bytes_read["sample"] + self.bytes_read["full"]) / (1024 * 1024)
+        return ", ".join(parts) + f" ({hashed_mb:.1f} MB read)"
@@ -0,0 +1,147 @@
+import os
+from datetime import datetime
+from functools import lru_cache
+
+from card_marks import dcf_folder_number
+from run_metrics import METRICS
+
+# Orders in which scanned files can be transferred; "scan" keeps the walk order
+SCHEDULE_POLICIES = ("scan", "small-first", "large-first", "by-folder")
+
+# Every UTC offset in use is a multiple of 15 minutes, so all timestamps in
+# one 15-minute bucket fall on the same local date.
+DATE_BUCKET_SECONDS = 15 * 60
+
+
+class FileRecord:
+    """A source file and the single stat result carried through the pipeline."""
+
+    __slots__ = ("src_path", "name", "stat", "dst_path", "dcf_folder")
+
+    def __init__(self, src_path, name, stat, dst_path=None, dcf_folder=None):
+        self.src_path = src_path
+        self.name = name
+        self.stat = stat
+        self.dst_path = dst_path
+        self.dcf_folder = dcf_folder  # number of the DCIM folder it sits under (100-999), if any
+
+    @property
+    def size(self):
+        return self.stat.st_size
+
+    @property
+    def creation_time(self):
+        return creation_time_from_stat(self.stat)
+
+    def __repr__(self):
+        return f"FileRecord({self.src_path!r}, size={self.size})"
+
+
+def creation_time_from_stat(stat):
+    """Return the best available creation timestamp from a stat result.
+
+    st_birthtime where the platform has it; otherwise st_mtime, which on a
+    camera card is the shot time (st_ctime on Linux is when the card was
+    mounted or copied).
+    """
+    return stat.st_birthtime if hasattr(stat, "st_birthtime") else stat.st_mtime
+
+
+@lru_cache(maxsize=None)
+def _folders_for_bucket(bucket):
+    moment = datetime.fromtimestamp(bucket * DATE_BUCKET_SECONDS)
+    return moment.strftime("%Y"), moment.strftime("%Y%m%d")
+
+
+def date_folders(timestamp):
+    """Return the (YYYY, YYYYMMDD) folder names for a timestamp, memoized."""
+    return _folders_for_bucket(int(timestamp // DATE_BUCKET_SECONDS))
+
+
+class DirectoryCache:
+    """Remembers target directories already created during this run."""
+
+    def __init__(self):
+        self.created = set()
+
+    def ensure(self, path):
+        """Create path (and parents) unless this run already did."""
+        if path in self.created:
+            return
+        os.makedirs(path, exist_ok=True)
+        self.created.add(path)
+
+    def forget(self, *paths):
+        """Drop paths that may have been removed since; returns True if any was remembered."""
+        remembered = any(path in self.created for path in paths)
+        self.created.difference_update(paths)
+        return remembered
+
+
+def scan_source_files(directory, since=None, unreadable=None):
+    """Yield a FileRecord for each non-hidden file, depth-first with os.scandir.
+
+    The stat result comes from the directory entry, so each file is stat'ed
+    once (and not at all on Windows, where scandir returns it for free).
+    With a card_marks.HighWaterMark as since, only files newer than the mark
+    are yielded. Every folder is still listed, so a file a second camera
+    wrote into a lower-numbered folder is found by its mtime.
+    A folder that cannot be listed, or an entry that cannot be stat'ed, is
+    skipped and (path, error) appended to the unreadable list, so callers
+    can tell the card was not fully read.
+    """
+    stack = [(directory, None)]
+    while stack:
+        current, folder = stack.pop()
+        try:
+            with METRICS.phase("scan", current), os.scandir(current) as scanner:
+                entries = list(scanner)
+        except OSError as e:
+            if unreadable is not None:
+                unreadable.append((current, e))
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if current != directory:
+                        subdirs.append((entry.path, folder))
+                    else:
+                        subdirs.append((entry.path, dcf_folder_number(entry.name)))
+                    continue
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                with METRICS.phase("stat", entry.path):
+                    stat = entry.stat()
+            except OSError as e:
+                if unreadable is not None:
+                    unreadable.append((entry.path, e))
+                continue
+            record = FileRecord(entry.path, entry.name, stat, dcf_folder=folder)
+            if since is None or since.is_new(record):
+                yield record
+
+        stack.extend(reversed(subdirs))
+
+
+def order_records(records, policy, folder_of=None):
+    """Return records in the transfer order given by one of SCHEDULE_POLICIES.
+
+    small-first finishes many files early, large-first starts the long
+    transfers while there is still small work to overlap with them, and
+    by-folder keeps each destination folder together (in name order) so its
+    metadata is touched in one stretch. folder_of maps a record to its
+    destination folder (default: the folder of its dst_path). Ties keep
+    the scan order.
+    """
+    if policy == "scan":
+        return list(records)
+    if policy == "small-first":
+        return sorted(records, key=lambda record: record.size)
+    if policy == "large-first":
+        return sorted(records, key=lambda record: -record.size)
+    if policy == "by-folder":
+        folder_of = folder_of or (lambda record: os.path.dirname(record.dst_path))
+        return sorted(records, key=lambda record: (folder_of(record), record.name))
+    raise ValueError(f"Unknown schedule policy: {policy}")
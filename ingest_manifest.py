@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from run_metrics import METRICS
+
+MANIFEST_FILENAME = ".copy_group_manifest.sqlite3"
+COMMIT_EVERY = 200
+
+
+class IngestManifest:
+    """SQLite record of files already ingested into a target folder.
+
+    Entries are keyed by source identity (path, size, mtime) and remember the
+    destination path, its stat data and the checksum of the copied bytes, so a
+    re-run can decide skip/copy from one indexed lookup instead of hashing both
+    sides again. Safe to share between the reader threads of a multi-card run.
+    """
+
+    def __init__(self, target_base, filename=MANIFEST_FILENAME):
+        self.path = os.path.join(target_base, filename)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                src_path TEXT NOT NULL,
+                src_size INTEGER NOT NULL,
+                src_mtime_ns INTEGER NOT NULL,
+                dst_path TEXT NOT NULL,
+                dst_size INTEGER NOT NULL,
+                dst_mtime_ns INTEGER NOT NULL,
+                checksum TEXT,
+                checksum_algorithm TEXT,
+                recorded_at TEXT NOT NULL,
+                verified_at TEXT,
+                PRIMARY KEY (src_path, src_size, src_mtime_ns)
+            )
+            """
+        )
+        # Columns added after the first release of the manifest
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        for column in ("checksum_algorithm", "verified_at"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE files ADD COLUMN {column} TEXT")
+        self.pending = 0
+
+    def lookup(self, src_path, src_stat):
+        """Return the manifest entry for a source file, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT dst_path, dst_size, dst_mtime_ns, checksum, checksum_algorithm FROM files "
+                "WHERE src_path = ? AND src_size = ? AND src_mtime_ns = ?",
+                (src_path, src_stat.st_size, src_stat.st_mtime_ns),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "dst_path": row[0],
+            "dst_size": row[1],
+            "dst_mtime_ns": row[2],
+            "checksum": row[3],
+            "checksum_algorithm": row[4],
+        }
+
+    def is_current(self, src_path, src_stat, dst_path, dst_stat=None):
+        """Return True if the manifest proves dst_path already holds src_path.
+
+        The destination is only trusted while its stat data still matches what
+        was recorded; any disagreement means the caller must re-verify.
+        """
+        with METRICS.phase("manifest", src_path):
+            entry = self.lookup(src_path, src_stat)
+        if entry is None or entry["dst_path"] != dst_path:
+            return False
+
+        if dst_stat is None:
+            try:
+                dst_stat = os.stat(dst_path)
+            except OSError:
+                return False
+
+        return (
+            dst_stat.st_size == entry["dst_size"]
+            and dst_stat.st_mtime_ns == entry["dst_mtime_ns"]
+        )
+
+    def record(self, src_path, src_stat, dst_path, checksum, algorithm, verified=False):
+        """Record that src_path has been ingested as dst_path.
+
+        verified marks entries whose destination was read back and matched
+        the checksum.
+        """
+        with METRICS.phase("manifest", src_path):
+            dst_stat = os.stat(dst_path)
+            now = datetime.now().isoformat(timespec="seconds")
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO files "
+                    "(src_path, src_size, src_mtime_ns, dst_path, dst_size, dst_mtime_ns, "
+                    "checksum, checksum_algorithm, recorded_at, verified_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        src_path,
+                        src_stat.st_size,
+                        src_stat.st_mtime_ns,
+                        dst_path,
+                        dst_stat.st_size,
+                        dst_stat.st_mtime_ns,
+                        checksum,
+                        algorithm,
+                        now,
+                        now if verified else None,
+                    ),
+                )
+                self.pending += 1
+                if self.pending >= COMMIT_EVERY:
+                    self.conn.commit()
+                    self.pending = 0
+
+    def clear(self):
+        """Drop every entry, e.g. before a rebuild."""
+        with self.lock:
+            self.conn.execute("DELETE FROM files")
+        self.commit()
+
+    def commit(self):
+        """Flush pending records to disk."""
+        with self.lock:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        """Commit and close the underlying database."""
+        self.commit()
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from copy_progress import CLEAR_LINE, IS_TTY, LINE_END, shorten_text, should_redraw
+
+DESTINATION_WRITE_SLOTS = 1  # destination writes in flight at once (raise for SSD/RAID targets)
+
+
+def card_label(source, taken=()):
+    """Short name for a card: its volume name, made unique among labels already taken."""
+    path = os.path.normpath(source)
+    if os.path.basename(path).upper() == "DCIM":
+        path = os.path.dirname(path)
+    label = os.path.basename(path) or path
+    candidate, number = label, 2
+    while candidate in taken:
+        candidate = f"{label}-{number}"
+        number += 1
+    return candidate
+
+
+class ScheduledFile:
+    """An open destination file whose writes each wait for a turn from a DestinationScheduler."""
+
+    __slots__ = ("file", "turn")
+
+    def __init__(self, file, turn):
+        self.file = file
+        self.turn = turn
+
+    def write(self, data):
+        with self.turn(len(data)):
+            return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+class DestinationScheduler:
+    """Shares the destination disk between the card readers of a multi-card run.
+
+    Every write asks for a turn; turns are handed out first come, first
+    served, with at most `slots` writes in flight. A reader that just wrote
+    queues behind the others, so with all cards busy they take turns
+    round-robin and no card starves, while each card's next read overlaps
+    the other cards' writes. Destination paths are also claimed while being
+    copied, so two cards never write the same file at once.
+    """
+
+    def __init__(self, slots=DESTINATION_WRITE_SLOTS):
+        self.slots = slots
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+        self.active = 0
+        self.claimed = set()
+        self.written = {}  # card label -> bytes written
+        self.waited = {}  # card label -> seconds spent waiting for a turn
+
+    @contextmanager
+    def turn(self, card, nbytes):
+        """Context manager holding one destination write turn for card."""
+        started = time.perf_counter()
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            while ticket != self.serving or self.active >= self.slots:
+                self.condition.wait()
+            self.serving += 1
+            self.active += 1
+            self.waited[card] = self.waited.get(card, 0.0) + time.perf_counter() - started
+            self.condition.notify_all()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.written[card] = self.written.get(card, 0) + nbytes
+                self.condition.notify_all()
+
+    def writer(self, card):
+        """Return the write_turn callback copy_file_data expects for card."""
+        return lambda nbytes: self.turn(card, nbytes)
+
+    @contextmanager
+    def claim(self, dst_path):
+        """Hold dst_path for one card, waiting while another card is copying to it."""
+        with self.condition:
+            while dst_path in self.claimed:
+                self.condition.wait()
+            self.claimed.add(dst_path)
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.claimed.discard(dst_path)
+                self.condition.notify_all()
+
+
+class MultiCardProgress:
+    """One combined status line for all cards, plus a permanent line per finished file.
+
+    Cards are read through their label, done_files, finished and
+    total_label() attributes.
+    """
+
+    def __init__(self):
+        self.cards = []
+        self.copied_bytes = 0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add_card(self, card):
+        self.cards.append(card)
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.copied_bytes += count
+            if should_redraw():
+                self.draw()
+
+    def file_finished(self, line):
+        """Print a permanent line for a finished (or skipped) file, then redraw the status."""
+        with self.lock:
+            print(f"{CLEAR_LINE}{line}")
+            if IS_TTY:
+                self.draw()
+
+    def draw(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = self.copied_bytes / elapsed / (1024 * 1024)
+        cards = "  ".join(
+            f"{shorten_text(card.label, 12)} {card.done_files}/{card.total_label()}{' ✅' if card.finished else ''}"
+            for card in self.cards
+        )
+        print(
+            f"{CLEAR_LINE}📇 {cards}  {self.copied_bytes / (1024 * 1024):8.1f} MB {rate:7.1f} MB/s",
+            end=LINE_END,
+            flush=IS_TTY,
+        )
+
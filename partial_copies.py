@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import time
+
+PARTIAL_DIRNAME = ".copy_group_partial"
+PART_SUFFIX = ".part"
+CHECKPOINT_SUFFIX = ".part.json"
+CHECKPOINT_BYTES = 64 * 1024 * 1024  # flush and record a resume point this often
+RESUME_SAMPLE_SIZE = 64 * 1024  # bytes before the resume point compared with the source
+STALE_PARTIAL_SECONDS = 14 * 24 * 3600  # partials untouched this long are removed at startup
+
+
+class PartialCopies:
+    """Temp files for copies in progress, kept in one hidden folder per target.
+
+    A copy is written to <target>/.copy_group_partial/<key>-<name>.part and
+    renamed over the destination once complete, so the destination path only
+    ever holds a finished file. Every CHECKPOINT_BYTES the part file is
+    flushed to disk and a small JSON checkpoint records the source identity
+    and the offset reached, so an interrupted copy can resume from there.
+    With no target_base, the folder is created next to each destination.
+    """
+
+    def __init__(self, target_base=None):
+        self.target_base = target_base
+        self.resumed_files = 0
+        self.resumed_bytes = 0
+
+    def directory(self, dst_path):
+        return os.path.join(self.target_base or os.path.dirname(dst_path), PARTIAL_DIRNAME)
+
+    def part_path(self, dst_path):
+        """Temp path for dst_path; the same destination always gets the same name."""
+        key = hashlib.sha1(os.path.abspath(dst_path).encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        return os.path.join(self.directory(dst_path), f"{key}-{os.path.basename(dst_path)}{PART_SUFFIX}")
+
+    @staticmethod
+    def checkpoint_path(part_path):
+        return part_path[: -len(PART_SUFFIX)] + CHECKPOINT_SUFFIX
+
+    @staticmethod
+    def read_checkpoint(checkpoint_path):
+        try:
+            with open(checkpoint_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def resume_offset(self, part_path, src_file, src_stat):
+        """Return how many bytes of part_path can be kept, or 0 to start over.
+
+        The checkpoint must name the same source (size and mtime), the part
+        file must still hold the checkpointed bytes, and the last
+        RESUME_SAMPLE_SIZE bytes before the offset must match the source.
+        """
+        checkpoint = self.read_checkpoint(self.checkpoint_path(part_path))
+        if not checkpoint:
+            return 0
+        offset = checkpoint.get("offset", 0)
+        if (
+            checkpoint.get("src_size") != src_stat.st_size
+            or checkpoint.get("src_mtime_ns") != src_stat.st_mtime_ns
+            or not 0 < offset <= src_stat.st_size
+        ):
+            return 0
+        try:
+            if os.path.getsize(part_path) < offset:
+                return 0
+            sample_start = max(offset - RESUME_SAMPLE_SIZE, 0)
+            with open(part_path, "rb") as part_file:
+                part_file.seek(sample_start)
+                part_sample = part_file.read(offset - sample_start)
+        except OSError:
+            return 0
+        if os.pread(src_file.fileno(), offset - sample_start, sample_start) != part_sample:
+            return 0
+
+        self.resumed_files += 1
+        self.resumed_bytes += offset
+        return offset
+
+    def checkpointer(self, part_path, dst_path, dst_file, src_stat, offset=0):
+        """Return an on_progress callback that checkpoints dst_file as it grows."""
+        checkpoint_path = self.checkpoint_path(part_path)
+        last = offset
+
+        def checkpoint(copied):
+            nonlocal last
+            if copied - last < CHECKPOINT_BYTES or copied >= src_stat.st_size:
+                return
+            dst_file.flush()
+            os.fsync(dst_file.fileno())
+            temp_path = checkpoint_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "dst_path": dst_path,
+                        "src_size": src_stat.st_size,
+                        "src_mtime_ns": src_stat.st_mtime_ns,
+                        "offset": copied,
+                    },
+                    f,
+                )
+            os.replace(temp_path, checkpoint_path)
+            last = copied
+
+        return checkpoint
+
+    def finish(self, part_path, dst_path):
+        """Move a completed part file over its destination and drop its checkpoint."""
+        os.replace(part_path, dst_path)
+        self._remove(self.checkpoint_path(part_path))
+
+    def cleanup(self, max_age=STALE_PARTIAL_SECONDS):
+        """Remove partials that cannot be resumed; returns (files removed, bytes freed).
+
+        A part file is kept only if it has a checkpoint, was written within
+        max_age and its destination does not exist yet. Checkpoints and temp
+        files without a part file are removed too.
+        """
+        directory = os.path.join(self.target_base, PARTIAL_DIRNAME)
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return 0, 0
+
+        now = time.time()
+        removed = freed = 0
+        kept = set()
+        for entry in entries:
+            if not entry.name.endswith(PART_SUFFIX):
+                continue
+            checkpoint = self.read_checkpoint(self.checkpoint_path(entry.path))
+            stat = entry.stat()
+            if checkpoint is not None and now - stat.st_mtime <= max_age and not os.path.exists(checkpoint.get("dst_path", "")):
+                kept.add(self.checkpoint_path(entry.name))
+                continue
+            self._remove(entry.path)
+            removed += 1
+            freed += stat.st_size
+
+        # Checkpoints of removed parts, and leftovers of interrupted checkpoint writes
+        for entry in entries:
+            if not entry.name.endswith(PART_SUFFIX) and entry.name not in kept:
+                self._remove(entry.path)
+        return removed, freed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,101 @@
+import json
+import os
+import time
+
+INVENTORY_CACHE = os.path.expanduser("~/.cache/copy_group/synology_inventory.json")
+
+MISSING = "missing"
+SAME = "same"
+CHANGED = "changed"
+
+
+def build_find_command(base_path):
+    """Shell command listing every remote file as size, mtime and relative path.
+
+    Records are NUL-terminated so any file name survives; Synology's @eaDir
+    thumbnail folders are pruned. A base path that does not exist yet lists
+    as empty rather than failing.
+    """
+    return (
+        f"if [ -d '{base_path}' ]; then find '{base_path}' -name '@eaDir' -prune -o -type f "
+        f"-printf '%s\\t%T@\\t%P\\0'; fi"
+    )
+
+
+class RemoteInventory:
+    """Path, size and mtime of every file under the remote base path."""
+
+    def __init__(self, base_path, entries=None, fetched_at=None):
+        self.base_path = base_path.rstrip("/") + "/"
+        self.entries = entries if entries is not None else {}
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.dirs = {os.path.dirname(path) for path in self.entries}
+
+    @classmethod
+    def parse(cls, base_path, output):
+        """Build an inventory from the output of build_find_command."""
+        entries = {}
+        for record in output.split("\0"):
+            if not record:
+                continue
+            try:
+                size, mtime, path = record.lstrip("\n").split("\t", 2)
+                entries[path] = (int(size), int(float(mtime)))
+            except ValueError:
+                continue
+        return cls(base_path, entries)
+
+    @classmethod
+    def load(cls, base_path, cache_path=INVENTORY_CACHE, max_age=None):
+        """Load a cached inventory, or return None if missing, stale or for another base."""
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("base_path") != base_path.rstrip("/") + "/":
+            return None
+        if max_age is not None and time.time() - data.get("fetched_at", 0) > max_age:
+            return None
+        entries = {path: tuple(value) for path, value in data.get("entries", {}).items()}
+        return cls(base_path, entries, data.get("fetched_at"))
+
+    def save(self, cache_path=INVENTORY_CACHE):
+        """Write the inventory to the local cache file."""
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"base_path": self.base_path, "fetched_at": self.fetched_at, "entries": self.entries},
+                f,
+            )
+        os.replace(tmp_path, cache_path)
+
+    def relative_path(self, remote_path):
+        if remote_path.startswith(self.base_path):
+            return remote_path[len(self.base_path) :]
+        return remote_path.lstrip("/")
+
+    def has_dir(self, remote_dir):
+        """True if the remote directory is known to exist."""
+        return self.relative_path(remote_dir.rstrip("/")) in self.dirs
+
+    def classify(self, remote_path, stat):
+        """Compare a local stat result with the remote file at remote_path."""
+        entry = self.entries.get(self.relative_path(remote_path))
+        if entry is None:
+            return MISSING
+        if entry == (stat.st_size, int(stat.st_mtime)):
+            return SAME
+        return CHANGED
+
+    def add(self, remote_path, stat):
+        """Record a file that has just been uploaded."""
+        path = self.relative_path(remote_path)
+        self.entries[path] = (stat.st_size, int(stat.st_mtime))
+        self.dirs.add(os.path.dirname(path))
+
+    def __len__(self):
+        return len(self.entries)
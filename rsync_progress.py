@@ -0,0 +1,170 @@
+import os
+import re
+
+# rsync prints one --out-format line per file once it has been sent (the %b
+# field makes it wait for the transfer to finish). The marker keeps these
+# lines apart from rsync's own messages.
+OUT_FORMAT_MARKER = "@@copy_group@@"
+PROGRESS_OPTIONS = (
+    "--info=progress2",
+    f"--out-format={OUT_FORMAT_MARKER}\t%l\t%b\t%n",
+)
+READ_CHUNK_SIZE = 64 * 1024
+
+_LINE_SPLIT = re.compile(rb"[\r\n]")
+_PROGRESS_LINE = re.compile(
+    rb"^\s*(?P<bytes>[\d,]+)\s+(?P<percent>\d{1,3})%\s+(?P<rate>[\d.]+)(?P<unit>[kMGT]?B)/s"
+    rb"(?:.*?\(xfr#(?P<xfr>\d+),\s*(?:ir|to)-chk=(?P<left>\d+)/(?P<total>\d+)\))?"
+)
+_QUOTED_PATH = re.compile(rb'"([^"]+)"')
+_FAILURE_PREFIXES = (b"rsync: ", b"file has vanished: ")
+_RATE_UNITS = {b"B": 1, b"kB": 1024, b"MB": 1024**2, b"GB": 1024**3, b"TB": 1024**4}
+
+
+class FileDone:
+    """A file rsync finished sending (size of the file, bytes sent on the wire)."""
+
+    __slots__ = ("name", "size", "sent")
+
+    def __init__(self, name, size, sent):
+        self.name = name
+        self.size = size
+        self.sent = sent
+
+
+class FileFailed:
+    """A file rsync reported an error for."""
+
+    __slots__ = ("name", "message")
+
+    def __init__(self, name, message):
+        self.name = name
+        self.message = message
+
+
+class TransferProgress:
+    """Overall progress of the whole rsync run (--info=progress2)."""
+
+    __slots__ = ("transferred", "percentage", "rate", "files_done", "files_left")
+
+    def __init__(self, transferred, percentage, rate, files_done=None, files_left=None):
+        self.transferred = transferred
+        self.percentage = percentage
+        self.rate = rate  # bytes per second
+        self.files_done = files_done
+        self.files_left = files_left
+
+
+class RsyncMessage:
+    """Any other line rsync printed (file list banners, totals, warnings)."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def parse_line(line):
+    """Turn one line of rsync output into an event, or None for blank lines."""
+    line = line.strip()
+    if not line:
+        return None
+
+    if line.startswith(OUT_FORMAT_MARKER.encode()):
+        _, size, sent, name = line.split(b"\t", 3)
+        if name.endswith(b"/"):
+            return None  # directory entry
+        return FileDone(os.fsdecode(name), int(size), int(sent))
+
+    match = _PROGRESS_LINE.match(line)
+    if match:
+        xfr = match.group("xfr")
+        return TransferProgress(
+            int(match.group("bytes").replace(b",", b"")),
+            min(float(match.group("percent")), 100.0),
+            float(match.group("rate")) * _RATE_UNITS[match.group("unit")],
+            int(xfr) if xfr else None,
+            int(match.group("left")) if xfr else None,
+        )
+
+    text = os.fsdecode(line)
+    if line.startswith(_FAILURE_PREFIXES):
+        path = _QUOTED_PATH.search(line)
+        if path:
+            return FileFailed(os.fsdecode(path.group(1)), text)
+    return RsyncMessage(text)
+
+
+class RsyncOutputParser:
+    """Incremental parser for raw rsync stdout bytes.
+
+    Lines end in either \\r (progress redraws) or \\n; a partial line at the
+    end of a chunk is kept until the next one arrives.
+    """
+
+    def __init__(self):
+        self.pending = b""
+
+    def feed(self, chunk):
+        parts = _LINE_SPLIT.split(self.pending + chunk)
+        self.pending = parts.pop()
+        return [event for event in map(parse_line, parts) if event is not None]
+
+    def close(self):
+        event = parse_line(self.pending)
+        self.pending = b""
+        return [event] if event is not None else []
+
+
+def iter_rsync_events(stream, chunk_size=READ_CHUNK_SIZE):
+    """Yield events from a binary rsync stdout pipe, reading large chunks."""
+    parser = RsyncOutputParser()
+    fd = stream.fileno()
+    while True:
+        chunk = os.read(fd, chunk_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+class TransferOutcome:
+    """Per-file result of one rsync run.
+
+    done maps the transfer-relative name of each sent file to its size;
+    failed maps paths rsync complained about to the error line. A file that
+    is in neither was skipped by rsync (already present); that only counts
+    as success when rsync itself exited cleanly.
+    """
+
+    def __init__(self):
+        self.done = {}
+        self.failed = {}
+        self.transferred = 0
+        self.returncode = None
+        self.digests = {}  # name -> digest of the bytes sent, when the transport was asked for them
+
+    def record(self, event):
+        if isinstance(event, FileDone):
+            self.done[event.name] = event.size
+        elif isinstance(event, FileFailed):
+            self.failed[event.name] = event.message
+        elif isinstance(event, TransferProgress):
+            self.transferred = max(self.transferred, event.transferred)
+
+    def merge(self, other):
+        """Fold in the outcome of a further run over other files."""
+        self.done.update(other.done)
+        self.failed.update(other.failed)
+        self.digests.update(other.digests)
+        self.transferred += other.transferred
+        if not self.returncode:
+            self.returncode = other.returncode
+
+    def is_failed(self, name):
+        return any(path == name or path.endswith(f"/{name}") for path in self.failed)
+
+    def succeeded(self, name):
+        if self.is_failed(name):
+            return False
+        return name in self.done or self.returncode == 0
@@ -0,0 +1,164 @@
+import json
+import os
+import platform
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+# Per-call latency histogram buckets, upper bounds in seconds (last bucket is open-ended)
+HISTOGRAM_BOUNDS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
+
+class _Phase:
+    """Times one call of a phase; set nbytes inside the with-block if it is only known there."""
+
+    __slots__ = ("metrics", "name", "path", "nbytes", "started")
+
+    def __init__(self, metrics, name, path, nbytes):
+        self.metrics = metrics
+        self.name = name
+        self.path = path
+        self.nbytes = nbytes
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.add(self.name, time.perf_counter() - self.started, self.nbytes, self.path)
+
+
+class _NullPhase:
+    """Stand-in used while metrics are off, so instrumented code costs next to nothing."""
+
+    __slots__ = ("nbytes",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class RunMetrics:
+    """Time, calls and bytes per phase of a run, written as a JSON report.
+
+    Phases are named steps (scan, stat, date, dedup, copy, metadata, mkdir, link,
+    verify, fsync, manifest, remote_list, remote_mkdir, link_probe, upload,
+    remote_verify). Seconds are summed over calls, so with parallel workers a
+    phase can add up to more than the wall time. With trace on, every call
+    that names a file is kept; with histograms on, per-call latencies are
+    kept for percentiles and buckets.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace = False
+        self.histograms = False
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.phases = {}  # name -> [calls, seconds, bytes]
+        self.samples = {}  # name -> per-call seconds (histograms only)
+        self.events = []  # (offset, phase, seconds, bytes, path) (trace only)
+        self.summary = {}
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+
+    def enable(self, trace=False, histograms=False):
+        self.enabled = True
+        self.trace = trace
+        self.histograms = histograms
+        self.reset()
+
+    def phase(self, name, path=None, nbytes=0):
+        """Context manager timing one call of a phase."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name, path, nbytes)
+
+    def add(self, name, seconds, nbytes=0, path=None):
+        """Record one call of a phase that was timed elsewhere."""
+        if not self.enabled:
+            return
+        with self.lock:
+            totals = self.phases.get(name)
+            if totals is None:
+                totals = self.phases[name] = [0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += nbytes
+            if self.histograms:
+                self.samples.setdefault(name, []).append(seconds)
+            if self.trace and path is not None:
+                offset = time.perf_counter() - self.started - seconds
+                self.events.append((offset, name, seconds, nbytes, path))
+
+    def note(self, **values):
+        """Add run-level values (file counts, settings) to the report."""
+        self.summary.update(values)
+
+    def report(self, script):
+        wall = time.perf_counter() - self.started
+        phases = {}
+        for name, (calls, seconds, nbytes) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            entry = {"calls": calls, "seconds": round(seconds, 6), "bytes": nbytes}
+            if nbytes and seconds:
+                entry["mb_per_s"] = round(nbytes / seconds / (1024 * 1024), 2)
+            if name in self.samples:
+                entry["latency"] = latency_summary(self.samples[name])
+            phases[name] = entry
+
+        report = {
+            "script": script,
+            "started_at": self.started_at,
+            "wall_seconds": round(wall, 6),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "summary": self.summary,
+            "phases": phases,
+        }
+        if self.trace:
+            report["trace"] = [
+                {"at": round(offset, 6), "phase": name, "seconds": round(seconds, 6), "bytes": nbytes, "path": path}
+                for offset, name, seconds, nbytes, path in sorted(self.events)
+            ]
+        return report
+
+    def write(self, path, script):
+        """Write the JSON report; returns the path."""
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(script), f, indent=2)
+        return path
+
+
+def latency_summary(samples):
+    """Percentiles and bucket counts for a list of per-call seconds."""
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 3)
+
+    counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for value in ordered:
+        counts[bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+    labels = [f"<={bound * 1000:g}ms" for bound in HISTOGRAM_BOUNDS] + [f">{HISTOGRAM_BOUNDS[-1] * 1000:g}ms"]
+
+    return {
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "buckets": dict(zip(labels, counts)),
+    }
+
+
+# Shared by every module of a run; main() turns it on when a report is requested.
+METRICS = RunMetrics()
@@ -0,0 +1,851 @@
+import functools
+import getpass
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from file_compare import hash_path, new_hasher
+from remote_inventory import build_find_command
+from rsync_progress import (
+    PROGRESS_OPTIONS,
+    FileDone,
+    FileFailed,
+    TransferOutcome,
+    TransferProgress,
+    iter_rsync_events,
+)
+
+try:
+    import paramiko
+except ImportError:  # optional: only the sftp transport needs it
+    paramiko = None
+
+TRANSPORTS = ("rsync-ssh", "rsync-daemon", "sftp", "local")
+
+SSH_CONTROL_PATH = "/tmp/ssh_mux_%h_%p_%r"
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Link probe: incompressible data sent until either limit is reached
+LINK_PROBE_BYTES = 8 * 1024 * 1024
+LINK_PROBE_SECONDS = 3.0
+
+# Remote hashing commands matching file_compare.new_hasher, fed NUL-separated paths on stdin
+REMOTE_HASH_COMMANDS = {"md5": "md5sum", "blake2b": "b2sum -l 128"}
+
+_LIST_ONLY_LINE = re.compile(r"^(?P<type>\S)\S{9}\s+(?P<size>[\d,]+)\s+(?P<date>\d{4}/\d\d/\d\d \d\d:\d\d:\d\d)\s+(?P<path>.+)$")
+
+
+def probe_link(write, finish, round_trip=0.0, nbytes=LINK_PROBE_BYTES, max_seconds=LINK_PROBE_SECONDS):
+    """Time sending random data through write() and finish(); return bytes per second.
+
+    round_trip is the fixed cost of an empty exchange, taken off the elapsed
+    time so a short probe over a fast link is not dominated by session setup.
+    """
+    chunk = os.urandom(STREAM_CHUNK_SIZE)
+    sent = 0
+    started = time.monotonic()
+    while sent < nbytes and time.monotonic() - started < max_seconds:
+        write(chunk)
+        sent += len(chunk)
+    finish()
+    return sent / max(time.monotonic() - started - round_trip, 1e-6)
+
+
+def rsync_compressors(version_text):
+    """Compression algorithms listed by `rsync --version`, best first.
+
+    rsync 3.2+ prints a "Compress list:" section; older versions only have
+    -z, which is zlib.
+    """
+    lines = version_text.splitlines()
+    for index, line in enumerate(lines):
+        if line.strip() == "Compress list:":
+            following = lines[index + 1].split() if index + 1 < len(lines) else []
+            return tuple(name for name in following if name != "none")
+    return ("zlib",) if version_text.startswith("rsync") else ()
+
+
+def build_hash_command(algorithm):
+    """Shell command that hashes every NUL-separated path on stdin, one "digest  path" line each."""
+    return f"xargs -0 {REMOTE_HASH_COMMANDS[algorithm]} --"
+
+
+def parse_hash_output(output):
+    """Map path -> digest from md5sum-style output; escaped (unusual) names are left out."""
+    digests = {}
+    for line in output.splitlines():
+        digest, separator, path = line.partition(" ")
+        if not separator or digest.startswith("\\"):
+            continue
+        digests[path[1:] if path[:1] in (" ", "*") else path] = digest.lower()
+    return digests
+
+
+class SentDigests:
+    """Hashes each source file on a background thread as soon as it has been sent.
+
+    The transfer has just read the file, so hashing it is served mostly
+    from the page cache rather than a second read of the card.
+    """
+
+    def __init__(self, algorithm, items):
+        self.algorithm = algorithm
+        self.sources = {relative_path: src_path for src_path, relative_path in items}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures = {}
+
+    def watch(self, on_event):
+        """Wrap an on_event callback so every FileDone queues its source for hashing."""
+
+        def forward(event):
+            if isinstance(event, FileDone) and event.name in self.sources:
+                self.futures[event.name] = self.executor.submit(hash_path, self.sources[event.name], self.algorithm)
+            if on_event is not None:
+                on_event(event)
+
+        return forward
+
+    def collect(self):
+        """Wait for the queued hashes; return relative path -> digest (unreadable files left out)."""
+        self.executor.shutdown(wait=True)
+        digests = {}
+        for name, future in self.futures.items():
+            try:
+                digests[name] = future.result()
+            except OSError:
+                continue
+        return digests
+
+
+@functools.lru_cache(maxsize=None)
+def local_rsync_compressors():
+    """rsync_compressors() of the rsync on this machine, () if rsync cannot run."""
+    try:
+        result = subprocess.run(["rsync", "--version"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return ()
+    return rsync_compressors(result.stdout)
+
+
+class Compression:
+    """Wire compression for uploads of the file types in extensions.
+
+    Everything else (JPEG, HEIF, video) is already compressed and is always
+    sent as-is.
+    """
+
+    __slots__ = ("algorithm", "level", "extensions")
+
+    def __init__(self, algorithm, level, extensions):
+        self.algorithm = algorithm
+        self.level = level
+        self.extensions = tuple(extension.lower() for extension in extensions)
+
+    def applies_to(self, path):
+        return os.path.splitext(path)[1].lower() in self.extensions
+
+    def rsync_options(self):
+        options = ["--compress", f"--compress-level={self.level}"]
+        if self.algorithm != "zlib":
+            options.append(f"--compress-choice={self.algorithm}")  # rsync 3.2+
+        return options
+
+    def __str__(self):
+        return f"{self.algorithm} level {self.level}"
+
+
+class Transport:
+    """Moves files into the remote archive; subclasses pick the wire protocol.
+
+    Remote paths are absolute paths on the NAS. upload() takes a list of
+    (src_path, relative_path) pairs under a base path and reports progress as
+    the events from rsync_progress, keyed by relative_path, whatever the
+    backend.
+    """
+
+    name = None
+    compression = None  # Compression for compressible file types, or None to send everything as-is
+    digest_algorithm = None  # set to a REMOTE_HASH_COMMANDS name to record the digest of every file sent
+
+    def check(self):
+        """Return True if the remote side is reachable."""
+        return True
+
+    def compressors(self):
+        """Compression algorithms both ends support for uploads, best first (none by default)."""
+        return ()
+
+    def measure_throughput(self):
+        """Return the upload throughput of the link in bytes per second, or None if it cannot be measured."""
+        return None
+
+    def list_files(self, base_path, timeout=300):
+        """Return the remote listing in build_find_command's format, or None on failure."""
+        raise NotImplementedError
+
+    def make_dirs(self, remote_dirs):
+        """Create remote directories (and parents); return True on success."""
+        raise NotImplementedError
+
+    def upload(self, items, base_path, backup_suffix=None, on_event=None, replace=False):
+        """Send files and return a TransferOutcome.
+
+        Without a backup_suffix, files that already exist remotely are left
+        alone; with one, an existing file is renamed to its name plus the
+        suffix before the new copy is written. With replace, existing files
+        are overwritten (used to repair copies that failed verification).
+        With a digest_algorithm, outcome.digests holds the digest of every
+        file sent, taken from the bytes read for the transfer.
+        """
+        raise NotImplementedError
+
+    def remote_digests(self, remote_paths, algorithm, timeout=300):
+        """Hash remote files on the NAS in one batch; return path -> digest, or None if not supported."""
+        return None
+
+    def close(self):
+        pass
+
+
+def _emit(outcome, on_event, event):
+    outcome.record(event)
+    if on_event is not None:
+        on_event(event)
+
+
+class RsyncTransport(Transport):
+    """Common rsync command line and output handling for the rsync backends."""
+
+    # rsync straight into the target folder when every file shares one;
+    # otherwise (or always, if False) go through a --files-from staging tree.
+    direct_uploads = True
+
+    def rsync_options(self):
+        return []
+
+    def rsync_target(self, remote_path):
+        raise NotImplementedError
+
+    def build_command(self, sources, remote_dir, backup_suffix=None, extra_options=(), replace=False):
+        """Build the rsync command line used for every upload."""
+        if replace:
+            existing_options = ["--ignore-times"]  # resend even if size and mtime match; delta fixes damaged blocks
+        elif backup_suffix is None:
+            existing_options = ["--ignore-existing"]  # skip files already present remotely
+        else:
+            existing_options = ["--backup", f"--suffix={backup_suffix}"]  # keep replaced remote files
+
+        return [
+            "rsync",
+            *PROGRESS_OPTIONS,
+            "-av",  # archive, verbose; compression only via extra_options, for compressible types on slow links
+            "--partial",
+            "--inplace",
+            "--timeout=30",
+            *existing_options,
+            *extra_options,
+            *self.rsync_options(),
+            *sources,
+            self.rsync_target(remote_dir),
+        ]
+
+    def compressors(self):
+        return local_rsync_compressors()
+
+    def upload(self, items, base_path, backup_suffix=None, on_event=None, replace=False):
+        """Send all items in one rsync run, or two with compression.
+
+        With a compression set, the compressible files go in a separate run
+        with -z so already-compressed files never pass through the
+        compressor. Progress of the second run continues from the first.
+        Digests are taken by SentDigests as rsync reports each file sent.
+        """
+        if self.digest_algorithm is None:
+            return self.upload_runs(items, base_path, backup_suffix, on_event, replace)
+        digests = SentDigests(self.digest_algorithm, items)
+        try:
+            outcome = self.upload_runs(items, base_path, backup_suffix, digests.watch(on_event), replace)
+        finally:
+            collected = digests.collect()
+        outcome.digests = collected
+        return outcome
+
+    def upload_runs(self, items, base_path, backup_suffix=None, on_event=None, replace=False):
+        compression = self.compression
+        compressed = [item for item in items if compression is not None and compression.applies_to(item[0])]
+        if not compressed or len(compressed) == len(items):
+            options = compression.rsync_options() if compressed else []
+            return self.upload_group(items, base_path, backup_suffix, on_event, options, replace)
+
+        plain = [item for item in items if not compression.applies_to(item[0])]
+        total_bytes = sum(os.path.getsize(src_path) for src_path, _ in items) or 1
+        outcome = TransferOutcome()
+        offset = 0
+
+        def forward(event):
+            if isinstance(event, TransferProgress):
+                transferred = offset + event.transferred
+                event = TransferProgress(
+                    transferred,
+                    min(transferred * 100 / total_bytes, 100.0),
+                    event.rate,
+                    event.files_done,
+                    event.files_left,
+                )
+            if on_event is not None:
+                on_event(event)
+
+        for group, options in ((plain, []), (compressed, compression.rsync_options())):
+            part = self.upload_group(group, base_path, backup_suffix, forward, options, replace)
+            outcome.merge(part)
+            offset = outcome.transferred
+        return outcome
+
+    def upload_group(self, items, base_path, backup_suffix=None, on_event=None, compress_options=(), replace=False):
+        """Send items in one rsync run.
+
+        Files bound for a single folder are passed to rsync directly. Anything
+        else is mirrored in a local staging folder of symlinks laid out like
+        the remote side (YYYY/YYYYMMDD/NAME -> file on the card) and sent with
+        --files-from and -L, so one session places every file in its folder.
+        """
+        base_path = base_path.rstrip("/") + "/"
+        folders = {os.path.dirname(relative_path) for _, relative_path in items}
+        staging = None
+        try:
+            if self.direct_uploads and len(folders) == 1:
+                folder = folders.pop()
+                prefix = f"{folder}/" if folder else ""
+                names = {src_path: relative_path for src_path, relative_path in items}
+                rsync_cmd = self.build_command(list(names), base_path + prefix, backup_suffix, compress_options, replace)
+            else:
+                prefix = ""
+                staging = tempfile.mkdtemp(prefix="copy_group_stage_")
+                for src_path, relative_path in items:
+                    staged = os.path.join(staging, relative_path)
+                    os.makedirs(os.path.dirname(staged), exist_ok=True)
+                    os.symlink(os.path.abspath(src_path), staged)
+                list_path = os.path.join(staging, ".files-from")
+                with open(list_path, "w", encoding="utf-8") as f:
+                    f.write("\0".join(relative_path for _, relative_path in items) + "\0")
+                names = {}
+                rsync_cmd = self.build_command(
+                    [f"{staging}/"],
+                    base_path,
+                    backup_suffix,
+                    ["--copy-links", f"--files-from={list_path}", "--from0", *compress_options],
+                    replace,
+                )
+            return self.run_rsync(rsync_cmd, prefix, names, staging, on_event)
+        finally:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def run_rsync(self, rsync_cmd, prefix, names, staging, on_event):
+        """Run rsync and translate its events to paths relative to the base."""
+        outcome = TransferOutcome()
+        process = subprocess.Popen(rsync_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        try:
+            for event in iter_rsync_events(process.stdout):
+                if isinstance(event, FileDone):
+                    event = FileDone(prefix + event.name, event.size, event.sent)
+                elif isinstance(event, FileFailed):
+                    if event.name in names:
+                        event = FileFailed(names[event.name], event.message)
+                    elif staging is not None and event.name.startswith(f"{staging}/"):
+                        event = FileFailed(event.name[len(staging) + 1 :], event.message)
+                _emit(outcome, on_event, event)
+        finally:
+            process.wait()
+        outcome.returncode = process.returncode
+        return outcome
+
+
+class RsyncSSHTransport(RsyncTransport):
+    """rsync over SSH, sharing one ControlMaster connection for every command."""
+
+    name = "rsync-ssh"
+
+    def __init__(self, host, user, port=22):
+        self.host = host
+        self.user = user
+        self.port = port
+
+    def ssh_options(self):
+        return [
+            "-p",
+            str(self.port),
+            "-o",
+            "StrictHostKeyChecking=no",
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPath={SSH_CONTROL_PATH}",
+            "-o",
+            "ControlPersist=5m",
+        ]
+
+    def run(self, command, capture_output=True, timeout=30, input_text=None):
+        """Run a command on the NAS via SSH, optionally feeding it stdin."""
+        ssh_cmd = ["ssh", *self.ssh_options(), "-o", "ConnectTimeout=10", f"{self.user}@{self.host}", command]
+        try:
+            return subprocess.run(
+                ssh_cmd, capture_output=capture_output, text=True, timeout=timeout, input=input_text
+            )
+        except subprocess.TimeoutExpired:
+            print(f"❌ SSH command timed out: {command}")
+            return None
+        except Exception as e:
+            print(f"❌ SSH command failed: {e}")
+            return None
+
+    def check(self):
+        result = self.run("echo 'SSH connection successful'")
+        return bool(result) and result.returncode == 0
+
+    def remote_digests(self, remote_paths, algorithm, timeout=300):
+        """Hash every path with one SSH command over the shared connection."""
+        if not remote_paths:
+            return {}
+        result = self.run(build_hash_command(algorithm), timeout=timeout, input_text="\0".join(remote_paths) + "\0")
+        if result is None:
+            return None
+        return parse_hash_output(result.stdout)  # missing files are simply absent
+
+    def compressors(self):
+        """Algorithms in both the local and the NAS rsync, in local preference order."""
+        result = self.run("rsync --version")
+        if not result or result.returncode != 0:
+            return ()
+        remote = rsync_compressors(result.stdout)
+        return tuple(name for name in local_rsync_compressors() if name in remote)
+
+    def measure_throughput(self):
+        """Time piping random data into `cat > /dev/null` on the NAS over the shared connection."""
+        ssh_cmd = ["ssh", *self.ssh_options(), "-o", "ConnectTimeout=10", f"{self.user}@{self.host}"]
+        try:
+            started = time.monotonic()
+            subprocess.run([*ssh_cmd, "true"], capture_output=True, timeout=30, check=True)
+            round_trip = time.monotonic() - started
+            process = subprocess.Popen(
+                [*ssh_cmd, "cat > /dev/null"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+
+            def finish():
+                process.stdin.close()
+                process.wait(timeout=30)
+
+            rate = probe_link(process.stdin.write, finish, round_trip)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return rate if process.returncode == 0 else None
+
+    def list_files(self, base_path, timeout=300):
+        result = self.run(build_find_command(base_path), timeout=timeout)
+        if not result or result.returncode != 0:
+            return None
+        return result.stdout
+
+    def make_dirs(self, remote_dirs):
+        """Create every directory in one SSH call (paths are fed on stdin)."""
+        if not remote_dirs:
+            return True
+        result = self.run(
+            "xargs -0 mkdir -p --",
+            capture_output=False,
+            input_text="\0".join(remote_dirs) + "\0",
+        )
+        return bool(result) and result.returncode == 0
+
+    def rsync_options(self):
+        return ["-e", " ".join(["ssh", *self.ssh_options()])]
+
+    def rsync_target(self, remote_path):
+        return f"{self.user}@{self.host}:{remote_path}"
+
+    def close(self):
+        """Close the shared SSH connection."""
+        try:
+            subprocess.run(
+                ["ssh", *self.ssh_options()[:2], "-o", f"ControlPath={SSH_CONTROL_PATH}", "-O", "exit", f"{self.user}@{self.host}"],
+                capture_output=True,
+                timeout=10,
+            )
+        except Exception:
+            pass  # Ignore cleanup errors
+
+
+class RsyncDaemonTransport(RsyncTransport):
+    """rsync to an rsync daemon module (no SSH encryption or login shell).
+
+    module_path is the NAS folder the module serves; remote paths below it
+    are mapped to rsync://host/module/... . The daemon cannot run mkdir, so
+    every upload goes through --files-from, which creates missing folders.
+    """
+
+    name = "rsync-daemon"
+    direct_uploads = False
+
+    def __init__(self, host, module, module_path, user=None, port=873, password_file=None):
+        self.host = host
+        self.module = module
+        self.module_path = module_path.rstrip("/") + "/"
+        self.user = user
+        self.port = port
+        self.password_file = password_file
+
+    def rsync_target(self, remote_path):
+        relative = remote_path[len(self.module_path) :] if remote_path.startswith(self.module_path) else remote_path.lstrip("/")
+        login = f"{self.user}@" if self.user else ""
+        return f"rsync://{login}{self.host}:{self.port}/{self.module}/{relative}"
+
+    def rsync_options(self):
+        return [f"--password-file={self.password_file}"] if self.password_file else []
+
+    def list_only(self, remote_path, recursive=False, timeout=30):
+        rsync_cmd = ["rsync", "--list-only", *self.rsync_options()]
+        if recursive:
+            rsync_cmd.append("--recursive")
+        try:
+            return subprocess.run(
+                [*rsync_cmd, self.rsync_target(remote_path.rstrip("/") + "/")],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            print(f"❌ rsync daemon listing timed out: {remote_path}")
+            return None
+        except Exception as e:
+            print(f"❌ rsync daemon listing failed: {e}")
+            return None
+
+    def check(self):
+        result = self.list_only(self.module_path)
+        return bool(result) and result.returncode == 0
+
+    def list_files(self, base_path, timeout=300):
+        """List files via --list-only and convert them to the find format."""
+        result = self.list_only(base_path, recursive=True, timeout=timeout)
+        if not result:
+            return None
+        if result.returncode != 0:
+            return "" if "No such file or directory" in result.stderr else None
+
+        records = []
+        for line in result.stdout.splitlines():
+            match = _LIST_ONLY_LINE.match(line)
+            if not match or match.group("type") != "-":
+                continue
+            path = match.group("path")
+            if "@eaDir" in path.split("/"):
+                continue
+            mtime = datetime.strptime(match.group("date"), "%Y/%m/%d %H:%M:%S").timestamp()
+            records.append(f"{match.group('size').replace(',', '')}\t{mtime:.0f}\t{path}")
+        return "\0".join(records) + "\0" if records else ""
+
+    def make_dirs(self, remote_dirs):
+        return True  # created by the --files-from upload itself
+
+
+class StreamTransport(Transport):
+    """Uploads file by file from Python, without rsync.
+
+    Subclasses provide the remote file primitives. Each file is written to a
+    hidden .part name and renamed into place, so an interrupted upload never
+    looks like a finished file.
+    """
+
+    chunk_size = STREAM_CHUNK_SIZE
+
+    def exists(self, remote_path):
+        raise NotImplementedError
+
+    def rename(self, remote_path, new_path):
+        raise NotImplementedError
+
+    def open_write(self, remote_path, compress=False):
+        """Open a remote file for writing; compress asks for wire compression where supported."""
+        raise NotImplementedError
+
+    def set_times(self, remote_path, atime, mtime):
+        raise NotImplementedError
+
+    def upload(self, items, base_path, backup_suffix=None, on_event=None, replace=False):
+        base_path = base_path.rstrip("/") + "/"
+        outcome = TransferOutcome()
+        stats = [os.stat(src_path) for src_path, _ in items]
+        total_bytes = sum(stat.st_size for stat in stats) or 1
+        transferred = 0
+        done = 0
+        started = time.monotonic()
+
+        for (src_path, relative_path), stat in zip(items, stats):
+            remote_path = base_path + relative_path
+            folder, name = os.path.split(remote_path)
+            part_path = f"{folder}/.{name}.part"
+            try:
+                if not replace and self.exists(remote_path):
+                    if backup_suffix is None:
+                        continue
+                    self.rename(remote_path, remote_path + backup_suffix)
+                compress = self.compression is not None and self.compression.applies_to(src_path)
+                hasher = new_hasher(self.digest_algorithm) if self.digest_algorithm is not None else None
+                with open(src_path, "rb") as src, self.open_write(part_path, compress) as dst:
+                    while True:
+                        chunk = src.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                        transferred += len(chunk)
+                        elapsed = max(time.monotonic() - started, 1e-6)
+                        _emit(
+                            outcome,
+                            on_event,
+                            TransferProgress(
+                                transferred,
+                                min(transferred * 100 / total_bytes, 100.0),
+                                transferred / elapsed,
+                                done,
+                                len(items) - done,
+                            ),
+                        )
+                self.rename(part_path, remote_path)
+                self.set_times(remote_path, stat.st_atime, stat.st_mtime)
+            except Exception as e:
+                _emit(outcome, on_event, FileFailed(relative_path, f"{relative_path}: {e}"))
+                continue
+            done += 1
+            if hasher is not None:
+                outcome.digests[relative_path] = hasher.hexdigest()
+            _emit(outcome, on_event, FileDone(relative_path, stat.st_size, stat.st_size))
+
+        outcome.returncode = 23 if outcome.failed else 0  # rsync's "partial transfer" code
+        return outcome
+
+
+class ThrottledWriter:
+    """File wrapper that holds writes down to a simulated link bandwidth.
+
+    With a compressor, the link is charged for the compressed size of the
+    data while the file itself receives the data unchanged.
+    """
+
+    def __init__(self, file_obj, bandwidth, compressor=None):
+        self.file_obj = file_obj
+        self.bandwidth = bandwidth  # bytes per second, 0 = unlimited
+        self.compressor = compressor
+        self.written = 0
+        self.started = time.monotonic()
+
+    def write(self, data):
+        self.file_obj.write(data)
+        if self.compressor is not None:
+            self.written += len(self.compressor.compress(data))
+        else:
+            self.written += len(data)
+        if self.bandwidth:
+            delay = self.written / self.bandwidth - (time.monotonic() - self.started)
+            if delay > 0:
+                time.sleep(delay)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file_obj.close()
+
+
+class LocalTransport(StreamTransport):
+    """A local folder standing in for the NAS, with simulated latency and bandwidth.
+
+    Remote paths are created under root (/volume1/photo/x -> root/volume1/photo/x).
+    Every remote operation costs one round trip of latency seconds; batched
+    operations (listing, mkdir) cost one round trip in total, like one SSH
+    command. File data is throttled to bandwidth bytes per second. Wire
+    compression is simulated with zlib: a compressed file is charged for its
+    zlib size at the same level (capped at 9).
+    """
+
+    name = "local"
+
+    def __init__(self, root, latency=0.0, bandwidth=0):
+        self.root = root
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.round_trips = 0
+
+    def local_path(self, remote_path):
+        return os.path.join(self.root, remote_path.lstrip("/"))
+
+    def round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def check(self):
+        self.round_trip()
+        os.makedirs(self.root, exist_ok=True)
+        return True
+
+    def compressors(self):
+        return ("zlib",)
+
+    def measure_throughput(self):
+        self.round_trip()
+        with open(os.devnull, "wb") as devnull:
+            writer = ThrottledWriter(devnull, self.bandwidth)
+            return probe_link(writer.write, lambda: None)
+
+    def list_files(self, base_path, timeout=300):
+        self.round_trip()
+        base = self.local_path(base_path)
+        records = []
+        for folder, dirs, files in os.walk(base):
+            dirs[:] = [d for d in dirs if d != "@eaDir"]
+            for name in files:
+                path = os.path.join(folder, name)
+                stat = os.stat(path)
+                records.append(f"{stat.st_size}\t{stat.st_mtime}\t{os.path.relpath(path, base)}")
+        return "\0".join(records) + "\0" if records else ""
+
+    def make_dirs(self, remote_dirs):
+        self.round_trip()
+        for remote_dir in remote_dirs:
+            os.makedirs(self.local_path(remote_dir), exist_ok=True)
+        return True
+
+    def exists(self, remote_path):
+        self.round_trip()
+        return os.path.exists(self.local_path(remote_path))
+
+    def rename(self, remote_path, new_path):
+        self.round_trip()
+        os.replace(self.local_path(remote_path), self.local_path(new_path))
+
+    def remote_digests(self, remote_paths, algorithm, timeout=300):
+        self.round_trip()
+        digests = {}
+        for remote_path in remote_paths:
+            try:
+                digests[remote_path] = hash_path(self.local_path(remote_path), algorithm)
+            except OSError:
+                continue
+        return digests
+
+    def open_write(self, remote_path, compress=False):
+        self.round_trip()
+        compressor = zlib.compressobj(max(1, min(self.compression.level, 9))) if compress else None
+        return ThrottledWriter(open(self.local_path(remote_path), "wb"), self.bandwidth, compressor)
+
+    def set_times(self, remote_path, atime, mtime):
+        self.round_trip()
+        os.utime(self.local_path(remote_path), (atime, mtime))
+
+
+class SFTPTransport(StreamTransport):
+    """Pure-Python SFTP upload with pipelined writes (needs paramiko).
+
+    Writes are pipelined: paramiko sends each block without waiting for the
+    server's acknowledgement and only collects the replies when the file is
+    closed, so a high-latency link stays busy. Listing and mkdir run as
+    commands over the same SSH connection.
+    """
+
+    name = "sftp"
+
+    def __init__(self, host, user, port=22, pipelined=True):
+        self.host = host
+        self.user = user
+        self.port = port
+        self.pipelined = pipelined
+        self.client = None
+        self.sftp = None
+
+    def check(self):
+        if paramiko is None:
+            print("❌ The sftp transport needs paramiko: pip install paramiko")
+            return False
+        self.client = paramiko.SSHClient()
+        self.client.load_system_host_keys()
+        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            try:
+                self.client.connect(self.host, self.port, self.user, timeout=10)
+            except paramiko.AuthenticationException:
+                password = getpass.getpass(f"{self.user}@{self.host}'s password: ")
+                self.client.connect(self.host, self.port, self.user, password=password, timeout=10)
+            self.sftp = self.client.open_sftp()
+        except Exception as e:
+            print(f"❌ SFTP connection failed: {e}")
+            return False
+        return True
+
+    def run(self, command, input_text=None, timeout=30):
+        """Run a command over the SSH connection; return (exit status, stdout)."""
+        stdin, stdout, _ = self.client.exec_command(command, timeout=timeout)
+        if input_text is not None:
+            stdin.write(input_text)
+        stdin.channel.shutdown_write()
+        output = stdout.read().decode("utf-8", "surrogateescape")
+        return stdout.channel.recv_exit_status(), output
+
+    def list_files(self, base_path, timeout=300):
+        try:
+            status, output = self.run(build_find_command(base_path), timeout=timeout)
+        except Exception as e:
+            print(f"❌ SSH command failed: {e}")
+            return None
+        return output if status == 0 else None
+
+    def make_dirs(self, remote_dirs):
+        if not remote_dirs:
+            return True
+        try:
+            status, _ = self.run("xargs -0 mkdir -p --", input_text="\0".join(remote_dirs) + "\0")
+        except Exception as e:
+            print(f"❌ SSH command failed: {e}")
+            return False
+        return status == 0
+
+    def remote_digests(self, remote_paths, algorithm, timeout=300):
+        if not remote_paths:
+            return {}
+        try:
+            _, output = self.run(build_hash_command(algorithm), "\0".join(remote_paths) + "\0", timeout)
+        except Exception as e:
+            print(f"❌ SSH command failed: {e}")
+            return None
+        return parse_hash_output(output)
+
+    def exists(self, remote_path):
+        try:
+            self.sftp.stat(remote_path)
+        except IOError:
+            return False
+        return True
+
+    def rename(self, remote_path, new_path):
+        self.sftp.posix_rename(remote_path, new_path)
+
+    def open_write(self, remote_path, compress=False):
+        remote_file = self.sftp.open(remote_path, "wb")
+        remote_file.set_pipelined(self.pipelined)
+        return remote_file
+
+    def set_times(self, remote_path, atime, mtime):
+        self.sftp.utime(remote_path, (atime, mtime))
+
+    def close(self):
+        if self.sftp is not None:
+            self.sftp.close()
+        if self.client is not None:
+            self.client.close()